@@ -5,6 +5,14 @@ from alembic import context
 from database.base import Base
 from models.account import Account
 from models.token import Token
+from models.sync_state import SyncState
+from models.sync_run import SyncRun
+from models.page_snapshot import PageSnapshot
+from models.customer import Customer
+from models.vendor import Vendor
+from models.item import Item
+from models.invoice import Invoice
+from models.bill import Bill
 from core.config import DATABASE_URL
 
 config = context.config
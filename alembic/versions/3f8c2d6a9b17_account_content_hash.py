@@ -0,0 +1,29 @@
+"""account content hash
+
+Revision ID: 3f8c2d6a9b17
+Revises: e7b3a9d14f60
+Create Date: 2026-10-18 12:40:09.517264
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f8c2d6a9b17'
+down_revision: Union[str, None] = 'e7b3a9d14f60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Existing rows start without a hash and are rewritten (and hashed) once by their next sync.
+    op.add_column('accounts', sa.Column('content_hash', sa.String(length=32), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('accounts', 'content_hash')
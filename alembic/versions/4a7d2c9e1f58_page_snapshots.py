@@ -0,0 +1,42 @@
+"""page snapshots
+
+Revision ID: 4a7d2c9e1f58
+Revises: 9c4f1e2b7a35
+Create Date: 2026-10-18 16:02:43.917265
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4a7d2c9e1f58'
+down_revision: Union[str, None] = '9c4f1e2b7a35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('qbo_page_snapshots',
+    sa.Column('sync_run_id', sa.Integer(), nullable=False),
+    sa.Column('page', sa.Integer(), nullable=False),
+    sa.Column('realm_id', sa.String(), nullable=False),
+    sa.Column('entity', sa.String(), nullable=False),
+    sa.Column('codec', sa.String(), nullable=False),
+    sa.Column('row_count', sa.Integer(), nullable=False),
+    sa.Column('raw_bytes', sa.Integer(), nullable=False),
+    sa.Column('data', sa.LargeBinary(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['sync_run_id'], ['sync_runs.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('sync_run_id', 'page')
+    )
+    op.create_index('ix_qbo_page_snapshots_created_at', 'qbo_page_snapshots', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_qbo_page_snapshots_created_at', table_name='qbo_page_snapshots')
+    op.drop_table('qbo_page_snapshots')
@@ -0,0 +1,32 @@
+"""drop account parent fkey
+
+Revision ID: 7e2b5d9c0a43
+Revises: 4a7d2c9e1f58
+Create Date: 2026-10-18 17:21:06.402519
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7e2b5d9c0a43'
+down_revision: Union[str, None] = '4a7d2c9e1f58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Syncs commit per page and per batch, so a child can be written before its parent;
+    # accounts whose parent is missing are treated as roots by the hierarchy instead.
+    op.drop_constraint('accounts_realm_id_parent_id_fkey', 'accounts', type_='foreignkey')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_foreign_key(
+        'accounts_realm_id_parent_id_fkey', 'accounts', 'accounts',
+        ['realm_id', 'parent_id'], ['realm_id', 'id'],
+    )
@@ -0,0 +1,48 @@
+"""realm tenancy
+
+Revision ID: 9c41d2e87b06
+Revises: 68a097ca834f
+Create Date: 2026-10-18 10:02:17.530914
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c41d2e87b06'
+down_revision: Union[str, None] = '68a097ca834f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('accounts', sa.Column('realm_id', sa.String(), nullable=True))
+    # Until now the service held a single company: attribute its accounts to the stored token's realm.
+    # Accounts that cannot be attributed are dropped and come back with the next sync.
+    op.execute(
+        "UPDATE accounts SET realm_id = "
+        "(SELECT realm_id FROM tokens ORDER BY created_at DESC LIMIT 1)"
+    )
+    op.execute("DELETE FROM accounts WHERE realm_id IS NULL")
+    op.alter_column('accounts', 'realm_id', nullable=False)
+
+    op.drop_constraint('accounts_parent_id_fkey', 'accounts', type_='foreignkey')
+    op.drop_constraint('accounts_pkey', 'accounts', type_='primary')
+    op.create_primary_key('accounts_pkey', 'accounts', ['realm_id', 'id'])
+    op.create_foreign_key(
+        'accounts_realm_id_parent_id_fkey', 'accounts', 'accounts',
+        ['realm_id', 'parent_id'], ['realm_id', 'id'],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('accounts_realm_id_parent_id_fkey', 'accounts', type_='foreignkey')
+    op.drop_constraint('accounts_pkey', 'accounts', type_='primary')
+    op.create_primary_key('accounts_pkey', 'accounts', ['id'])
+    op.create_foreign_key('accounts_parent_id_fkey', 'accounts', 'accounts', ['parent_id'], ['id'])
+    op.drop_column('accounts', 'realm_id')
@@ -0,0 +1,100 @@
+"""qbo entities
+
+Revision ID: 9c4f1e2b7a35
+Revises: b41e7c95d2a8
+Create Date: 2026-10-18 14:21:07.384512
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c4f1e2b7a35'
+down_revision: Union[str, None] = 'b41e7c95d2a8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('customers',
+    sa.Column('realm_id', sa.String(), nullable=False),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('display_name', sa.String(), nullable=True),
+    sa.Column('company_name', sa.String(), nullable=True),
+    sa.Column('email', sa.String(), nullable=True),
+    sa.Column('currency', sa.String(), nullable=True),
+    sa.Column('active', sa.Boolean(), nullable=True),
+    sa.Column('balance', sa.Float(), nullable=True),
+    sa.Column('content_hash', sa.String(length=32), nullable=True),
+    sa.PrimaryKeyConstraint('realm_id', 'id')
+    )
+    op.create_table('vendors',
+    sa.Column('realm_id', sa.String(), nullable=False),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('display_name', sa.String(), nullable=True),
+    sa.Column('company_name', sa.String(), nullable=True),
+    sa.Column('email', sa.String(), nullable=True),
+    sa.Column('currency', sa.String(), nullable=True),
+    sa.Column('active', sa.Boolean(), nullable=True),
+    sa.Column('balance', sa.Float(), nullable=True),
+    sa.Column('content_hash', sa.String(length=32), nullable=True),
+    sa.PrimaryKeyConstraint('realm_id', 'id')
+    )
+    op.create_table('items',
+    sa.Column('realm_id', sa.String(), nullable=False),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=True),
+    sa.Column('sku', sa.String(), nullable=True),
+    sa.Column('item_type', sa.String(), nullable=True),
+    sa.Column('active', sa.Boolean(), nullable=True),
+    sa.Column('unit_price', sa.Float(), nullable=True),
+    sa.Column('purchase_cost', sa.Float(), nullable=True),
+    sa.Column('qty_on_hand', sa.Float(), nullable=True),
+    sa.Column('income_account_id', sa.Integer(), nullable=True),
+    sa.Column('expense_account_id', sa.Integer(), nullable=True),
+    sa.Column('content_hash', sa.String(length=32), nullable=True),
+    sa.PrimaryKeyConstraint('realm_id', 'id')
+    )
+    op.create_table('invoices',
+    sa.Column('realm_id', sa.String(), nullable=False),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('doc_number', sa.String(), nullable=True),
+    sa.Column('txn_date', sa.Date(), nullable=True),
+    sa.Column('due_date', sa.Date(), nullable=True),
+    sa.Column('customer_id', sa.Integer(), nullable=True),
+    sa.Column('currency', sa.String(), nullable=True),
+    sa.Column('total_amount', sa.Float(), nullable=True),
+    sa.Column('balance', sa.Float(), nullable=True),
+    sa.Column('content_hash', sa.String(length=32), nullable=True),
+    sa.PrimaryKeyConstraint('realm_id', 'id')
+    )
+    op.create_index('ix_invoices_realm_id_customer_id', 'invoices', ['realm_id', 'customer_id'], unique=False)
+    op.create_table('bills',
+    sa.Column('realm_id', sa.String(), nullable=False),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('doc_number', sa.String(), nullable=True),
+    sa.Column('txn_date', sa.Date(), nullable=True),
+    sa.Column('due_date', sa.Date(), nullable=True),
+    sa.Column('vendor_id', sa.Integer(), nullable=True),
+    sa.Column('currency', sa.String(), nullable=True),
+    sa.Column('total_amount', sa.Float(), nullable=True),
+    sa.Column('balance', sa.Float(), nullable=True),
+    sa.Column('content_hash', sa.String(length=32), nullable=True),
+    sa.PrimaryKeyConstraint('realm_id', 'id')
+    )
+    op.create_index('ix_bills_realm_id_vendor_id', 'bills', ['realm_id', 'vendor_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_bills_realm_id_vendor_id', table_name='bills')
+    op.drop_table('bills')
+    op.drop_index('ix_invoices_realm_id_customer_id', table_name='invoices')
+    op.drop_table('invoices')
+    op.drop_table('items')
+    op.drop_table('vendors')
+    op.drop_table('customers')
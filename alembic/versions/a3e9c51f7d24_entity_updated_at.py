@@ -0,0 +1,33 @@
+"""entity updated_at
+
+Revision ID: a3e9c51f7d24
+Revises: 7e2b5d9c0a43
+Create Date: 2026-10-18 16:05:41.208337
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3e9c51f7d24'
+down_revision: Union[str, None] = '7e2b5d9c0a43'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ('accounts', 'customers', 'vendors', 'items', 'invoices', 'bills')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Existing rows start without a time, which full syncs treat as written before any walk started.
+    for table in TABLES:
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in TABLES:
+        op.drop_column(table, 'updated_at')
@@ -0,0 +1,54 @@
+"""sync runs
+
+Revision ID: b41e7c95d2a8
+Revises: 3f8c2d6a9b17
+Create Date: 2026-10-18 13:02:51.640338
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b41e7c95d2a8'
+down_revision: Union[str, None] = '3f8c2d6a9b17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('sync_runs',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('realm_id', sa.String(), nullable=False),
+    sa.Column('entity', sa.String(), nullable=False),
+    sa.Column('trigger', sa.String(), nullable=False),
+    sa.Column('full', sa.Boolean(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('error', sa.String(), nullable=True),
+    sa.Column('started_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('duration_seconds', sa.Float(), nullable=True),
+    sa.Column('fetch_seconds', sa.Float(), nullable=False),
+    sa.Column('parse_seconds', sa.Float(), nullable=False),
+    sa.Column('write_seconds', sa.Float(), nullable=False),
+    sa.Column('hierarchy_seconds', sa.Float(), nullable=False),
+    sa.Column('pages', sa.Integer(), nullable=False),
+    sa.Column('bytes_downloaded', sa.BigInteger(), nullable=False),
+    sa.Column('rows_fetched', sa.Integer(), nullable=False),
+    sa.Column('rows_inserted', sa.Integer(), nullable=False),
+    sa.Column('rows_updated', sa.Integer(), nullable=False),
+    sa.Column('rows_unchanged', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_sync_runs_started_at', 'sync_runs', [sa.text('started_at DESC')], unique=False)
+    op.create_index('ix_sync_runs_realm_id_started_at', 'sync_runs', ['realm_id', sa.text('started_at DESC')], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_sync_runs_realm_id_started_at', table_name='sync_runs')
+    op.drop_index('ix_sync_runs_started_at', table_name='sync_runs')
+    op.drop_table('sync_runs')
@@ -0,0 +1,51 @@
+"""account paths
+
+Revision ID: d5e1f0a3c6b2
+Revises: 9c41d2e87b06
+Create Date: 2026-10-18 11:20:45.902113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5e1f0a3c6b2'
+down_revision: Union[str, None] = '9c41d2e87b06'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('accounts', sa.Column('path', sa.String(), nullable=True))
+    op.add_column('accounts', sa.Column('depth', sa.Integer(), nullable=True))
+    op.create_index(
+        'ix_accounts_realm_id_path', 'accounts', ['realm_id', 'path'],
+        unique=False, postgresql_ops={'path': 'text_pattern_ops'},
+    )
+    # Backfill the hierarchy of every realm; afterwards syncs keep it up to date.
+    op.execute("""
+        WITH RECURSIVE account_paths(realm_id, id, path, depth) AS (
+            SELECT a.realm_id, a.id, '/' || a.id || '/', 0
+            FROM accounts a
+            WHERE a.parent_id IS NULL
+               OR NOT EXISTS (SELECT 1 FROM accounts p WHERE p.realm_id = a.realm_id AND p.id = a.parent_id)
+            UNION ALL
+            SELECT c.realm_id, c.id, ap.path || c.id || '/', ap.depth + 1
+            FROM accounts c
+            JOIN account_paths ap ON c.realm_id = ap.realm_id AND c.parent_id = ap.id
+        )
+        UPDATE accounts SET path = account_paths.path, depth = account_paths.depth
+        FROM account_paths
+        WHERE accounts.realm_id = account_paths.realm_id AND accounts.id = account_paths.id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_accounts_realm_id_path', table_name='accounts')
+    op.drop_column('accounts', 'depth')
+    op.drop_column('accounts', 'path')
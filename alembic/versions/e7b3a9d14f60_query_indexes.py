@@ -0,0 +1,47 @@
+"""query indexes
+
+Revision ID: e7b3a9d14f60
+Revises: d5e1f0a3c6b2
+Create Date: 2026-10-18 12:05:17.334820
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7b3a9d14f60'
+down_revision: Union[str, None] = 'd5e1f0a3c6b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_accounts_realm_id_classification_active_id', 'accounts',
+        ['realm_id', 'classification', 'active', 'id'], unique=False,
+    )
+    op.create_index(
+        'ix_accounts_realm_id_active_id', 'accounts', ['realm_id', 'id'],
+        unique=False, postgresql_where=sa.text('active'),
+    )
+    op.create_index(
+        'ix_accounts_realm_id_classification_balance', 'accounts', ['realm_id', 'classification'],
+        unique=False, postgresql_include=['current_balance'],
+    )
+    op.create_index('ix_accounts_realm_id_parent_id', 'accounts', ['realm_id', 'parent_id'], unique=False)
+    op.create_index('ix_tokens_created_at', 'tokens', [sa.text('created_at DESC')], unique=False)
+    op.create_index('ix_tokens_realm_id_created_at', 'tokens', ['realm_id', sa.text('created_at DESC')], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_tokens_realm_id_created_at', table_name='tokens')
+    op.drop_index('ix_tokens_created_at', table_name='tokens')
+    op.drop_index('ix_accounts_realm_id_parent_id', table_name='accounts')
+    op.drop_index('ix_accounts_realm_id_classification_balance', table_name='accounts')
+    op.drop_index('ix_accounts_realm_id_active_id', table_name='accounts')
+    op.drop_index('ix_accounts_realm_id_classification_active_id', table_name='accounts')
@@ -0,0 +1,301 @@
+"""
+Load test: sync throughput, Celery task throughput and /accounts/* latency against the fake QBO server.
+
+Usage:
+    python -m benchmarks.bench_load --accounts 1000,10000,50000 --output results.json
+    python -m benchmarks.bench_load --scenarios api --concurrency 32 --requests 2000 --output results.json
+    python -m benchmarks.compare before.json after.json
+
+Scenarios (all run by default):
+- sync    sync_qbo_accounts once per chart-of-accounts size in --accounts: a full sync, then an incremental
+          one that finds nothing new. The seeded token is unknown to the fake server, so the first call
+          of every realm takes the 401 -> refresh path.
+- celery  --tasks sync_qbo_entity tasks of separate realms, run in-process --concurrency at a time,
+          the way a worker with that CELERY_WORKER_CONCURRENCY runs them.
+- api     the app served by uvicorn, hit with --requests requests per endpoint from --concurrency
+          clients: /accounts/search, /accounts/summary, /accounts/tree and /accounts/export.
+
+The fake QBO server can add latency (--latency-ms), throttle each realm like QBO does
+(--throttle-per-minute, --throttle-rate) and expire access tokens (--token-requests).
+The app is pointed at it through QBO_BASE_URL and ENVIRONMENT before it is imported; every other
+setting (QBO_PAGE_CONCURRENCY, QBO_BATCH_ENABLED, QBO_BATCH_PAGES, rate limits, Redis, ...) comes from
+the environment as usual. Rows are written to --database-url under realm ids starting with "bench-", which are deleted
+first; use a throwaway database.
+
+Results are written as JSON: the parameters, the commit, and one object per scenario, so runs of two
+commits can be diffed with benchmarks.compare.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+import httpx
+from benchmarks.fake_qbo import FakeQBOConfig, FakeQBOServer, ThreadedServer
+
+REALM_PREFIX = "bench-"
+API_PATHS = {
+    "search": "/accounts/search?realm_id={realm_id}&limit=100",
+    "summary": "/accounts/summary?realm_id={realm_id}",
+    "tree": "/accounts/tree?realm_id={realm_id}",
+    "export": "/accounts/export?realm_id={realm_id}",
+}
+
+
+def configure_app(qbo: FakeQBOServer, database_url: str) -> None:
+    """
+    Points the app's settings at the fake server and the benchmark database. Must run before any app import.
+    """
+    os.environ.update(
+        QBO_BASE_URL=qbo.base_url,
+        ENVIRONMENT=qbo.discovery_url,
+        DATABASE_URL_LOCAL=database_url,
+        USE_DOCKER="false",
+        USE_LAPTOP="false",
+    )
+    os.environ.setdefault("CLIENT_ID", "bench")
+    os.environ.setdefault("CLIENT_SECRET", "bench")
+
+
+def reset_database() -> None:
+    """
+    Creates the tables and removes the rows of earlier benchmark realms.
+    """
+    import importlib
+    import pkgutil
+    import models
+    from database.base import Base
+    from database.session import engine, SessionLocal
+
+    for module in pkgutil.iter_modules(models.__path__):
+        importlib.import_module(f"models.{module.name}")
+    Base.metadata.create_all(engine)
+    with SessionLocal() as db:
+        for table in reversed(Base.metadata.sorted_tables):
+            if "realm_id" in table.c:
+                db.execute(table.delete().where(table.c.realm_id.startswith(REALM_PREFIX)))
+        db.commit()
+
+
+def seed_realm(qbo: FakeQBOServer, realm_id: str, accounts: int) -> None:
+    """
+    Gives the realm `accounts` accounts on the fake server and a token the server does not know yet.
+    """
+    from database.session import SessionLocal
+    from services.token_service import save_tokens_to_db
+
+    qbo.qbo.config.realm_accounts[realm_id] = accounts
+    with SessionLocal() as db:
+        save_tokens_to_db(db, {
+            "access_token": f"seed-{realm_id}", "refresh_token": f"seed-{realm_id}",
+            "expires_in": 3600, "realm_id": realm_id, "token_type": "Bearer",
+        })
+
+
+def percentiles(samples: list[float]) -> dict:
+    """
+    Returns count, mean and p50/p95/p99 of latency samples, in milliseconds.
+    """
+    if not samples:
+        return {"count": 0}
+    cuts = statistics.quantiles(samples, n=100, method="inclusive") if len(samples) > 1 else samples * 99
+    return {
+        "count": len(samples),
+        "mean_ms": round(statistics.fmean(samples) * 1000, 3),
+        "p50_ms": round(cuts[49] * 1000, 3),
+        "p95_ms": round(cuts[94] * 1000, 3),
+        "p99_ms": round(cuts[98] * 1000, 3),
+    }
+
+
+def server_delta(qbo: FakeQBOServer, before: dict) -> dict:
+    after = qbo.qbo.stats()
+    return {key: after.get(key, 0) - before.get(key, 0) for key in sorted(after)}
+
+
+def last_sync_run(realm_id: str) -> dict:
+    from database.session import SessionLocal
+    from models.sync_run import SyncRun
+
+    with SessionLocal() as db:
+        run = db.query(SyncRun).filter(SyncRun.realm_id == realm_id).order_by(SyncRun.id.desc()).first()
+        return {
+            name: round(getattr(run, name), 4)
+            for name in ("fetch_seconds", "parse_seconds", "write_seconds", "hierarchy_seconds")
+        } | {name: getattr(run, name) for name in ("pages", "bytes_downloaded", "rows_inserted", "rows_unchanged")}
+
+
+def scenario_sync(qbo: FakeQBOServer, sizes: list[int]) -> list[dict]:
+    from database.session import SessionLocal
+    from services.quickbooks_service import sync_qbo_accounts
+
+    results = []
+    for size in sizes:
+        realm_id = f"{REALM_PREFIX}sync-{size}"
+        seed_realm(qbo, realm_id, size)
+        result = {"accounts": size}
+        for phase, full in (("full", True), ("incremental", False)):
+            before = qbo.qbo.stats()
+            with SessionLocal() as db:
+                started = time.perf_counter()
+                rows = asyncio.run(sync_qbo_accounts(db, realm_id=realm_id, full=full))
+                elapsed = time.perf_counter() - started
+            assert len(rows) == size, f"{realm_id}: synced {len(rows)} of {size} accounts"
+            result[phase] = {
+                "seconds": round(elapsed, 4),
+                "accounts_per_second": round(size / elapsed, 1),
+                "run": last_sync_run(realm_id),
+                "server": server_delta(qbo, before),
+            }
+        print(f"sync      {size:>8} accounts: full {result['full']['seconds']:.2f}s, incremental {result['incremental']['seconds']:.2f}s")
+        results.append(result)
+    return results
+
+
+def scenario_celery(qbo: FakeQBOServer, accounts: int, tasks: int, concurrency: int) -> dict:
+    from tasks.tasks import celery_app, sync_qbo_entity
+
+    if not os.getenv("REDIS_HOST"):
+        # Eager tasks still hand their result to the backend, which is Redis in the app's settings.
+        celery_app.conf.result_backend = "cache+memory://"
+    realms = [f"{REALM_PREFIX}celery-{i}" for i in range(tasks)]
+    for realm_id in realms:
+        seed_realm(qbo, realm_id, accounts)
+
+    def run(realm_id: str) -> tuple[float, dict]:
+        started = time.perf_counter()
+        result = sync_qbo_entity.apply(args=(realm_id, "Account"), kwargs={"full": True}).get()
+        return time.perf_counter() - started, result
+
+    before = qbo.qbo.stats()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(run, realms))
+    elapsed = time.perf_counter() - started
+    errors = [result["error"] for _, result in outcomes if "error" in result]
+    print(f"celery    {tasks} tasks x {accounts} accounts, {concurrency} at a time: {elapsed:.2f}s, {len(errors)} failed")
+    return {
+        "accounts": accounts,
+        "tasks": tasks,
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 4),
+        "accounts_per_second": round(accounts * (tasks - len(errors)) / elapsed, 1),
+        "task_latency": percentiles([seconds for seconds, _ in outcomes]),
+        "errors": len(errors),
+        "server": server_delta(qbo, before),
+    }
+
+
+async def _drive(base_url: str, path: str, requests: int, concurrency: int) -> tuple[list[float], int, float]:
+    latencies: list[float] = []
+    errors = 0
+    remaining = iter(range(requests))
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        async def worker():
+            nonlocal errors
+            for _ in remaining:
+                started = time.perf_counter()
+                response = await client.get(path, headers={"Accept-Encoding": "gzip"})
+                latencies.append(time.perf_counter() - started)
+                errors += response.status_code != 200
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return latencies, errors, time.perf_counter() - started
+
+
+def scenario_api(qbo: FakeQBOServer, accounts: int, requests: int, concurrency: int, port: int) -> dict:
+    from database.session import SessionLocal
+    from services.quickbooks_service import sync_qbo_accounts
+    from main import app
+
+    realm_id = f"{REALM_PREFIX}api-{accounts}"
+    seed_realm(qbo, realm_id, accounts)
+    with SessionLocal() as db:
+        asyncio.run(sync_qbo_accounts(db, realm_id=realm_id, full=True))
+
+    results = {"accounts": accounts, "requests": requests, "concurrency": concurrency, "endpoints": {}}
+    with ThreadedServer(app, port=port) as api:
+        for name, path in API_PATHS.items():
+            latencies, errors, elapsed = asyncio.run(_drive(api.base_url, path.format(realm_id=realm_id), requests, concurrency))
+            results["endpoints"][name] = {
+                **percentiles(latencies),
+                "requests_per_second": round(requests / elapsed, 1),
+                "errors": errors,
+            }
+            stats = results["endpoints"][name]
+            print(f"api       {name:<8} {stats['requests_per_second']:>8.1f} req/s, p50 {stats['p50_ms']:.1f} ms, p99 {stats['p99_ms']:.1f} ms")
+    return results
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run(args: argparse.Namespace) -> dict:
+    sizes = [int(size) for size in args.accounts.split(",")]
+    scenarios = set(args.scenarios.split(","))
+    config = FakeQBOConfig(
+        accounts=sizes[0], latency_ms=args.latency_ms, throttle_per_minute=args.throttle_per_minute,
+        throttle_rate=args.throttle_rate, token_requests=args.token_requests,
+    )
+    with FakeQBOServer(config, port=args.qbo_port) as qbo:
+        configure_app(qbo, args.database_url)
+        reset_database()
+        from database.session import engine
+        import core.config as app_config
+
+        results = {
+            "meta": {
+                "commit": git_commit(),
+                "started_at": datetime.now(timezone.utc).isoformat(),
+                "python": platform.python_version(),
+                "database": engine.dialect.name,
+                "settings": {
+                    name: getattr(app_config, name) for name in (
+                        "QBO_PAGE_SIZE", "QBO_PAGE_CONCURRENCY", "QBO_BATCH_ENABLED", "QBO_BATCH_PAGES", "QBO_RATE_LIMIT_PER_MINUTE",
+                        "QBO_CONCURRENCY_MAX", "UPSERT_BATCH_SIZE", "SNAPSHOT_ENABLED", "CACHE_ENABLED", "REDIS_HOST",
+                    )
+                },
+                "args": vars(args),
+            },
+        }
+        if "sync" in scenarios:
+            results["sync"] = scenario_sync(qbo, sizes)
+        if "celery" in scenarios:
+            results["celery"] = scenario_celery(qbo, sizes[0], args.tasks, args.concurrency)
+        if "api" in scenarios:
+            results["api"] = scenario_api(qbo, sizes[-1], args.requests, args.concurrency, args.api_port)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default="sync,celery,api", help="comma separated: sync, celery, api")
+    parser.add_argument("--accounts", default="1000,10000", help="comma separated chart-of-accounts sizes")
+    parser.add_argument("--concurrency", type=int, default=8, help="parallel Celery tasks / API clients")
+    parser.add_argument("--tasks", type=int, default=8, help="Celery tasks (one realm each)")
+    parser.add_argument("--requests", type=int, default=500, help="requests per API endpoint")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--throttle-per-minute", type=int, default=None)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--token-requests", type=int, default=0)
+    parser.add_argument("--database-url", default="sqlite:///bench.db")
+    parser.add_argument("--qbo-port", type=int, default=8099)
+    parser.add_argument("--api-port", type=int, default=8098)
+    parser.add_argument("--output", help="write the results here as JSON")
+    args = parser.parse_args()
+    results = run(args)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"results written to {args.output}")
@@ -0,0 +1,105 @@
+"""
+Benchmark: request throughput of the previous BaseHTTPMiddleware request logger vs. the pure ASGI one.
+
+Usage:
+    python -m benchmarks.bench_middleware --requests 5000
+
+Each variant wraps the same minimal FastAPI app and is driven in-process through
+httpx's ASGI transport, so the numbers isolate middleware overhead. Log records are
+discarded, so neither variant pays for log shipping.
+"""
+import argparse
+import asyncio
+import logging
+import time
+import httpx
+from fastapi import FastAPI, HTTPException
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import StreamingResponse
+from middlewares.logger_middleware import RequestLoggerMiddleware, logger
+
+
+class LegacyRequestLoggerMiddleware(BaseHTTPMiddleware):
+    """
+    The previous RequestLoggerMiddleware: logs twice per request and re-buffers error bodies.
+    """
+
+    async def dispatch(self, request: Request, call_next):
+        start_time = time.time()
+        logger.info(f"⬅️ Request: {request.method} {request.url.path}")
+        response = await call_next(request)
+        formatted_time = f"{(time.time() - start_time) * 1000:.2f}ms"
+        if response.status_code not in {200, 201}:
+            body = b""
+            async for chunk in response.body_iterator:
+                body += chunk
+            logger.warning(
+                f"⚠️ Error Response: {request.method} {request.url.path} "
+                f"Status: {response.status_code} Time: {formatted_time} "
+                f"Body: {body.decode('utf-8', errors='ignore')}"
+            )
+            return StreamingResponse(
+                content=iter([body]),
+                status_code=response.status_code,
+                headers=dict(response.headers),
+                media_type=response.media_type,
+            )
+        logger.info(
+            f"➡️ Response: {request.method} {request.url.path} "
+            f"Status: {response.status_code} Time: {formatted_time}"
+        )
+        return response
+
+
+def make_app(middleware) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/ok")
+    def ok():
+        return {"status": "ok"}
+
+    @app.get("/missing")
+    def missing():
+        raise HTTPException(status_code=404, detail="x" * 4096)
+
+    if middleware is not None:
+        app.add_middleware(middleware)
+    return app
+
+
+async def requests_per_second(app: FastAPI, path: str, count: int, concurrency: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker(n: int):
+            for _ in range(n):
+                await client.get(path)
+
+        await worker(10)  # warm up
+        start = time.perf_counter()
+        await asyncio.gather(*[worker(count // concurrency) for _ in range(concurrency)])
+        return count / (time.perf_counter() - start)
+
+
+def run(count: int, concurrency: int) -> None:
+    logger.handlers = [logging.NullHandler()]
+    variants = [
+        ("no middleware", None),
+        ("BaseHTTPMiddleware", LegacyRequestLoggerMiddleware),
+        ("pure ASGI", RequestLoggerMiddleware),
+    ]
+
+    print(f"{'middleware':<22}{'200 req/s':>12}{'404 req/s':>12}")
+    for name, middleware in variants:
+        app = make_app(middleware)
+        ok = asyncio.run(requests_per_second(app, "/ok", count, concurrency))
+        missing = asyncio.run(requests_per_second(app, "/missing", count, concurrency))
+        print(f"{name:<22}{ok:>12.0f}{missing:>12.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+    run(args.requests, args.concurrency)
@@ -0,0 +1,93 @@
+"""
+Benchmark: serializing an account list the previous way (ORM objects validated into AccountOut
+and walked by FastAPI's jsonable_encoder) vs. Row tuples encoded by FastJSONResponse.
+
+Usage:
+    python -m benchmarks.bench_serialization --accounts 10000
+
+Each variant is a route of a minimal FastAPI app reading the same in-memory SQLite table,
+driven in-process through httpx's ASGI transport, so the numbers cover query, serialization
+and response rendering. FastJSONResponse is measured with orjson (when installed) and with
+the stdlib fallback.
+"""
+import argparse
+import asyncio
+import time
+from typing import List
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from database.base import Base
+from models.account import Account
+from schemas.account import AccountOut
+from utils import fast_json
+from utils.fast_json import FastJSONResponse, rows_to_dicts
+from benchmarks.bench_account_upsert import make_payload, REALM_ID
+from services.quickbooks_service import account_row_from_qbo
+
+FIELDS = list(AccountOut.model_fields)
+
+
+def make_app(count: int) -> FastAPI:
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=[Account.__table__])
+    session_factory = sessionmaker(bind=engine)
+    with session_factory() as db:
+        db.bulk_insert_mappings(Account, [account_row_from_qbo(acc, REALM_ID) for acc in make_payload(count)])
+        db.commit()
+
+    app = FastAPI()
+
+    @app.get("/orm", response_model=List[AccountOut])
+    def orm_accounts():
+        with session_factory() as db:
+            return db.query(Account).filter(Account.realm_id == REALM_ID).all()
+
+    @app.get("/rows", response_class=FastJSONResponse)
+    def row_accounts():
+        with session_factory() as db:
+            rows = db.query(*[getattr(Account, name) for name in FIELDS]).filter(Account.realm_id == REALM_ID).all()
+        return FastJSONResponse(rows_to_dicts(rows, FIELDS))
+
+    return app
+
+
+async def seconds_per_request(app: FastAPI, path: str, count: int) -> tuple[float, int]:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        size = len((await client.get(path)).content)  # warm up
+        start = time.perf_counter()
+        for _ in range(count):
+            await client.get(path)
+        return (time.perf_counter() - start) / count, size
+
+
+def run(accounts: int, requests: int) -> None:
+    app = make_app(accounts)
+    orjson = fast_json.orjson
+    variants = [("AccountOut + jsonable_encoder", "/orm", orjson)]
+    if orjson is not None:
+        variants.append(("Row tuples + orjson", "/rows", orjson))
+    variants.append(("Row tuples + stdlib json", "/rows", None))
+
+    print(f"{accounts} accounts, {requests} requests per variant")
+    print(f"{'variant':<32}{'ms/request':>12}{'bytes':>10}{'speedup':>10}")
+    baseline = None
+    for name, path, encoder in variants:
+        fast_json.orjson = encoder
+        try:
+            elapsed, size = asyncio.run(seconds_per_request(app, path, requests))
+        finally:
+            fast_json.orjson = orjson
+        baseline = baseline or elapsed
+        print(f"{name:<32}{elapsed * 1000:>12.1f}{size:>10}{baseline / elapsed:>9.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--accounts", type=int, default=10000)
+    parser.add_argument("--requests", type=int, default=20)
+    args = parser.parse_args()
+    run(args.accounts, args.requests)
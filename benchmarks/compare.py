@@ -0,0 +1,64 @@
+"""
+Compares two result files of benchmarks.bench_load, metric by metric.
+
+Usage:
+    python -m benchmarks.compare before.json after.json
+    python -m benchmarks.compare before.json after.json --threshold 10
+
+Every numeric value is listed with its relative change; changes beyond --threshold percent are
+marked with "!". Lists of sync results are matched by their chart-of-accounts size.
+"""
+import argparse
+import json
+from typing import Any
+
+
+def flatten(value: Any, prefix: str = "") -> dict[str, float]:
+    """
+    Maps the dotted path of every numeric leaf (except under "meta") to its value.
+    """
+    if isinstance(value, dict):
+        items = value.items()
+    elif isinstance(value, list):
+        # Sync results are one entry per size; key them by it so runs with other sizes still line up.
+        items = ((str(item.get("accounts", i)) if isinstance(item, dict) else str(i), item) for i, item in enumerate(value))
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        return {prefix: value}
+    else:
+        return {}
+    flat = {}
+    for key, item in items:
+        if not prefix and key == "meta":
+            continue
+        flat.update(flatten(item, f"{prefix}.{key}" if prefix else key))
+    return flat
+
+
+def compare(before: dict, after: dict, threshold: float) -> list[str]:
+    old, new = flatten(before), flatten(after)
+    lines = [
+        f"before {before.get('meta', {}).get('commit', '?')[:12]}  after {after.get('meta', {}).get('commit', '?')[:12]}",
+        f"{'metric':<60}{'before':>14}{'after':>14}{'change':>10}",
+    ]
+    for key in sorted(old.keys() | new.keys()):
+        a, b = old.get(key), new.get(key)
+        if a is None or b is None or a == 0:
+            change, mark = "", ""
+        else:
+            percent = (b - a) / abs(a) * 100
+            change, mark = f"{percent:+.1f}%", "!" if abs(percent) >= threshold else ""
+        lines.append(f"{key:<60}{'-' if a is None else a:>14}{'-' if b is None else b:>14}{change:>10} {mark}".rstrip())
+    return lines
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument("--threshold", type=float, default=10.0, help="percent change marked with !")
+    args = parser.parse_args()
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+    print("\n".join(compare(before, after, args.threshold)))
@@ -0,0 +1,305 @@
+"""
+A local stand-in for the QBO accounting API and Intuit's OAuth endpoints, for benchmarks.
+
+Usage:
+    python -m benchmarks.fake_qbo --accounts 20000 --port 8099 --latency-ms 50 --throttle-per-minute 500
+
+Point the app at it with
+    QBO_BASE_URL=http://127.0.0.1:8099 ENVIRONMENT=http://127.0.0.1:8099/.well-known/openid_configuration
+
+It serves:
+- GET  /v3/company/{realm_id}/query   STARTPOSITION/MAXRESULTS paging, the LastUpdatedTime filter, and QBO's
+                                      active-only default unless the query has `Active IN (true, false)`
+- POST /v3/company/{realm_id}/batch   up to 30 Query operations per request
+- GET  /.well-known/openid_configuration and POST /oauth2/v1/tokens/bearer, so intuitlib refreshes work
+
+Every realm holds synthetic data: `accounts` accounts (or its size in `realm_accounts`) with a
+parent/child hierarchy, plus as many rows of every other entity. Unknown access tokens get a 401 (so the first call
+with a seeded token exercises the refresh path), as does a token that has served `token_requests`
+requests. Requests above `throttle_per_minute` per realm, and a random `throttle_rate` share of
+them, get a 429 with Retry-After, like QBO's own throttling.
+"""
+import argparse
+import asyncio
+import bisect
+import random
+import re
+import secrets
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+_QUERY = re.compile(
+    r"select \* from (?P<entity>\w+)"
+    r"(?: where (?P<conditions>.+?))?"
+    r"(?: ORDERBY Id)?"
+    r"(?: STARTPOSITION (?P<start>\d+) MAXRESULTS (?P<max>\d+))?$",
+    re.IGNORECASE,
+)
+_ALL_ROWS = re.compile(r"Active IN \(true, false\)", re.IGNORECASE)
+_SINCE = re.compile(r"Metadata\.LastUpdatedTime >= '(?P<since>[^']+)'", re.IGNORECASE)
+_EPOCH = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+@dataclass
+class FakeQBOConfig:
+    accounts: int = 1000
+    depth: int = 4  # levels of the account hierarchy
+    latency_ms: float = 0.0  # added to every API response
+    throttle_per_minute: Optional[int] = None  # per realm; None never throttles by rate
+    throttle_rate: float = 0.0  # share of requests answered with a 429 at random
+    retry_after: float = 1.0  # seconds sent in Retry-After
+    token_requests: int = 0  # requests an access token serves before it gets a 401; 0 = unlimited
+    seed: int = 0
+    realm_accounts: dict[str, int] = field(default_factory=dict)  # per-realm sizes overriding `accounts`
+
+
+def make_accounts(count: int, depth: int = 4, seed: int = 0) -> list[dict]:
+    """
+    Returns `count` QBO Account payloads: a fifth are top-level, the others hang below an earlier
+    account that is less than `depth` levels deep. Each has a distinct MetaData.LastUpdatedTime.
+    """
+    rng = random.Random(seed)
+    levels: dict[int, int] = {}
+    accounts = []
+    for i in range(1, count + 1):
+        acc = {
+            "Id": str(i),
+            "Name": f"Account {i}",
+            "Classification": rng.choice(["Asset", "Liability", "Equity", "Revenue", "Expense"]),
+            "CurrencyRef": {"value": rng.choice(["USD", "USD", "USD", "EUR"])},
+            "AccountType": rng.choice(["Bank", "Expense", "Income", "Other Current Asset"]),
+            "Active": rng.random() > 0.05,
+            "CurrentBalance": round(rng.uniform(-10_000, 10_000), 2),
+            "MetaData": {"LastUpdatedTime": (_EPOCH + timedelta(seconds=i)).isoformat()},
+        }
+        levels[i] = 0
+        parents = [p for p in range(max(1, i - 50), i) if levels[p] < depth - 1]
+        if parents and rng.random() > 0.2:
+            parent = rng.choice(parents)
+            acc["SubAccount"] = True
+            acc["ParentRef"] = {"value": str(parent)}
+            levels[i] = levels[parent] + 1
+        accounts.append(acc)
+    return accounts
+
+
+def make_rows(entity: str, count: int) -> list[dict]:
+    """
+    Returns `count` minimal payloads of a non-Account entity.
+    """
+    rows = []
+    for i in range(1, count + 1):
+        row = {
+            "Id": str(i),
+            "Active": True,
+            "MetaData": {"LastUpdatedTime": (_EPOCH + timedelta(seconds=i)).isoformat()},
+        }
+        if entity in ("Customer", "Vendor"):
+            row["DisplayName"] = f"{entity} {i}"
+        elif entity == "Item":
+            row.update(Name=f"Item {i}", Type="Service", UnitPrice=10.0)
+        elif entity in ("Invoice", "Bill"):
+            ref = "CustomerRef" if entity == "Invoice" else "VendorRef"
+            row.update(DocNumber=str(i), TxnDate="2025-01-01", TotalAmt=100.0, **{ref: {"value": "1"}})
+        rows.append(row)
+    return rows
+
+
+class FakeQBO:
+    """
+    The server's data, tokens and counters. `stats()` reports what clients did to it.
+    """
+
+    def __init__(self, config: FakeQBOConfig):
+        self.config = config
+        self.rng = random.Random(config.seed)
+        # (entity, size) -> rows and their LastUpdatedTimes, both in time order.
+        self.data: dict[tuple[str, int], tuple[list[dict], list[datetime]]] = {}
+        self.tokens: dict[str, int] = {}
+        self.windows: dict[str, tuple[float, int]] = {}
+        self.counts: Counter = Counter()
+
+    def rows(self, entity: str, realm_id: str) -> tuple[list[dict], list[datetime]]:
+        size = self.config.realm_accounts.get(realm_id, self.config.accounts)
+        key = (entity, size)
+        if key not in self.data:
+            if entity == "Account":
+                rows = make_accounts(size, self.config.depth, self.config.seed)
+            else:
+                rows = make_rows(entity, size)
+            self.data[key] = rows, [datetime.fromisoformat(row["MetaData"]["LastUpdatedTime"]) for row in rows]
+        return self.data[key]
+
+    def issue_token(self) -> str:
+        token = secrets.token_hex(16)
+        self.tokens[token] = 0
+        self.counts["tokens_issued"] += 1
+        return token
+
+    def check(self, realm_id: str, authorization: str) -> Optional[JSONResponse]:
+        """
+        Returns the 401 or 429 response the request gets, or None when it is served.
+        """
+        token = authorization.removeprefix("Bearer ")
+        served = self.tokens.get(token)
+        if served is None or (self.config.token_requests and served >= self.config.token_requests):
+            self.tokens.pop(token, None)
+            self.counts["401"] += 1
+            return JSONResponse({"fault": {"error": [{"message": "AuthenticationFailed", "code": "3200"}], "type": "AUTHENTICATION"}}, 401)
+        self.tokens[token] = served + 1
+
+        now = time.monotonic()
+        started, count = self.windows.get(realm_id, (now, 0))
+        if now - started >= 60:
+            started, count = now, 0
+        self.windows[realm_id] = (started, count + 1)
+        limit = self.config.throttle_per_minute
+        if (limit and count >= limit) or self.rng.random() < self.config.throttle_rate:
+            self.counts["429"] += 1
+            return JSONResponse(
+                {"Fault": {"Error": [{"Message": "ThrottleExceeded", "code": "003001"}], "type": "SERVICE"}},
+                429,
+                headers={"Retry-After": str(self.config.retry_after)},
+            )
+        return None
+
+    def run_query(self, realm_id: str, query: str) -> dict:
+        match = _QUERY.match(query.strip())
+        if match is None:
+            return {"Fault": {"Error": [{"Message": f"QueryParserError: {query}"}], "type": "ValidationFault"}}
+        entity = match["entity"]
+        rows, times = self.rows(entity, realm_id)
+        conditions = re.split(r" and ", match["conditions"], flags=re.IGNORECASE) if match["conditions"] else []
+        all_rows = False
+        for condition in conditions:
+            since = _SINCE.fullmatch(condition)
+            if since:
+                rows = rows[bisect.bisect_left(times, datetime.fromisoformat(since["since"])):]
+            elif _ALL_ROWS.fullmatch(condition):
+                all_rows = True
+            else:
+                return {"Fault": {"Error": [{"Message": f"QueryParserError: {query}"}], "type": "ValidationFault"}}
+        if not all_rows:
+            # Like QBO, leave inactive rows out unless the query asks for them.
+            rows = [row for row in rows if row.get("Active", True)]
+        start = int(match["start"] or 1)
+        max_results = int(match["max"] or 1000)
+        page = rows[start - 1:start - 1 + max_results]
+        self.counts["rows"] += len(page)
+        return {"QueryResponse": {entity: page, "startPosition": start, "maxResults": len(page)}}
+
+    def stats(self) -> dict:
+        return dict(self.counts)
+
+
+def create_app(server: FakeQBO) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/.well-known/openid_configuration")
+    def discovery(request: Request):
+        base = str(request.base_url).rstrip("/")
+        return {
+            "issuer": base,
+            "authorization_endpoint": f"{base}/connect/oauth2",
+            "token_endpoint": f"{base}/oauth2/v1/tokens/bearer",
+            "revocation_endpoint": f"{base}/oauth2/v1/tokens/revoke",
+            "jwks_uri": f"{base}/oauth2/v1/keys",
+            "userinfo_endpoint": f"{base}/v1/openid_connect/userinfo",
+        }
+
+    @app.post("/oauth2/v1/tokens/bearer")
+    def issue_token():
+        server.counts["refreshes"] += 1
+        return {
+            "access_token": server.issue_token(),
+            "refresh_token": secrets.token_hex(16),
+            "token_type": "bearer",
+            "expires_in": 3600,
+            "x_refresh_token_expires_in": 8726400,
+        }
+
+    async def respond(realm_id: str, request: Request, endpoint: str, build) -> JSONResponse:
+        server.counts[f"{endpoint}_requests"] += 1
+        if server.config.latency_ms:
+            await asyncio.sleep(server.config.latency_ms / 1000)
+        rejected = server.check(realm_id, request.headers.get("authorization", ""))
+        if rejected is not None:
+            return rejected
+        return JSONResponse({**await build(), "time": datetime.now(timezone.utc).isoformat()})
+
+    @app.get("/v3/company/{realm_id}/query")
+    async def query(realm_id: str, request: Request):
+        async def build():
+            return server.run_query(realm_id, request.query_params["query"])
+        return await respond(realm_id, request, "query", build)
+
+    @app.post("/v3/company/{realm_id}/batch")
+    async def batch(realm_id: str, request: Request):
+        async def build():
+            items = (await request.json())["BatchItemRequest"]
+            return {"BatchItemResponse": [{"bId": item["bId"], **server.run_query(realm_id, item["Query"])} for item in items]}
+        return await respond(realm_id, request, "batch", build)
+
+    return app
+
+
+class ThreadedServer:
+    """
+    Serves an ASGI app with uvicorn on a background thread: `with ThreadedServer(app) as server: ...`.
+    """
+
+    def __init__(self, app, host: str = "127.0.0.1", port: int = 8099):
+        self.base_url = f"http://{host}:{port}"
+        self._server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_level="warning"))
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        while not self._server.started:
+            if not self._thread.is_alive():
+                raise RuntimeError(f"Server could not start on {self.base_url}")
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.should_exit = True
+        self._thread.join()
+
+
+class FakeQBOServer(ThreadedServer):
+    """
+    A ThreadedServer of a FakeQBO; `qbo` holds its data and counters.
+    """
+
+    def __init__(self, config: FakeQBOConfig, host: str = "127.0.0.1", port: int = 8099):
+        self.qbo = FakeQBO(config)
+        super().__init__(create_app(self.qbo), host, port)
+
+    @property
+    def discovery_url(self) -> str:
+        return f"{self.base_url}/.well-known/openid_configuration"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--accounts", type=int, default=1000)
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--throttle-per-minute", type=int, default=None)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--token-requests", type=int, default=0)
+    args = parser.parse_args()
+    config = FakeQBOConfig(
+        accounts=args.accounts, depth=args.depth, latency_ms=args.latency_ms,
+        throttle_per_minute=args.throttle_per_minute, throttle_rate=args.throttle_rate, token_requests=args.token_requests,
+    )
+    uvicorn.run(create_app(FakeQBO(config)), host=args.host, port=args.port)
@@ -1,4 +1,5 @@
 import os
+import threading
 from dotenv import load_dotenv
 from intuitlib.client import AuthClient
 load_dotenv()
@@ -18,7 +19,40 @@ CLIENT_SECRET = os.getenv("CLIENT_SECRET")
 REDIRECT_URI = os.getenv("REDIRECT_URI")
 ENVIRONMENT = os.getenv("ENVIRONMENT", "sandbox")
 
-ACCOUNT_API_URL = "https://sandbox-quickbooks.api.intuit.com/v3/company/{realm_id}/query"
+QBO_BASE_URL = (
+    os.getenv("QBO_BASE_URL")
+    or ("https://quickbooks.api.intuit.com" if ENVIRONMENT.lower() in ("production", "prod") else "https://sandbox-quickbooks.api.intuit.com")
+).rstrip("/")  # accounting API host; benchmarks point it at benchmarks/fake_qbo.py
+QBO_QUERY_URL = QBO_BASE_URL + "/v3/company/{realm_id}/query"
+QBO_BATCH_URL = QBO_BASE_URL + "/v3/company/{realm_id}/batch"
+ACCOUNT_API_URL = QBO_QUERY_URL  # accounts were the first entity synced through the query endpoint
+QBO_SYNC_ENTITIES = [name.strip() for name in os.getenv("QBO_SYNC_ENTITIES", "Account,Customer,Vendor,Item,Invoice,Bill").split(",") if name.strip()]  # entities the scheduled sync fans out
+QBO_PAGE_SIZE = int(os.getenv("QBO_PAGE_SIZE", 1000))  # QBO caps MAXRESULTS at 1000
+QBO_PAGE_CONCURRENCY = int(os.getenv("QBO_PAGE_CONCURRENCY", 1))  # requests sent at once: /query pages, or /batch calls of QBO_BATCH_PAGES pages
+QBO_BATCH_ENABLED = os.getenv("QBO_BATCH_ENABLED", "true").lower() == "true"  # fetch the pages after the first through /batch calls
+QBO_BATCH_MAX_OPERATIONS = 30  # QBO rejects batch requests with more operations
+QBO_BATCH_PAGES = int(os.getenv("QBO_BATCH_PAGES", 10))  # pages per /batch call; a sync holds up to page size * this * QBO_PAGE_CONCURRENCY rows
+QBO_HTTP_TIMEOUT = float(os.getenv("QBO_HTTP_TIMEOUT", 30.0))  # seconds per read/write/pool wait
+QBO_HTTP_CONNECT_TIMEOUT = float(os.getenv("QBO_HTTP_CONNECT_TIMEOUT", 10.0))
+QBO_MAX_CONNECTIONS = int(os.getenv("QBO_MAX_CONNECTIONS", 20))  # all QBO calls go to one host, so this is the per-host cap
+QBO_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("QBO_MAX_KEEPALIVE_CONNECTIONS", 10))
+QBO_KEEPALIVE_EXPIRY = float(os.getenv("QBO_KEEPALIVE_EXPIRY", 60.0))
+QBO_RATE_LIMIT_PER_MINUTE = float(os.getenv("QBO_RATE_LIMIT_PER_MINUTE", 450))  # per realm across all processes; QBO throttles at 500
+QBO_RATE_LIMIT_BURST = float(os.getenv("QBO_RATE_LIMIT_BURST", 20))  # requests a realm may send back to back
+QBO_CONCURRENCY_MIN = int(os.getenv("QBO_CONCURRENCY_MIN", 1))  # floor of the adaptive in-flight limit per realm and process
+QBO_CONCURRENCY_MAX = int(os.getenv("QBO_CONCURRENCY_MAX", 10))  # QBO allows 10 concurrent requests per realm
+QBO_LATENCY_TARGET = float(os.getenv("QBO_LATENCY_TARGET", 5.0))  # seconds; slower responses shrink the in-flight limit
+QBO_THROTTLE_COOLDOWN = float(os.getenv("QBO_THROTTLE_COOLDOWN", 10.0))  # seconds a realm pauses after a 429 without Retry-After
+QBO_THROTTLE_MAX_RETRIES = int(os.getenv("QBO_THROTTLE_MAX_RETRIES", 5))  # 429 retries before the response is returned as is
+SEARCH_DEFAULT_LIMIT = int(os.getenv("SEARCH_DEFAULT_LIMIT", 100))  # /accounts/search page size
+SEARCH_MAX_LIMIT = int(os.getenv("SEARCH_MAX_LIMIT", 1000))
+UPSERT_BATCH_SIZE = int(os.getenv("UPSERT_BATCH_SIZE", 500))  # rows per INSERT ... ON CONFLICT statement
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", 1000))  # rows fetched from the server-side cursor per /accounts/export chunk
+EXPORT_GZIP_LEVEL = int(os.getenv("EXPORT_GZIP_LEVEL", 6))  # zlib level of gzip-encoded exports
+SNAPSHOT_ENABLED = os.getenv("SNAPSHOT_ENABLED", "true").lower() == "true"  # keep every fetched QBO page for replay
+SNAPSHOT_CODEC = os.getenv("SNAPSHOT_CODEC", "zstd")  # zstd (falls back to gzip when zstandard is missing) or gzip
+SNAPSHOT_RETENTION_DAYS = float(os.getenv("SNAPSHOT_RETENTION_DAYS", 14))  # days snapshots are kept
+SNAPSHOT_PRUNE_INTERVAL = float(os.getenv("SNAPSHOT_PRUNE_INTERVAL", 3600))  # seconds between retention runs
 
 auth_client = AuthClient(
     client_id=CLIENT_ID,
@@ -26,11 +60,33 @@ auth_client = AuthClient(
     environment=ENVIRONMENT,
     redirect_uri=REDIRECT_URI,
 )
+# auth_client keeps the last token response on itself; hold this lock from the call until its fields are read.
+auth_client_lock = threading.Lock()
 LOGGLY_TOKEN = os.getenv("LOGGLY_TOKEN")
+LOG_FILE = os.getenv("LOG_FILE")  # fallback sink without a Loggly token; stdout when unset
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10000))  # records buffered before new ones are dropped
+LOG_BATCH_SIZE = int(os.getenv("LOG_BATCH_SIZE", 100))  # records per bulk post
+LOG_FLUSH_INTERVAL = float(os.getenv("LOG_FLUSH_INTERVAL", 2.0))  # seconds a partial batch may wait
+LOG_ERROR_BODY_MAX_BYTES = int(os.getenv("LOG_ERROR_BODY_MAX_BYTES", 1024))  # error response bytes logged, 0 disables
+LOG_ERROR_BODY_SAMPLE_RATE = float(os.getenv("LOG_ERROR_BODY_SAMPLE_RATE", 1.0))  # share of error responses whose body is logged
 
 REDIS_HOST = os.getenv("REDIS_HOST")
 REDIS_PORT = os.getenv("REDIS_PORT")
 REDIS_PASSWORD = os.getenv("REDIS_PASSWORD")
 REDIS_USERNAME = os.getenv("REDIS_USERNAME")
 CELERY_REDIS_URL = f"redis://{REDIS_USERNAME}:{REDIS_PASSWORD}@{REDIS_HOST}:{REDIS_PORT}/0"
-CELERY_SCHEDULE_INTERVAL = float(os.getenv("CELERY_SCHEDULE_INTERVAL", 600.0))  # 10 minutes default
\ No newline at end of file
+CACHE_REDIS_DB = int(os.getenv("CACHE_REDIS_DB", 1))
+CACHE_REDIS_URL = f"redis://{REDIS_USERNAME}:{REDIS_PASSWORD}@{REDIS_HOST}:{REDIS_PORT}/{CACHE_REDIS_DB}" if REDIS_HOST else None
+CACHE_ENABLED = os.getenv("CACHE_ENABLED", "true").lower() == "true"
+CACHE_TTL = float(os.getenv("CACHE_TTL", 600.0))  # seconds a cached response may be served
+CACHE_LOCAL_MAXSIZE = int(os.getenv("CACHE_LOCAL_MAXSIZE", 256))  # entries kept in each process
+CACHE_VERSION_CHECK_INTERVAL = float(os.getenv("CACHE_VERSION_CHECK_INTERVAL", 5.0))  # seconds between Redis version reads
+METRICS_WORKER_TTL = int(os.getenv("METRICS_WORKER_TTL", 3600))  # seconds a Celery worker's published metrics outlive its last task
+TOKEN_REFRESH_MARGIN = float(os.getenv("TOKEN_REFRESH_MARGIN", 600.0))  # renew access tokens this many seconds before they expire
+TOKEN_RENEW_INTERVAL = float(os.getenv("TOKEN_RENEW_INTERVAL", 300.0))  # seconds between proactive renewal runs, keep below the margin
+TOKEN_REFRESH_LOCK_TIMEOUT = float(os.getenv("TOKEN_REFRESH_LOCK_TIMEOUT", 30.0))  # seconds a refresh may hold the realm's Redis lock
+CELERY_SCHEDULE_INTERVAL = float(os.getenv("CELERY_SCHEDULE_INTERVAL", 600.0))  # 10 minutes default
+QBO_FULL_SYNC_INTERVAL = float(os.getenv("QBO_FULL_SYNC_INTERVAL", 86400.0))  # seconds between full syncs, which also drop rows deleted in QBO
+QBO_SYNC_OVERLAP = float(os.getenv("QBO_SYNC_OVERLAP", 300.0))  # seconds before a walk started that the next incremental sync re-reads from
+CELERY_WORKER_CONCURRENCY = int(os.getenv("CELERY_WORKER_CONCURRENCY", 4))  # realms synced in parallel per worker
+SYNC_JOB_LOCK_TTL = int(os.getenv("SYNC_JOB_LOCK_TTL", 3600))  # seconds a realm's sync job blocks duplicates if it never releases
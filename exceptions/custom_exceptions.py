@@ -1,4 +1,10 @@
 class InvalidAccountData(Exception):
     def __init__(self, message: str):
         self.message = message
-        super().__init__(message)
\ No newline at end of file
+        super().__init__(message)
+
+
+class SyncDeduplicationUnavailable(Exception):
+    def __init__(self, message: str):
+        self.message = message
+        super().__init__(message)
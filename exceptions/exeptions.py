@@ -21,4 +21,15 @@ def raise_invalid_account_data(details: str):
     raise HTTPException(
         status_code=status.HTTP_400_BAD_REQUEST,
         detail={"error": "Invalid account data", "details": details}
-    )
\ No newline at end of file
+    )
+def raise_account_not_found(details: str):
+    raise HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail={"error": "Account not found", "details": details}
+    )
+
+def raise_invalid_query(details: str):
+    raise HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail={"error": "Invalid query", "details": details}
+    )
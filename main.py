@@ -1,13 +1,21 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.openapi.utils import get_openapi
-from routes import auth_routes, account_routes, health
+from routes import auth_routes, account_routes, sync_routes, health, metrics
 from utils.logger import get_logger
 from middlewares.logger_middleware import RequestLoggerMiddleware
+from services.qbo_client import close_qbo_client
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    await close_qbo_client()
 
 app = FastAPI(title="OAuth-based API Integration with QuickBooks Online", 
               description="API Integration with QuickBooks Online", 
-              version="0.0.1")
+              version="0.0.1",
+              lifespan=lifespan)
 
 app.add_middleware(CORSMiddleware, 
                    allow_origins=["*"], 
@@ -18,4 +26,6 @@ app.add_middleware(RequestLoggerMiddleware)
 
 app.include_router(auth_routes.router)
 app.include_router(account_routes.router)
+app.include_router(sync_routes.router)
 app.include_router(health.router)
+app.include_router(metrics.router)
@@ -1,57 +1,104 @@
+import random
 import time
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
-from starlette.responses import StreamingResponse
-from starlette.types import ASGIApp
+from typing import Optional
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from core.config import LOG_ERROR_BODY_MAX_BYTES, LOG_ERROR_BODY_SAMPLE_RATE
 from utils.logger import get_logger
+from utils.metrics import HTTP_REQUEST_DURATION
 
 logger = get_logger("fastapi.middleware")
 
-class RequestLoggerMiddleware(BaseHTTPMiddleware):
+
+def route_template(scope: Scope) -> str:
     """
-    Middleware to log requests and responses in FastAPI.
-    Logs the request method, URL, response status, and processing time.
-    Also logs the request and response bodies for non-200 status codes.
+    Returns the path template of the route that matched the request (e.g. /accounts/sync/{job_id}),
+    so latency metrics are labelled per route instead of per concrete URL.
     """
+    for route in getattr(scope.get("app"), "routes", []):
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, "path", scope["path"])
+    return "unmatched"
 
-    def __init__(self, app: ASGIApp):
-        super().__init__(app)
 
-    async def dispatch(self, request: Request, call_next):
-        start_time = time.time()
+def is_error_status(status_code: Optional[int]) -> bool:
+    """
+    Treats 4xx/5xx responses, and requests that never started a response, as errors;
+    204s, redirects and 304s are ordinary successes.
+    """
+    return status_code is None or status_code >= 400
 
-        try:
-            logger.info(f"⬅️ Request: {request.method} {request.url.path}")
+class RequestLoggerMiddleware:
+    """
+    Pure ASGI middleware to log requests and responses in FastAPI.
+    Logs one line per request with the method, path, response status and processing time,
+    and records the time in the http_request_duration_seconds histogram.
+    For a sample of 4xx/5xx responses the first max_error_body bytes of the body are
+    logged as well; they are copied while the body passes through, never re-buffered.
+    """
 
-            response = await call_next(request)
+    def __init__(
+        self,
+        app: ASGIApp,
+        max_error_body: int = LOG_ERROR_BODY_MAX_BYTES,
+        error_body_sample_rate: float = LOG_ERROR_BODY_SAMPLE_RATE,
+    ):
+        self.app = app
+        self.max_error_body = max_error_body
+        self.error_body_sample_rate = error_body_sample_rate
 
-            process_time = (time.time() - start_time) * 1000
-            formatted_time = f"{process_time:.2f}ms"
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
 
-            if response.status_code not in {200, 201}:
-                body = b""
-                async for chunk in response.body_iterator:
-                    body += chunk
+        start_time = time.perf_counter()
+        status_code = None
+        body = bytearray()
+        body_size = 0
+        capture_body = False
 
-                new_response = StreamingResponse(
-                    content=iter([body]),
-                    status_code=response.status_code,
-                    headers=dict(response.headers),
-                    media_type=response.media_type
+        async def send_wrapper(message: Message):
+            nonlocal status_code, capture_body, body_size
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                capture_body = (
+                    is_error_status(status_code)
+                    and self.max_error_body > 0
+                    and random.random() < self.error_body_sample_rate
                 )
+            elif message["type"] == "http.response.body" and capture_body:
+                chunk = message.get("body", b"")
+                body_size += len(chunk)
+                if len(body) < self.max_error_body:
+                    body.extend(chunk[:self.max_error_body - len(body)])
+            await send(message)
 
-                logger.warning(
-                    f"⚠️ Error Response: {request.method} {request.url.path} "
-                    f"Status: {response.status_code} Time: {formatted_time} "
-                    f"Body: {body.decode('utf-8', errors='ignore')}"
-                )
-                return new_response
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception as e:
+            HTTP_REQUEST_DURATION.observe(
+                time.perf_counter() - start_time, method=scope["method"], route=route_template(scope), status=500
+            )
+            logger.exception(f"💥 Exception on {scope['method']} {scope['path']}: {e}")
+            raise
+
+        elapsed = time.perf_counter() - start_time
+        HTTP_REQUEST_DURATION.observe(elapsed, method=scope["method"], route=route_template(scope), status=status_code)
+        formatted_time = f"{elapsed * 1000:.2f}ms"
+        if not is_error_status(status_code):
             logger.info(
-                f"➡️ Response: {request.method} {request.url.path} "
-                f"Status: {response.status_code} Time: {formatted_time}"
+                f"➡️ Response: {scope['method']} {scope['path']} "
+                f"Status: {status_code} Time: {formatted_time}"
             )
-            return response
+            return
 
-        except Exception as e:
-            logger.exception(f"💥 Exception on {request.method} {request.url.path}: {e}")
-            raise e
+        message = (
+            f"⚠️ Error Response: {scope['method']} {scope['path']} "
+            f"Status: {status_code} Time: {formatted_time}"
+        )
+        if capture_body:
+            truncated = f" (truncated, {body_size} bytes)" if body_size > len(body) else ""
+            message += f" Body: {body.decode('utf-8', errors='ignore')}{truncated}"
+        logger.warning(message)
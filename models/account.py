@@ -1,12 +1,18 @@
-from sqlalchemy import Column, Integer, String, Boolean, Float, ForeignKey
+from sqlalchemy import Column, DateTime, Integer, String, Boolean, Float, Index, text
 from database.base import Base
 
 class Account(Base):
     """"
     Account model for SQLAlchemy ORM.
     Represents an account in the database.
+    QBO account ids are only unique within a company, so rows are keyed by (realm_id, id).
+    path and depth materialize the account hierarchy ("/1/3/4/" for account 4 under 3 under 1)
+    so subtrees can be read with an indexed prefix match.
+    content_hash fingerprints the stored QBO fields so syncs can skip accounts that did not change.
+    parent_id has no foreign key: syncs commit page by page, and a child may arrive before its parent.
     """
     __tablename__ = "accounts"
+    realm_id = Column(String, primary_key=True)
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String)
     classification = Column(String)
@@ -14,4 +20,22 @@ class Account(Base):
     account_type = Column(String)
     active = Column(Boolean)
     current_balance = Column(Float)
-    parent_id = Column(Integer, ForeignKey("accounts.id"), nullable=True)
\ No newline at end of file
+    parent_id = Column(Integer, nullable=True)
+    path = Column(String, nullable=True)
+    depth = Column(Integer, nullable=True)
+    content_hash = Column(String(32), nullable=True)
+    updated_at = Column(DateTime(timezone=True), nullable=True)  # when a sync last wrote the row
+
+    __table_args__ = (
+        Index("ix_accounts_realm_id_path", "realm_id", "path", postgresql_ops={"path": "text_pattern_ops"}),
+        # /accounts/search filters: equality on classification/active, keyset order on id.
+        Index("ix_accounts_realm_id_classification_active_id", "realm_id", "classification", "active", "id"),
+        Index("ix_accounts_realm_id_active_id", "realm_id", "id", postgresql_where=text("active")),
+        # /accounts/summary: GROUP BY classification answered by an index-only scan.
+        Index(
+            "ix_accounts_realm_id_classification_balance", "realm_id", "classification",
+            postgresql_include=["current_balance"],
+        ),
+        # Hierarchy CTEs join children on (realm_id, parent_id).
+        Index("ix_accounts_realm_id_parent_id", "realm_id", "parent_id"),
+    )
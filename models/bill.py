@@ -0,0 +1,24 @@
+from sqlalchemy import Column, DateTime, Date, Integer, String, Float, Index
+from database.base import Base
+
+class Bill(Base):
+    """
+    Bill model for SQLAlchemy ORM.
+    Stores the header of each QBO bill, keyed by (realm_id, id) like accounts.
+    """
+    __tablename__ = "bills"
+    realm_id = Column(String, primary_key=True)
+    id = Column(Integer, primary_key=True)
+    doc_number = Column(String)
+    txn_date = Column(Date)
+    due_date = Column(Date, nullable=True)
+    vendor_id = Column(Integer, nullable=True)
+    currency = Column(String)
+    total_amount = Column(Float)
+    balance = Column(Float)
+    content_hash = Column(String(32), nullable=True)
+    updated_at = Column(DateTime(timezone=True), nullable=True)  # when a sync last wrote the row
+
+    __table_args__ = (
+        Index("ix_bills_realm_id_vendor_id", "realm_id", "vendor_id"),
+    )
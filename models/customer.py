@@ -0,0 +1,19 @@
+from sqlalchemy import Column, DateTime, Integer, String, Boolean, Float
+from database.base import Base
+
+class Customer(Base):
+    """
+    Customer model for SQLAlchemy ORM.
+    Stores the QBO customers of each company, keyed by (realm_id, id) like accounts.
+    """
+    __tablename__ = "customers"
+    realm_id = Column(String, primary_key=True)
+    id = Column(Integer, primary_key=True)
+    display_name = Column(String)
+    company_name = Column(String)
+    email = Column(String)
+    currency = Column(String)
+    active = Column(Boolean)
+    balance = Column(Float)
+    content_hash = Column(String(32), nullable=True)
+    updated_at = Column(DateTime(timezone=True), nullable=True)  # when a sync last wrote the row
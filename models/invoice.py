@@ -0,0 +1,24 @@
+from sqlalchemy import Column, DateTime, Date, Integer, String, Float, Index
+from database.base import Base
+
+class Invoice(Base):
+    """
+    Invoice model for SQLAlchemy ORM.
+    Stores the header of each QBO invoice, keyed by (realm_id, id) like accounts.
+    """
+    __tablename__ = "invoices"
+    realm_id = Column(String, primary_key=True)
+    id = Column(Integer, primary_key=True)
+    doc_number = Column(String)
+    txn_date = Column(Date)
+    due_date = Column(Date, nullable=True)
+    customer_id = Column(Integer, nullable=True)
+    currency = Column(String)
+    total_amount = Column(Float)
+    balance = Column(Float)
+    content_hash = Column(String(32), nullable=True)
+    updated_at = Column(DateTime(timezone=True), nullable=True)  # when a sync last wrote the row
+
+    __table_args__ = (
+        Index("ix_invoices_realm_id_customer_id", "realm_id", "customer_id"),
+    )
@@ -0,0 +1,22 @@
+from sqlalchemy import Column, DateTime, Integer, String, Boolean, Float
+from database.base import Base
+
+class Item(Base):
+    """
+    Item model for SQLAlchemy ORM.
+    Stores the QBO products and services of each company, keyed by (realm_id, id) like accounts.
+    """
+    __tablename__ = "items"
+    realm_id = Column(String, primary_key=True)
+    id = Column(Integer, primary_key=True)
+    name = Column(String)
+    sku = Column(String)
+    item_type = Column(String)
+    active = Column(Boolean)
+    unit_price = Column(Float)
+    purchase_cost = Column(Float)
+    qty_on_hand = Column(Float)
+    income_account_id = Column(Integer, nullable=True)
+    expense_account_id = Column(Integer, nullable=True)
+    content_hash = Column(String(32), nullable=True)
+    updated_at = Column(DateTime(timezone=True), nullable=True)  # when a sync last wrote the row
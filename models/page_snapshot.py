@@ -0,0 +1,25 @@
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, LargeBinary, String, Index
+from database.base import Base
+from datetime import datetime, timezone
+
+class PageSnapshot(Base):
+    """
+    PageSnapshot model for SQLAlchemy ORM.
+    The raw QBO payloads of one fetched page of a sync run, compressed, so the transform and
+    write pipeline can be replayed (after a mapping fix, or as a benchmark) without calling QBO.
+    """
+    __tablename__ = "qbo_page_snapshots"
+    sync_run_id = Column(Integer, ForeignKey("sync_runs.id", ondelete="CASCADE"), primary_key=True)
+    page = Column(Integer, primary_key=True)
+    realm_id = Column(String, nullable=False)
+    entity = Column(String, nullable=False)
+    codec = Column(String, nullable=False)
+    row_count = Column(Integer, nullable=False)
+    raw_bytes = Column(Integer, nullable=False)
+    data = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc))
+
+    # Retention deletes by age.
+    __table_args__ = (
+        Index("ix_qbo_page_snapshots_created_at", created_at),
+    )
@@ -0,0 +1,37 @@
+from sqlalchemy import BigInteger, Column, DateTime, Float, Integer, String, Boolean, Index
+from database.base import Base
+from datetime import datetime, timezone
+
+class SyncRun(Base):
+    """
+    SyncRun model for SQLAlchemy ORM.
+    One row per sync of a QBO entity for a realm: what triggered it, how it ended,
+    where the time went (fetch, parse, write, hierarchy refresh) and how much data moved.
+    """
+    __tablename__ = "sync_runs"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    realm_id = Column(String, nullable=False)
+    entity = Column(String, nullable=False)
+    trigger = Column(String, nullable=False)
+    full = Column(Boolean, nullable=False, default=False)
+    status = Column(String, nullable=False, default="running")
+    error = Column(String, nullable=True)
+    started_at = Column(DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc))
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    duration_seconds = Column(Float, nullable=True)
+    fetch_seconds = Column(Float, nullable=False, default=0.0)
+    parse_seconds = Column(Float, nullable=False, default=0.0)
+    write_seconds = Column(Float, nullable=False, default=0.0)
+    hierarchy_seconds = Column(Float, nullable=False, default=0.0)
+    pages = Column(Integer, nullable=False, default=0)
+    bytes_downloaded = Column(BigInteger, nullable=False, default=0)
+    rows_fetched = Column(Integer, nullable=False, default=0)
+    rows_inserted = Column(Integer, nullable=False, default=0)
+    rows_updated = Column(Integer, nullable=False, default=0)
+    rows_unchanged = Column(Integer, nullable=False, default=0)
+
+    # /sync/runs lists the newest runs, optionally of one realm.
+    __table_args__ = (
+        Index("ix_sync_runs_started_at", started_at.desc()),
+        Index("ix_sync_runs_realm_id_started_at", realm_id, started_at.desc()),
+    )
@@ -0,0 +1,15 @@
+from sqlalchemy import Column, String, DateTime
+from database.base import Base
+from datetime import datetime, timezone
+
+class SyncState(Base):
+    """
+    SyncState model for SQLAlchemy ORM.
+    Stores the incremental sync high-water mark of a QBO entity per realm:
+    the latest MetaData.LastUpdatedTime that has been written to the database.
+    """
+    __tablename__ = "sync_state"
+    realm_id = Column(String, primary_key=True)
+    entity = Column(String, primary_key=True)
+    last_updated_time = Column(DateTime(timezone=True), nullable=True)
+    updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime
+from sqlalchemy import Column, String, DateTime, Index
 from database.base import Base
 from datetime import datetime, timezone, timedelta
 
@@ -14,7 +14,13 @@ class Token(Base):
     expires_in = Column(String)
     realm_id = Column(String)
     token_type = Column(String)
-    created_at = Column(DateTime, default=datetime.now(timezone.utc))
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+    # get_latest_token: newest token overall, or newest of one realm.
+    __table_args__ = (
+        Index("ix_tokens_created_at", created_at.desc()),
+        Index("ix_tokens_realm_id_created_at", realm_id, created_at.desc()),
+    )
     
     def is_token_expired(self) -> bool:
         if self.created_at.tzinfo is None:
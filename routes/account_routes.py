@@ -1,55 +1,196 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import Optional, List, Union
+from typing import Any, Callable, Literal, Optional, List
 from database.session import get_db
-from models.account import Account
 from schemas.account import AccountOut
-from sqlalchemy import func
 from services.quickbooks_service import sync_qbo_accounts, build_account_tree
+from services.cache_service import account_cache
+from services.summary_service import get_balance_summary, get_subtree_totals
+from services.hierarchy_service import get_account_subtree
+from services.search_service import parse_fields, search_accounts as run_search
+from services.export_service import MEDIA_TYPES, iter_account_export
+from services.token_service import get_latest_token
+from tasks.tasks import enqueue_account_sync, get_sync_job
+from core.config import SEARCH_DEFAULT_LIMIT, SEARCH_MAX_LIMIT
+from exceptions.exeptions import raise_account_not_found, raise_invalid_query, raise_token_not_found
+from utils.fast_json import FastJSONResponse
 
 router = APIRouter()
 
-@router.get("/accounts", response_model=Union[List[AccountOut], dict])
-def sync_accounts(db: Session = Depends(get_db)):
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison, so W/"x" matches "x".
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+def _conditional_response(
+    request: Request,
+    namespace: str,
+    realm_id: Optional[str],
+    params: dict,
+    load: Callable[[], Any],
+    render: Callable[[Any], Response] = FastJSONResponse,
+) -> Response:
+    """
+    Serves a cached account read with an ETag of the realm's data version and the query params.
+    A request whose If-None-Match holds that ETag gets 304 Not Modified before anything is loaded.
+    Without shared (Redis) versions, no ETag is sent and every request gets the full response.
+    """
+    etag = account_cache.etag(namespace, realm_id, params)
+    # no-cache: clients may keep the body but must revalidate it, which costs them a 304.
+    headers = {"Cache-Control": "private, no-cache"}
+    if etag is not None:
+        headers["ETag"] = etag
+        if _etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+    response = render(account_cache.get_or_load(namespace, realm_id, params, load))
+    response.headers.update(headers)
+    return response
+
+@router.get("/accounts", response_model=List[AccountOut], response_class=FastJSONResponse)
+async def sync_accounts(
+    realm_id: Optional[str] = Query(None, description="QBO company to sync; defaults to the most recently connected one"),
+    full: bool = Query(False, description="Re-download every account instead of only the ones changed since the last sync"),
+    db: Session = Depends(get_db),
+):
     """
     Sync accounts from QuickBooks Online to the local database.
     """
-    return sync_qbo_accounts(db)
+    return FastJSONResponse(await sync_qbo_accounts(db, realm_id=realm_id, full=full))
 
-@router.get("/accounts/search", response_model=List[AccountOut])
+@router.post("/accounts/sync", status_code=202)
+def start_account_sync(
+    realm_id: Optional[str] = Query(None, description="QBO company to sync; defaults to the most recently connected one"),
+    full: bool = Query(False, description="Re-download every account instead of only the ones changed since the last sync"),
+    db: Session = Depends(get_db),
+):
+    """
+    Enqueue an account sync in the background and return its job id right away.
+    A sync already queued or running for the realm is returned instead of starting another one;
+    a full sync asked for while an incremental one is in flight is queued to run right after it.
+    """
+    if realm_id is None:
+        token = get_latest_token(db)
+        if not token:
+            raise_token_not_found()
+        realm_id = token.realm_id
+    return enqueue_account_sync(realm_id, full=full)
+
+@router.get("/accounts/sync/{job_id}")
+def get_account_sync(job_id: str):
+    """
+    Poll a sync job: queued, running, succeeded or failed, with the task's result once finished.
+    """
+    return get_sync_job(job_id)
+
+@router.get(
+    "/accounts/search",
+    response_model=None,
+    response_class=FastJSONResponse,
+    responses={200: {"model": List[AccountOut], "description": "One page of accounts; the next page's cursor is in X-Next-Cursor"}},
+)
 def search_accounts(
+    request: Request,
+    realm_id: Optional[str] = Query(None),
     active: Optional[bool] = Query(None),
     classification: Optional[str] = Query(None),
+    limit: int = Query(SEARCH_DEFAULT_LIMIT, ge=1, le=SEARCH_MAX_LIMIT),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value of the previous page"),
+    fields: Optional[str] = Query(None, description="Comma separated AccountOut fields to return, e.g. id,name"),
     db: Session = Depends(get_db),
 ):
     """"
-    Search accounts by active status and classification.
-    """
-    query = db.query(Account)
-    if active is not None:
-        query = query.filter(Account.active == active)
-    if classification:
-        query = query.filter(Account.classification == classification)
-    return query.all()
-
-@router.get("/accounts/summary")
-def get_account_balance_summary(db: Session = Depends(get_db)):
-    # Dynamically fetch distinct classification values
-    classifications = db.query(Account.classification).distinct().all()
-    classification_list = [c[0] for c in classifications if c[0] is not None]
-
-    summary = {}
-    for classification in classification_list:
-        total = (
-            db.query(func.sum(Account.current_balance))
-            .filter(Account.classification == classification)
-            .scalar()
-        )
-        summary[classification] = round(total or 0.0, 2)
-
-    return dict(sorted(summary.items(), key=lambda x: x[0]))
-
-@router.get("/accounts/tree")
-def get_account_tree(db: Session = Depends(get_db)):
-    accounts = db.query(Account).all()
-    return build_account_tree(accounts)
\ No newline at end of file
+    Search accounts by realm, active status and classification, one keyset page at a time.
+    """
+    selected = parse_fields(fields)
+
+    def load():
+        items, next_cursor = run_search(db, realm_id, active, classification, selected, limit, cursor)
+        return {"items": items, "next_cursor": next_cursor}
+
+    params = {
+        "active": active, "classification": classification,
+        "limit": limit, "cursor": cursor, "fields": selected,
+    }
+    def render(page: dict) -> Response:
+        headers = {}
+        if page["next_cursor"]:
+            headers["X-Next-Cursor"] = page["next_cursor"]
+            next_url = request.url.include_query_params(cursor=page["next_cursor"])
+            headers["Link"] = f'<{next_url}>; rel="next"'
+        return FastJSONResponse(page["items"], headers=headers)
+
+    return _conditional_response(request, "search", realm_id, params, load, render)
+
+@router.get(
+    "/accounts/export",
+    response_class=StreamingResponse,
+    responses={200: {"content": {media_type: {} for media_type in MEDIA_TYPES.values()}}},
+)
+def export_accounts(
+    request: Request,
+    format: Literal["ndjson", "csv"] = Query("ndjson", description="ndjson: one AccountOut object per line; csv: with a header row"),
+    realm_id: Optional[str] = Query(None),
+    active: Optional[bool] = Query(None),
+    classification: Optional[str] = Query(None),
+):
+    """
+    Stream every matching account, gzip-compressed when the client accepts it, in constant memory.
+    """
+    gzip = "gzip" in request.headers.get("accept-encoding", "").lower()
+    headers = {"Content-Disposition": f'attachment; filename="accounts.{format}"', "Vary": "Accept-Encoding"}
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(
+        iter_account_export(format, realm_id, active, classification, gzip=gzip),
+        media_type=MEDIA_TYPES[format],
+        headers=headers,
+    )
+
+@router.get("/accounts/summary", response_class=FastJSONResponse)
+def get_account_balance_summary(
+    request: Request,
+    realm_id: Optional[str] = Query(None),
+    group_by: List[Literal["account_type", "currency", "active"]] = Query(
+        [], description="Further break each classification total down by these columns, in order"
+    ),
+    rollup: Optional[Literal["subtree"]] = Query(
+        None, description="Return every account with the total balance of its subtree instead"
+    ),
+    db: Session = Depends(get_db),
+):
+    """
+    Sum account balances by classification, optionally nested by more columns or rolled up the account hierarchy.
+    """
+    def load():
+        if rollup == "subtree":
+            return get_subtree_totals(db, realm_id)
+        return get_balance_summary(db, realm_id, group_by)
+
+    return _conditional_response(request, "summary", realm_id, {"group_by": group_by, "rollup": rollup}, load)
+
+@router.get("/accounts/tree", response_class=FastJSONResponse)
+def get_account_tree(
+    request: Request,
+    realm_id: Optional[str] = Query(None),
+    root_id: Optional[int] = Query(None, description="Only return the subtree under this account"),
+    depth: Optional[int] = Query(None, ge=0, description="Levels below the root (or the top-level accounts) to include"),
+    db: Session = Depends(get_db),
+):
+    """
+    Return accounts nested by parent/child, read from the materialized hierarchy.
+    """
+    if root_id is not None and realm_id is None:
+        # Account ids repeat across realms, so a root_id alone does not name one account.
+        raise_invalid_query("root_id requires realm_id")
+
+    def load():
+        accounts = get_account_subtree(db, realm_id, root_id, depth)
+        if accounts is None:
+            raise_account_not_found(f"Account {root_id} not found")
+        return build_account_tree(accounts)
+
+    return _conditional_response(request, "tree", realm_id, {"root_id": root_id, "depth": depth}, load)
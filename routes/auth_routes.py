@@ -4,7 +4,8 @@ from sqlalchemy.orm import Session
 from intuitlib.enums import Scopes
 from intuitlib.exceptions import AuthClientError
 from services.token_service import save_tokens_to_db
-from core.config import auth_client
+from services.token_manager import token_manager
+from core.config import auth_client, auth_client_lock
 from database.session import get_db
 
 router = APIRouter()
@@ -30,19 +31,21 @@ def callback(request: Request, db: Session = Depends(get_db)):
     auth_code = request.query_params.get("code")
     realm_id = request.query_params.get("realmId")
 
-    try:
-        auth_client.get_bearer_token(auth_code, realm_id=realm_id)
-    except AuthClientError as e:
-        return {"error": str(e)}
+    with auth_client_lock:
+        try:
+            auth_client.get_bearer_token(auth_code, realm_id=realm_id)
+        except AuthClientError as e:
+            return {"error": str(e)}
 
-    token_data = {
-        "access_token": auth_client.access_token,
-        "refresh_token": auth_client.refresh_token,
-        "expires_in": auth_client.expires_in,
-        "realm_id": auth_client.realm_id,
-        "token_type": "Bearer"
-    }
+        token_data = {
+            "access_token": auth_client.access_token,
+            "refresh_token": auth_client.refresh_token,
+            "expires_in": auth_client.expires_in,
+            "realm_id": auth_client.realm_id,
+            "token_type": "Bearer"
+        }
 
     save_tokens_to_db(db, token_data)
+    token_manager.invalidate(token_data["realm_id"])
 
     return {"message": "Authorization successful", "realm_id": realm_id}
@@ -0,0 +1,12 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from utils.metrics import REGISTRY
+
+router = APIRouter()
+
+@router.get("/metrics", summary="Prometheus Metrics", response_class=PlainTextResponse)
+def metrics():
+    """
+    Exposes request, QBO API, sync and Celery task metrics in the Prometheus text format.
+    """
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
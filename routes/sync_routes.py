@@ -0,0 +1,19 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from database.session import get_db
+from schemas.sync_run import SyncRunOut
+from services.sync_run_service import list_sync_runs
+
+router = APIRouter()
+
+@router.get("/sync/runs", response_model=List[SyncRunOut])
+def get_sync_runs(
+    realm_id: Optional[str] = Query(None),
+    limit: int = Query(50, ge=1, le=1000),
+    db: Session = Depends(get_db),
+):
+    """
+    List the most recent syncs with their phase timings, bytes downloaded and row counts, newest first.
+    """
+    return list_sync_runs(db, realm_id, limit)
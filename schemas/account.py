@@ -5,6 +5,7 @@ class AccountOut(BaseModel):
     """
     Account schema for output.
     """
+    realm_id: Optional[str] = None
     id: int
     name: Optional[str]
     classification: Optional[str]
@@ -0,0 +1,30 @@
+from datetime import datetime
+from pydantic import BaseModel, ConfigDict
+from typing import Optional
+
+class SyncRunOut(BaseModel):
+    """
+    Sync run schema for output.
+    """
+    id: int
+    realm_id: str
+    entity: str
+    trigger: str
+    full: bool
+    status: str
+    error: Optional[str]
+    started_at: datetime
+    finished_at: Optional[datetime]
+    duration_seconds: Optional[float]
+    fetch_seconds: float
+    parse_seconds: float
+    write_seconds: float
+    hierarchy_seconds: float
+    pages: int
+    bytes_downloaded: int
+    rows_fetched: int
+    rows_inserted: int
+    rows_updated: int
+    rows_unchanged: int
+
+    model_config = ConfigDict(from_attributes=True)
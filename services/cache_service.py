@@ -0,0 +1,180 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+import redis
+from core.config import (
+    CACHE_ENABLED,
+    CACHE_TTL,
+    CACHE_LOCAL_MAXSIZE,
+    CACHE_VERSION_CHECK_INTERVAL,
+)
+from utils.logger import get_logger
+from utils.redis_client import get_redis_client
+
+logger = get_logger("cache")
+
+ALL_REALMS = "*"
+
+
+class LocalTTLCache:
+    """
+    Thread-safe in-process LRU cache whose entries expire after a fixed TTL.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> tuple[bool, Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return False, None
+            self._entries.move_to_end(key)
+            return True, value
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class AccountCache:
+    """
+    Two-tier read-through cache for account read endpoints: a local LRU in front of Redis.
+
+    Every key embeds the data version of its realm. A sync that writes accounts bumps the
+    version (in Redis, so every API process sees it), which makes all older entries unreachable
+    instead of deleting them; they age out through the TTL and LRU eviction.
+    Queries that span all realms use the ALL_REALMS version, which every bump also increments.
+    Redis is optional: without it (or while it is unreachable) versions are tracked per process.
+    The same versions give read endpoints their ETags, so conditional requests can be answered
+    without touching the cache or the database. ETags are only given while versions come from Redis:
+    a per-process version never sees the syncs Celery workers run, so its ETag would never change.
+    """
+
+    def __init__(self, local: LocalTTLCache, redis_client: Optional[redis.Redis], enabled: bool = True):
+        self.local = local
+        self.redis = redis_client
+        self.enabled = enabled
+        # realm -> (checked_at, version, whether the version was read from Redis)
+        self._versions: dict[str, tuple[float, int, bool]] = {}
+        self._versions_lock = threading.Lock()
+
+    def get_version(self, realm_id: Optional[str]) -> int:
+        return self._version_state(realm_id)[0]
+
+    def _version_state(self, realm_id: Optional[str]) -> tuple[int, bool]:
+        realm = realm_id or ALL_REALMS
+        now = time.monotonic()
+        with self._versions_lock:
+            checked_at, version, shared = self._versions.get(realm, (None, 0, False))
+        if checked_at is not None and (self.redis is None or now - checked_at < CACHE_VERSION_CHECK_INTERVAL):
+            return version, shared
+
+        shared = False
+        if self.redis is not None:
+            try:
+                version = int(self.redis.get(self._version_key(realm)) or 0)
+                shared = True
+            except redis.RedisError as e:
+                logger.warning(f"⚠️ Cache version read failed for realm {realm}: {e}")
+        with self._versions_lock:
+            self._versions[realm] = (now, version, shared)
+        return version, shared
+
+    def bump_version(self, realm_id: str) -> None:
+        """
+        Invalidates every cached response of the realm and every cross-realm response.
+        """
+        now = time.monotonic()
+        for realm in (realm_id, ALL_REALMS):
+            version = None
+            if self.redis is not None:
+                try:
+                    version = int(self.redis.incr(self._version_key(realm)))
+                except redis.RedisError as e:
+                    logger.warning(f"⚠️ Cache version bump failed for realm {realm}: {e}")
+            with self._versions_lock:
+                shared = version is not None
+                if version is None:
+                    version = self._versions.get(realm, (None, 0, False))[1] + 1
+                self._versions[realm] = (now, version, shared)
+
+    def get_or_load(self, namespace: str, realm_id: Optional[str], params: dict, loader: Callable[[], Any]) -> Any:
+        """
+        Returns the cached value for the namespace, realm and query params, calling loader() on a miss.
+        Values must be JSON serializable.
+        """
+        if not self.enabled:
+            return loader()
+
+        key = self._key(namespace, realm_id, params)
+        hit, value = self.local.get(key)
+        if hit:
+            return value
+
+        if self.redis is not None:
+            try:
+                cached = self.redis.get(key)
+                if cached is not None:
+                    value = json.loads(cached)
+                    self.local.set(key, value)
+                    return value
+            except redis.RedisError as e:
+                logger.warning(f"⚠️ Cache read failed for {namespace}: {e}")
+
+        value = loader()
+        self.local.set(key, value)
+        if self.redis is not None:
+            try:
+                self.redis.set(key, json.dumps(value), ex=int(self.local.ttl))
+            except redis.RedisError as e:
+                logger.warning(f"⚠️ Cache write failed for {namespace}: {e}")
+        return value
+
+    def etag(self, namespace: str, realm_id: Optional[str], params: dict) -> Optional[str]:
+        """
+        Returns the strong ETag of a read response: it changes whenever a sync writes accounts of
+        the realm (or any realm for cross-realm reads) and differs between query params.
+        Returns None when the realm's version is not read from Redis (no Redis, or it is unreachable).
+        """
+        if not self._version_state(realm_id)[1]:
+            return None
+        key = self._key(namespace, realm_id, params)
+        return f'"{hashlib.blake2b(key.encode(), digest_size=12).hexdigest()}"'
+
+    def clear(self) -> None:
+        """
+        Drops this process's cached entries and versions.
+        """
+        self.local.clear()
+        with self._versions_lock:
+            self._versions.clear()
+
+    def _key(self, namespace: str, realm_id: Optional[str], params: dict) -> str:
+        realm = realm_id or ALL_REALMS
+        encoded = json.dumps(params, sort_keys=True, default=str)
+        return f"accounts:{namespace}:{realm}:v{self.get_version(realm_id)}:{encoded}"
+
+    @staticmethod
+    def _version_key(realm: str) -> str:
+        return f"accounts:version:{realm}"
+
+
+account_cache = AccountCache(LocalTTLCache(CACHE_LOCAL_MAXSIZE, CACHE_TTL), get_redis_client(), enabled=CACHE_ENABLED)
@@ -0,0 +1,201 @@
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any, Callable, Optional
+from sqlalchemy.orm import Session
+from models.account import Account
+from models.customer import Customer
+from models.vendor import Vendor
+from models.item import Item
+from models.invoice import Invoice
+from models.bill import Bill
+from services.cache_service import account_cache
+from services.hierarchy_service import refresh_account_paths
+
+
+def field(path: str, convert: Optional[Callable[[Any], Any]] = None, default: Any = None) -> Callable[[dict], Any]:
+    """
+    Returns a getter for a dotted path of a QBO payload ("CurrencyRef.value"), applying
+    convert to the value when it is present and returning default when it is not.
+    """
+    names = path.split(".")
+
+    def get(payload: dict) -> Any:
+        value = payload
+        for name in names:
+            value = value.get(name) if isinstance(value, dict) else None
+        if value is None:
+            return default
+        return convert(value) if convert else value
+
+    return get
+
+
+@dataclass(frozen=True)
+class QBOEntity:
+    """
+    Declares how a QBO entity is synced: the entity name used in QBO queries, the model its rows
+    are stored in, the key rows are upserted on, and how each column is read from a QBO payload.
+    on_write runs after a page wrote rows, after_sync once after a sync wrote any rows.
+    """
+    name: str
+    model: type
+    fields: dict[str, Callable[[dict], Any]]
+    key: tuple[str, ...] = ("realm_id", "id")
+    # QBO only returns the active rows of entities with an Active flag unless their queries ask for both.
+    has_active: bool = True
+    on_write: Optional[Callable[[str], None]] = None
+    after_sync: Optional[Callable[[Session, str], None]] = None
+
+    def row_from_qbo(self, payload: dict, realm_id: str) -> dict:
+        """
+        Maps a QBO payload of the given realm to the column values stored for it.
+        """
+        return {"realm_id": realm_id, **{column: get(payload) for column, get in self.fields.items()}}
+
+    def key_from_qbo(self, payload: dict, realm_id: str) -> tuple:
+        """
+        Returns the key a QBO payload of the given realm is stored under.
+        """
+        return tuple(realm_id if name == "realm_id" else self.fields[name](payload) for name in self.key)
+
+    def query(
+        self,
+        start_position: Optional[int] = None,
+        max_results: Optional[int] = None,
+        updated_since: Optional[datetime] = None,
+    ) -> str:
+        """
+        Builds the QBO query of the entity's rows (active or not) in Id order, for one page when start_position
+        and max_results are given, and only for rows changed at or after updated_since when it is given.
+        """
+        conditions = []
+        if self.has_active:
+            # Without it QBO leaves inactive rows out, and a full sync would delete them as gone from QBO.
+            conditions.append("Active IN (true, false)")
+        if updated_since is not None:
+            conditions.append(f"Metadata.LastUpdatedTime >= '{updated_since.isoformat()}'")
+        query = f"select * from {self.name}"
+        if conditions:
+            query += " where " + " and ".join(conditions)
+        # A fixed order keeps STARTPOSITION paging from skipping rows while QBO data changes mid-walk.
+        query += " ORDERBY Id"
+        if start_position is not None and max_results is not None:
+            query += f" STARTPOSITION {start_position} MAXRESULTS {max_results}"
+        return query
+
+
+def _bump_account_cache(realm_id: str) -> None:
+    account_cache.bump_version(realm_id)
+
+def _refresh_account_paths(db: Session, realm_id: str) -> None:
+    refresh_account_paths(db, realm_id)
+
+def _account_parent_id(payload: dict) -> Optional[int]:
+    return int(payload["ParentRef"]["value"]) if payload.get("SubAccount") else None
+
+
+ACCOUNT = QBOEntity(
+    name="Account",
+    model=Account,
+    fields={
+        "id": field("Id", int),
+        "name": field("Name"),
+        "classification": field("Classification"),
+        "currency": field("CurrencyRef.value"),
+        "account_type": field("AccountType"),
+        "active": field("Active", default=False),
+        "current_balance": field("CurrentBalance", default=0.0),
+        "parent_id": _account_parent_id,
+    },
+    on_write=_bump_account_cache,
+    after_sync=_refresh_account_paths,
+)
+
+CUSTOMER = QBOEntity(
+    name="Customer",
+    model=Customer,
+    fields={
+        "id": field("Id", int),
+        "display_name": field("DisplayName"),
+        "company_name": field("CompanyName"),
+        "email": field("PrimaryEmailAddr.Address"),
+        "currency": field("CurrencyRef.value"),
+        "active": field("Active", default=False),
+        "balance": field("Balance", default=0.0),
+    },
+)
+
+VENDOR = QBOEntity(
+    name="Vendor",
+    model=Vendor,
+    fields={
+        "id": field("Id", int),
+        "display_name": field("DisplayName"),
+        "company_name": field("CompanyName"),
+        "email": field("PrimaryEmailAddr.Address"),
+        "currency": field("CurrencyRef.value"),
+        "active": field("Active", default=False),
+        "balance": field("Balance", default=0.0),
+    },
+)
+
+ITEM = QBOEntity(
+    name="Item",
+    model=Item,
+    fields={
+        "id": field("Id", int),
+        "name": field("Name"),
+        "sku": field("Sku"),
+        "item_type": field("Type"),
+        "active": field("Active", default=False),
+        "unit_price": field("UnitPrice", default=0.0),
+        "purchase_cost": field("PurchaseCost", default=0.0),
+        "qty_on_hand": field("QtyOnHand"),
+        "income_account_id": field("IncomeAccountRef.value", int),
+        "expense_account_id": field("ExpenseAccountRef.value", int),
+    },
+)
+
+INVOICE = QBOEntity(
+    name="Invoice",
+    model=Invoice,
+    fields={
+        "id": field("Id", int),
+        "doc_number": field("DocNumber"),
+        "txn_date": field("TxnDate", date.fromisoformat),
+        "due_date": field("DueDate", date.fromisoformat),
+        "customer_id": field("CustomerRef.value", int),
+        "currency": field("CurrencyRef.value"),
+        "total_amount": field("TotalAmt", default=0.0),
+        "balance": field("Balance", default=0.0),
+    },
+    has_active=False,
+)
+
+BILL = QBOEntity(
+    name="Bill",
+    model=Bill,
+    fields={
+        "id": field("Id", int),
+        "doc_number": field("DocNumber"),
+        "txn_date": field("TxnDate", date.fromisoformat),
+        "due_date": field("DueDate", date.fromisoformat),
+        "vendor_id": field("VendorRef.value", int),
+        "currency": field("CurrencyRef.value"),
+        "total_amount": field("TotalAmt", default=0.0),
+        "balance": field("Balance", default=0.0),
+    },
+    has_active=False,
+)
+
+ENTITIES: dict[str, QBOEntity] = {entity.name: entity for entity in (ACCOUNT, CUSTOMER, VENDOR, ITEM, INVOICE, BILL)}
+
+
+def get_entity(name: str) -> QBOEntity:
+    """
+    Returns the registered entity with the given QBO name, raising ValueError for unknown names.
+    """
+    try:
+        return ENTITIES[name]
+    except KeyError:
+        raise ValueError(f"Unknown QBO entity: {name}") from None
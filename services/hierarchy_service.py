@@ -0,0 +1,101 @@
+from typing import Optional
+from sqlalchemy import String, cast, exists, literal, literal_column, or_, select, update
+from sqlalchemy.orm import Session
+from sqlalchemy.engine import Row
+from models.account import Account
+from schemas.account import AccountOut
+from services.cache_service import account_cache
+
+# Columns read for /accounts/tree: everything build_account_tree puts in a node, plus the parent link.
+SUBTREE_FIELDS = [*AccountOut.model_fields, "parent_id"]
+
+
+def refresh_account_paths(db: Session, realm_id: str) -> int:
+    """
+    Recomputes the materialized path and depth of the realm's accounts and commits.
+    The paths are derived by a recursive CTE in the database and only rows whose
+    path or depth actually changed are written. Accounts whose parent is missing
+    are treated as roots, so they stay reachable in the tree.
+    Returns the number of rows updated (-1 when the driver cannot report it).
+    """
+    accounts = Account.__table__
+    parent = accounts.alias("parent")
+    parent_missing = ~exists().where(parent.c.realm_id == accounts.c.realm_id, parent.c.id == accounts.c.parent_id)
+
+    paths = (
+        select(
+            accounts.c.realm_id,
+            accounts.c.id,
+            (literal("/") + cast(accounts.c.id, String) + literal("/")).label("path"),
+            literal_column("0").label("depth"),
+        )
+        .where(accounts.c.realm_id == realm_id, or_(accounts.c.parent_id.is_(None), parent_missing))
+        .cte("account_paths", recursive=True)
+    )
+    child = accounts.alias("child")
+    paths = paths.union_all(
+        select(
+            child.c.realm_id,
+            child.c.id,
+            (paths.c.path + cast(child.c.id, String) + literal("/")).label("path"),
+            (paths.c.depth + 1).label("depth"),
+        ).where(child.c.realm_id == paths.c.realm_id, child.c.parent_id == paths.c.id)
+    )
+
+    stmt = (
+        update(accounts)
+        .where(
+            accounts.c.realm_id == paths.c.realm_id,
+            accounts.c.id == paths.c.id,
+            or_(accounts.c.path.is_distinct_from(paths.c.path), accounts.c.depth.is_distinct_from(paths.c.depth)),
+        )
+        .values(path=paths.c.path, depth=paths.c.depth)
+    )
+    updated = db.execute(stmt).rowcount
+    db.commit()
+    if updated != 0:
+        account_cache.bump_version(realm_id)
+    return updated
+
+
+def get_account_subtree(
+    db: Session,
+    realm_id: Optional[str] = None,
+    root_id: Optional[int] = None,
+    depth: Optional[int] = None,
+) -> Optional[list[Row]]:
+    """
+    Returns the accounts of a subtree ordered parents-first, read through the path index,
+    as rows of the SUBTREE_FIELDS columns rather than ORM objects.
+    Without root_id the whole forest is returned. depth limits how many levels below
+    the root (or below the top-level accounts) are included.
+    root_id needs realm_id, as QBO account ids are only unique within a realm.
+    Returns None when root_id does not exist or has not been placed in the hierarchy yet.
+    """
+    if root_id is not None and realm_id is None:
+        raise ValueError("root_id requires realm_id")
+    conditions = []
+    if realm_id is not None:
+        conditions.append(Account.realm_id == realm_id)
+
+    base_depth = 0
+    if root_id is not None:
+        root = (
+            db.query(Account.path, Account.depth)
+            .filter(*conditions, Account.id == root_id)
+            .first()
+        )
+        if root is None or root.path is None:
+            return None
+        conditions.append(Account.path.like(root.path + "%"))
+        base_depth = root.depth
+
+    if depth is not None:
+        conditions.append(Account.depth <= base_depth + depth)
+
+    return (
+        db.query(*[getattr(Account, name) for name in SUBTREE_FIELDS])
+        .filter(*conditions)
+        .order_by(Account.depth, Account.realm_id, Account.id)
+        .all()
+    )
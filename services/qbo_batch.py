@@ -0,0 +1,45 @@
+import httpx
+from models.token import Token
+from core.config import QBO_BATCH_URL, QBO_BATCH_MAX_OPERATIONS
+from services.qbo_client import qbo_post
+from exceptions.exeptions import raise_accounts_fetch_failed
+
+
+def build_batch_request(queries: list[str]) -> dict:
+    """
+    Builds a /batch request body with one Query operation per query; each bId is the query's index.
+    """
+    if len(queries) > QBO_BATCH_MAX_OPERATIONS:
+        raise ValueError(f"A QBO batch takes at most {QBO_BATCH_MAX_OPERATIONS} operations, got {len(queries)}")
+    return {"BatchItemRequest": [{"bId": str(i), "Query": query} for i, query in enumerate(queries)]}
+
+
+def parse_batch_response(payload: dict, count: int) -> list[dict]:
+    """
+    Demultiplexes a /batch response into the QueryResponse of each of its `count` operations, in request order.
+    An operation that came back with a Fault fails the whole batch, like a failed /query call does.
+    """
+    results: list = [None] * count
+    for item in payload.get("BatchItemResponse", []):
+        if "Fault" in item:
+            raise_accounts_fetch_failed(item["Fault"])
+        results[int(item["bId"])] = item.get("QueryResponse", {})
+    if any(result is None for result in results):
+        raise_accounts_fetch_failed(f"Batch response is missing operations: {payload}")
+    return results
+
+
+async def post_batch(token: Token, queries: list[str]) -> httpx.Response:
+    """
+    Sends up to QBO_BATCH_MAX_OPERATIONS queries of the token's realm as one /batch request.
+    """
+    headers = {
+        "Authorization": f"Bearer {token.access_token}",
+        "Accept": "application/json",
+        "Content-Type": "application/json",
+    }
+    url = QBO_BATCH_URL.format(realm_id=token.realm_id)
+    return await qbo_post(
+        url, headers=headers, params={"minorversion": 65}, json=build_batch_request(queries), realm_id=token.realm_id
+    )
+
@@ -0,0 +1,113 @@
+import asyncio
+import time
+import weakref
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Optional
+import backoff
+import httpx
+from core.config import (
+    QBO_HTTP_TIMEOUT,
+    QBO_HTTP_CONNECT_TIMEOUT,
+    QBO_MAX_CONNECTIONS,
+    QBO_MAX_KEEPALIVE_CONNECTIONS,
+    QBO_KEEPALIVE_EXPIRY,
+    QBO_THROTTLE_MAX_RETRIES,
+)
+from services.rate_limiter import qbo_rate_limiter
+from utils.metrics import QBO_REQUEST_DURATION, QBO_RATE_LIMIT_WAIT
+
+# One pooled client per event loop: uvicorn runs a single loop for the app's lifetime,
+# while each Celery task runs its own loop through asyncio.run().
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+
+def get_qbo_client() -> httpx.AsyncClient:
+    """
+    Returns the shared QuickBooks HTTP client of the running event loop, creating it on first use.
+    Connections are kept alive and reused across calls, so only the first request pays the TCP+TLS handshake.
+    """
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=QBO_MAX_CONNECTIONS,
+                max_keepalive_connections=QBO_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=QBO_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(QBO_HTTP_TIMEOUT, connect=QBO_HTTP_CONNECT_TIMEOUT),
+        )
+        _clients[loop] = client
+    return client
+
+
+async def close_qbo_client() -> None:
+    """
+    Closes the running event loop's client and its pooled connections.
+    """
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+def retry_after_seconds(response: httpx.Response) -> Optional[float]:
+    """
+    Reads a Retry-After header given as seconds or as an HTTP date; None when absent or unreadable.
+    """
+    value = response.headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+async def _send(send: Callable[[], Awaitable[httpx.Response]], realm_id: Optional[str]) -> httpx.Response:
+    """
+    Sends a QBO request, recording every attempt in qbo_request_duration_seconds by status code.
+    With a realm_id the request goes through the realm's rate limiter, and a 429 pauses the realm
+    (for its Retry-After) and is retried up to QBO_THROTTLE_MAX_RETRIES times.
+    """
+    for attempt in range(QBO_THROTTLE_MAX_RETRIES + 1):
+        if realm_id is not None:
+            QBO_RATE_LIMIT_WAIT.observe(await qbo_rate_limiter.acquire(realm_id))
+        start = time.perf_counter()
+        response = None
+        try:
+            response = await send()
+        finally:
+            # Whatever send() raised (a transport error, a decoding error, a cancellation), the
+            # acquired slot goes back exactly once.
+            elapsed = time.perf_counter() - start
+            QBO_REQUEST_DURATION.observe(elapsed, status="error" if response is None else response.status_code)
+            if realm_id is not None:
+                if response is None:
+                    await qbo_rate_limiter.release(realm_id, elapsed, None)
+                else:
+                    await qbo_rate_limiter.release(realm_id, elapsed, response.status_code, retry_after_seconds(response))
+        if realm_id is None or response.status_code != 429:
+            return response
+    return response
+
+
+@backoff.on_exception(backoff.expo, (httpx.TransportError,), max_tries=3)
+async def qbo_get(url: str, headers: dict, params: dict, realm_id: Optional[str] = None) -> httpx.Response:
+    """
+    Sends a GET to the QuickBooks API through the pooled client, retrying network errors with exponential backoff.
+    Requests of a realm_id are rate limited per realm, and retried when QBO throttles them.
+    """
+    return await _send(lambda: get_qbo_client().get(url, headers=headers, params=params), realm_id)
+
+
+@backoff.on_exception(backoff.expo, (httpx.TransportError,), max_tries=3)
+async def qbo_post(url: str, headers: dict, params: dict, json: dict, realm_id: Optional[str] = None) -> httpx.Response:
+    """
+    Sends a POST with a JSON body to the QuickBooks API; retries, rate limiting and metrics work like qbo_get.
+    """
+    return await _send(lambda: get_qbo_client().post(url, headers=headers, params=params, json=json), realm_id)
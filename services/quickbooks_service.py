@@ -1,78 +1,401 @@
-import backoff
-import requests
+import asyncio
+import time
+import httpx
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Optional
 from models.token import Token
 from models.account import Account
-from core.config import ACCOUNT_API_URL
+from schemas.account import AccountOut
+from core.config import (
+    QBO_QUERY_URL, QBO_PAGE_SIZE, QBO_PAGE_CONCURRENCY, QBO_BATCH_ENABLED, QBO_BATCH_MAX_OPERATIONS, QBO_BATCH_PAGES, SNAPSHOT_ENABLED,
+    QBO_SYNC_OVERLAP,
+)
 from sqlalchemy.orm import Session
-from services.token_service import get_latest_token, refresh_token
-from exceptions.exeptions import raise_accounts_fetch_failed, raise_token_not_found, raise_invalid_account_data
+from services.qbo_client import qbo_get
+from services.qbo_batch import post_batch, parse_batch_response
+from services.token_manager import token_manager
+from services.upsert_service import UpsertResult, delete_missing_rows, upsert_rows
+from services.sync_state_service import get_high_water_mark, set_high_water_mark
+from services.entity_registry import QBOEntity, ACCOUNT, get_entity
+from services.sync_run_service import SyncRunStats, start_sync_run, finish_sync_run
+from services.snapshot_service import save_page_snapshot, iter_snapshot_pages
+from models.sync_run import SyncRun
+from exceptions.exeptions import raise_accounts_fetch_failed, raise_invalid_account_data
 from exceptions.custom_exceptions import InvalidAccountData
+from utils.metrics import UPSERT_ROWS, UPSERT_ROWS_PER_SECOND
+from utils.fast_json import rows_to_dicts
+from utils.logger import get_logger
 
-@backoff.on_exception(backoff.expo, (requests.exceptions.RequestException,), max_tries=3)
-def fetch_accounts_from_qbo(token: Token):
+logger = get_logger("qbo.sync")
+
+async def fetch_entity_from_qbo(
+    token: Token,
+    entity: QBOEntity,
+    start_position: Optional[int] = None,
+    max_results: Optional[int] = None,
+    updated_since: Optional[datetime] = None,
+):
     """
-    Fetches accounts from QuickBooks Online using the provided token."
+    Runs the QBO query of a registered entity using the provided token.
+    When start_position and max_results are given, only that page is requested.
+    When updated_since is given, only rows (active or not) changed at or after it are requested.
     """
     headers = {
         "Authorization": f"Bearer {token.access_token}",
         "Accept": "application/json",
         "Content-Type": "application/text"
     }
-    query = "select * from Account"
-    url = ACCOUNT_API_URL.format(realm_id=token.realm_id) + f"?query={query}&minorversion=65"
-    response = requests.get(url, headers=headers)
-    return response
+    query = entity.query(start_position, max_results, updated_since)
+    url = QBO_QUERY_URL.format(realm_id=token.realm_id)
+    return await qbo_get(url, headers=headers, params={"query": query, "minorversion": 65}, realm_id=token.realm_id)
+
+async def fetch_accounts_from_qbo(
+    token: Token,
+    start_position: Optional[int] = None,
+    max_results: Optional[int] = None,
+    updated_since: Optional[datetime] = None,
+):
+    """
+    Fetches accounts from QuickBooks Online using the provided token; see fetch_entity_from_qbo.
+    """
+    return await fetch_entity_from_qbo(token, ACCOUNT, start_position, max_results, updated_since)
+
+def account_row_from_qbo(acc: dict, realm_id: str) -> dict:
+    """
+    Maps a QBO Account payload of the given realm to the column values stored in the accounts table.
+    """
+    return ACCOUNT.row_from_qbo(acc, realm_id)
+
+def save_entity_rows(db: Session, entity: QBOEntity, payloads: list[dict], realm_id: str, run_after_sync: bool = True) -> UpsertResult:
+    """
+    Saves QBO payloads of an entity for a realm with a batched bulk upsert and commits.
+    Returns the inserted, updated and unchanged row counts.
+    When any row was written, the entity's on_write hook runs, and its after_sync hook too unless
+    run_after_sync is False (paged syncs run it once after the last page instead).
+    """
+    start = time.perf_counter()
+    result = upsert_rows(db, entity.model, [entity.row_from_qbo(payload, realm_id) for payload in payloads], entity.key)
+    db.commit()
+    elapsed = time.perf_counter() - start
+    UPSERT_ROWS.inc(result.inserted, entity=entity.name, result="inserted")
+    UPSERT_ROWS.inc(result.updated, entity=entity.name, result="updated")
+    UPSERT_ROWS.inc(result.unchanged, entity=entity.name, result="unchanged")
+    if elapsed > 0:
+        UPSERT_ROWS_PER_SECOND.observe(len(payloads) / elapsed, entity=entity.name)
+    if result.inserted or result.updated:
+        if entity.on_write:
+            entity.on_write(realm_id)
+        if run_after_sync and entity.after_sync:
+            entity.after_sync(db, realm_id)
+    return result
 
-def save_accounts_to_db(db, accounts_data):
+def delete_unseen_entity_rows(
+    db: Session, entity: QBOEntity, realm_id: str, seen_keys: set[tuple], walk_started: Optional[datetime] = None
+) -> int:
     """
-    Saves the fetched accounts to the database.
+    Deletes the realm's rows of an entity that a complete walk of its QBO query did not return and commits.
+    Rows written since walk_started (by another sync of the realm) are kept.
+    Returns the number of rows deleted; the entity's on_write hook runs when any were.
+    """
+    deleted = delete_missing_rows(db, entity.model, realm_id, seen_keys, entity.key, written_before=walk_started)
+    db.commit()
+    if deleted:
+        logger.info(f"🗑️ Deleted {deleted} {entity.name} row(s) of realm {realm_id} that QBO no longer has")
+        if entity.on_write:
+            entity.on_write(realm_id)
+    return deleted
+
+def save_accounts_to_db(db, accounts_data, realm_id: str, refresh_hierarchy: bool = True) -> UpsertResult:
+    """
+    Saves the fetched accounts of a realm to the database with a batched bulk upsert.
+    Returns the inserted, updated and unchanged row counts.
+    Cached account reads of the realm are invalidated when any row was written, and the
+    materialized hierarchy is refreshed unless refresh_hierarchy is False (paged syncs
+    refresh it once after the last page instead).
     """
     if not accounts_data or not isinstance(accounts_data, list):
         raise InvalidAccountData("Accounts data is empty or invalid.")
+    return save_entity_rows(db, ACCOUNT, accounts_data, realm_id, refresh_hierarchy)
+
+async def iter_entity_pages(
+    db: Session,
+    token: Token,
+    entity: QBOEntity,
+    page_size: int = QBO_PAGE_SIZE,
+    concurrency: int = QBO_PAGE_CONCURRENCY,
+    updated_since: Optional[datetime] = None,
+    stats: Optional[SyncRunStats] = None,
+    batch: bool = QBO_BATCH_ENABLED,
+    batch_pages: int = QBO_BATCH_PAGES,
+) -> AsyncIterator[list[dict]]:
+    """
+    Walks the entity's QBO query with STARTPOSITION/MAXRESULTS and yields one page of payloads at a time.
+    With updated_since, only the rows changed since then are walked.
+    Without batch, `concurrency` /query requests of one page each are sent at once, so at most
+    page_size * concurrency rows are held in memory.
+    With batch, the first page is a single /query request; when it comes back full, the following pages are
+    fetched as `concurrency` /batch requests at once of `batch_pages` pages each (at most QBO_BATCH_MAX_OPERATIONS),
+    so up to page_size * batch_pages * concurrency rows are held in memory.
+    A 401 on any page refreshes the token once (single-flight across workers) and retries the pages of that window.
+    When stats is given, fetch and parse time, pages and downloaded bytes are added to it.
+    """
+    stats = stats if stats is not None else SyncRunStats()
+    batch_pages = max(1, min(batch_pages, QBO_BATCH_MAX_OPERATIONS))
+    start_position = 1
+    while True:
+        # Small entities fit in the first page, so it is never batched: a /batch of one would cost the same round-trip.
+        use_batch = batch and start_position > 1
+        requests = 1 if batch and not use_batch else concurrency
+        pages_per_request = batch_pages if use_batch else 1
+        # The page start positions of each request of the window, in page order.
+        chunks = [
+            [start_position + (r * pages_per_request + i) * page_size for i in range(pages_per_request)]
+            for r in range(requests)
+        ]
+
+        async def fetch_window() -> list[httpx.Response]:
+            if use_batch:
+                return await asyncio.gather(*(
+                    post_batch(token, [entity.query(start, page_size, updated_since) for start in chunk]) for chunk in chunks
+                ))
+            return await asyncio.gather(*(
+                fetch_entity_from_qbo(token, entity, chunk[0], page_size, updated_since=updated_since) for chunk in chunks
+            ))
+
+        fetch_started = time.perf_counter()
+        responses = await fetch_window()
+        if any(response.status_code == 401 for response in responses):
+            token = await asyncio.to_thread(token_manager.refresh, db, token)
+            responses = await fetch_window()
+        stats.fetch_seconds += time.perf_counter() - fetch_started
+
+        for chunk, response in zip(chunks, responses):
+            parse_started = time.perf_counter()
+            payload = response.json()
+            stats.parse_seconds += time.perf_counter() - parse_started
+            stats.bytes_downloaded += len(response.content)
+            if response.status_code != 200:
+                raise_accounts_fetch_failed(payload)
+
+            query_responses = parse_batch_response(payload, len(chunk)) if use_batch else [payload.get("QueryResponse", {})]
+            for query_response in query_responses:
+                rows = query_response.get(entity.name, [])
+                stats.pages += 1
+                stats.rows_fetched += len(rows)
+                if rows:
+                    yield rows
+                if len(rows) < page_size:
+                    return
+
+        start_position += page_size * requests * pages_per_request
 
-    for acc in accounts_data:
-        a = Account(
-            id=int(acc.get("Id")),
-            name=acc.get("Name"),
-            classification=acc.get("Classification"),
-            currency=acc.get("CurrencyRef", {}).get("value"),
-            account_type=acc.get("AccountType"),
-            active=acc.get("Active", False),
-            current_balance=acc.get("CurrentBalance", 0.0),
-            parent_id=int(acc.get("ParentRef").get("value")) if acc.get("SubAccount") else None,
+def iter_account_pages(
+    db: Session,
+    token: Token,
+    page_size: int = QBO_PAGE_SIZE,
+    concurrency: int = QBO_PAGE_CONCURRENCY,
+    updated_since: Optional[datetime] = None,
+    stats: Optional[SyncRunStats] = None,
+    batch: bool = QBO_BATCH_ENABLED,
+    batch_pages: int = QBO_BATCH_PAGES,
+) -> AsyncIterator[list[dict]]:
+    """
+    Yields the realm's accounts one QBO page at a time; see iter_entity_pages.
+    """
+    return iter_entity_pages(db, token, ACCOUNT, page_size, concurrency, updated_since, stats, batch, batch_pages)
+
+def latest_update_time(payloads: list[dict]) -> Optional[datetime]:
+    """
+    Returns the most recent MetaData.LastUpdatedTime of the given QBO payloads.
+    """
+    times = [
+        datetime.fromisoformat(payload["MetaData"]["LastUpdatedTime"])
+        for payload in payloads
+        if payload.get("MetaData", {}).get("LastUpdatedTime")
+    ]
+    return max(times, default=None)
+
+async def sync_entity_pages(db: Session, token: Token, entity: QBOEntity, full: bool = False, trigger: str = "api") -> int:
+    """
+    Fetches and saves the realm's rows of an entity page by page and returns the number of pages written.
+    Incremental runs only fetch rows changed since the entity's stored high-water mark;
+    full runs (or the first run of a realm) fetch everything. The mark only moves after every page is saved,
+    and never past QBO_SYNC_OVERLAP seconds before the walk started: a row QBO updates after its page was read
+    can be older than rows read later, and must still be fetched by the next run.
+    QBO queries never return deleted rows (invoices and bills are deleted outright rather than
+    deactivated), so a full run also deletes the stored rows of the realm it did not see, unless it saw none;
+    rows another sync (e.g. a Celery run beside an API-triggered one) wrote after the walk started are kept.
+    Database work runs in a worker thread so the event loop stays free for other syncs and requests.
+    Each call is recorded as a sync_runs row with its phase timings, bytes and row counts;
+    trigger tells what started it ("api" or "celery").
+    With SNAPSHOT_ENABLED, every fetched page is also stored compressed under the run, for replay_sync_run.
+    """
+    run = await asyncio.to_thread(start_sync_run, db, token.realm_id, entity.name, trigger, full)
+    stats = SyncRunStats()
+    try:
+        pages = await _sync_entity_pages(db, token, entity, full, stats, run.id if SNAPSHOT_ENABLED else None)
+    except Exception as e:
+        await asyncio.to_thread(finish_sync_run, db, run, stats, f"{type(e).__name__}: {e}")
+        raise
+    await asyncio.to_thread(finish_sync_run, db, run, stats)
+    return pages
+
+async def _sync_entity_pages(
+    db: Session, token: Token, entity: QBOEntity, full: bool, stats: SyncRunStats, snapshot_run_id: Optional[int] = None
+) -> int:
+    walk_started = datetime.now(timezone.utc)
+    updated_since = None if full else await asyncio.to_thread(get_high_water_mark, db, token.realm_id, entity.name)
+    high_water_mark = updated_since
+    pages = 0
+    totals = UpsertResult()
+    seen_keys = set() if updated_since is None else None
+
+    async for payloads in iter_entity_pages(db, token, entity, updated_since=updated_since, stats=stats):
+        if seen_keys is not None:
+            seen_keys.update(entity.key_from_qbo(payload, token.realm_id) for payload in payloads)
+        write_started = time.perf_counter()
+        if snapshot_run_id is not None:
+            # Stored before the upsert, so a page that fails to map is still kept for replay.
+            await asyncio.to_thread(save_page_snapshot, db, snapshot_run_id, token.realm_id, entity.name, pages + 1, payloads)
+        totals += await asyncio.to_thread(save_entity_rows, db, entity, payloads, token.realm_id, False)
+        stats.write_seconds += time.perf_counter() - write_started
+        pages += 1
+        page_mark = latest_update_time(payloads)
+        if page_mark and (high_water_mark is None or page_mark > high_water_mark):
+            high_water_mark = page_mark
+
+    logger.info(
+        f"📊 {entity.name} sync for realm {token.realm_id}: {pages} page(s), {totals.inserted} new, "
+        f"{totals.updated} changed, {totals.unchanged} skipped"
+    )
+    deleted = 0
+    if seen_keys is not None and not seen_keys:
+        # An empty walk is more likely an odd QBO response than a realm with every row deleted.
+        logger.warning(f"⚠️ Full {entity.name} sync of realm {token.realm_id} returned no rows; nothing was deleted")
+    elif seen_keys:
+        write_started = time.perf_counter()
+        deleted = await asyncio.to_thread(delete_unseen_entity_rows, db, entity, token.realm_id, seen_keys, walk_started)
+        stats.write_seconds += time.perf_counter() - write_started
+    stats.add_upsert(totals)
+    if (totals.inserted or totals.updated or deleted) and entity.after_sync:
+        hierarchy_started = time.perf_counter()
+        await asyncio.to_thread(entity.after_sync, db, token.realm_id)
+        stats.hierarchy_seconds += time.perf_counter() - hierarchy_started
+    if high_water_mark:
+        # Re-reading rows changed during the walk is cheap, as unchanged rows are skipped by their content hash.
+        high_water_mark = min(high_water_mark, walk_started - timedelta(seconds=QBO_SYNC_OVERLAP))
+    if high_water_mark and (updated_since is None or high_water_mark > updated_since):
+        await asyncio.to_thread(set_high_water_mark, db, token.realm_id, entity.name, high_water_mark)
+    return pages
+
+def replay_sync_run(db: Session, sync_run_id: int, realm_id: Optional[str] = None, overwrite_live: bool = False) -> dict:
+    """
+    Re-runs the transform and upsert of a sync run from its stored page snapshots, without calling QBO,
+    and returns the replay's counts and timings.
+    Rows are written under realm_id when given (e.g. a scratch realm), else under the run's own realm.
+    The replay is recorded as a sync_runs row with trigger "replay"; the high-water mark is left alone.
+    Writing into the run's own realm needs overwrite_live: the rows go back to the run's values, and as the
+    high-water mark does not move, incremental syncs will not fetch them again until they change in QBO.
+    """
+    source = db.get(SyncRun, sync_run_id)
+    if source is None:
+        raise ValueError(f"Sync run {sync_run_id} not found")
+    entity = get_entity(source.entity)
+    realm_id = realm_id or source.realm_id
+    if realm_id == source.realm_id and not overwrite_live:
+        raise ValueError(
+            f"Replaying sync run {sync_run_id} into its own realm {realm_id} would overwrite live rows; "
+            "give another realm, or overwrite_live"
         )
-        db.merge(a)
-    db.commit()
 
-def sync_qbo_accounts(db: Session) -> list[Account]:
-    token = get_latest_token(db)
-    if not token:
-        raise_token_not_found()
+    run = start_sync_run(db, realm_id, entity.name, "replay", source.full)
+    stats = SyncRunStats()
+    totals = UpsertResult()
+    try:
+        pages = iter_snapshot_pages(db, sync_run_id)
+        while True:
+            parse_started = time.perf_counter()
+            payloads = next(pages, None)
+            stats.parse_seconds += time.perf_counter() - parse_started
+            if payloads is None:
+                break
+            stats.pages += 1
+            stats.rows_fetched += len(payloads)
+            write_started = time.perf_counter()
+            totals += save_entity_rows(db, entity, payloads, realm_id, False)
+            stats.write_seconds += time.perf_counter() - write_started
+        stats.add_upsert(totals)
+        if (totals.inserted or totals.updated) and entity.after_sync:
+            hierarchy_started = time.perf_counter()
+            entity.after_sync(db, realm_id)
+            stats.hierarchy_seconds += time.perf_counter() - hierarchy_started
+    except Exception as e:
+        finish_sync_run(db, run, stats, f"{type(e).__name__}: {e}")
+        raise
+    finish_sync_run(db, run, stats)
 
-    response = fetch_accounts_from_qbo(token)
+    logger.info(
+        f"🔁 Replayed sync run {sync_run_id} ({entity.name}) into realm {realm_id}: {stats.pages} page(s), "
+        f"{totals.inserted} new, {totals.updated} changed, {totals.unchanged} skipped"
+    )
+    return {
+        "sync_run_id": run.id,
+        "replayed_run_id": sync_run_id,
+        "realm_id": realm_id,
+        "entity": entity.name,
+        "pages": stats.pages,
+        "rows": stats.rows_fetched,
+        "inserted": totals.inserted,
+        "updated": totals.updated,
+        "unchanged": totals.unchanged,
+        "parse_seconds": stats.parse_seconds,
+        "write_seconds": stats.write_seconds,
+        "hierarchy_seconds": stats.hierarchy_seconds,
+    }
 
-    if response.status_code == 401:
-        token = refresh_token(db, token)
-        response = fetch_accounts_from_qbo(token)
+async def sync_accounts_pages(db: Session, token: Token, full: bool = False, trigger: str = "api") -> int:
+    """
+    Syncs the realm's accounts page by page and returns the number of pages written; see sync_entity_pages.
+    """
+    return await sync_entity_pages(db, token, ACCOUNT, full, trigger)
 
-    if response.status_code != 200:
-        raise_accounts_fetch_failed(response.json())
+async def sync_qbo_accounts(db: Session, realm_id: Optional[str] = None, full: bool = False) -> list[dict]:
+    """
+    Syncs the accounts of a realm (the most recently connected one when realm_id is None)
+    and returns that realm's accounts as plain AccountOut-shaped dicts, read as column tuples
+    so no ORM objects are built.
+    """
+    token = await asyncio.to_thread(token_manager.get_token, db, realm_id)
 
-    accounts_data = response.json().get("QueryResponse", {}).get("Account", [])
-    save_accounts_to_db(db, accounts_data)
+    await sync_accounts_pages(db, token, full=full, trigger="api")
 
-    return db.query(Account).all()
+    fields = list(AccountOut.model_fields)
+    rows = await asyncio.to_thread(
+        lambda: db.query(*[getattr(Account, name) for name in fields]).filter(Account.realm_id == token.realm_id).all()
+    )
+    return rows_to_dicts(rows, fields)
 
 def build_account_tree(accounts):
-    account_dict = {account.id: {"id": account.id, "name": account.name, "children": []} for account in accounts}
+    """
+    Nests accounts into a forest of {field: value, ..., "children": [...]} nodes.
+    Accounts whose parent is not among the given accounts become roots, so a subtree
+    query's root (and any orphaned account) is never dropped.
+    """
+    # Account ids repeat across realms, so nodes are keyed by (realm_id, id).
+    account_dict = {
+        (account.realm_id, account.id): {
+            **{field: getattr(account, field) for field in AccountOut.model_fields},
+            "children": [],
+        }
+        for account in accounts
+    }
 
     root_nodes = []
 
     for account in accounts:
-        if account.parent_id:
-            parent = account_dict.get(account.parent_id)
-            if parent:
-                parent["children"].append(account_dict[account.id])
+        parent = account_dict.get((account.realm_id, account.parent_id)) if account.parent_id else None
+        if parent:
+            parent["children"].append(account_dict[(account.realm_id, account.id)])
         else:
-            root_nodes.append(account_dict[account.id])
+            root_nodes.append(account_dict[(account.realm_id, account.id)])
     return root_nodes
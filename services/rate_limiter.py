@@ -0,0 +1,211 @@
+import asyncio
+import threading
+import time
+from typing import Optional
+import redis
+from core.config import (
+    QBO_RATE_LIMIT_PER_MINUTE,
+    QBO_RATE_LIMIT_BURST,
+    QBO_CONCURRENCY_MIN,
+    QBO_CONCURRENCY_MAX,
+    QBO_LATENCY_TARGET,
+    QBO_THROTTLE_COOLDOWN,
+)
+from utils.logger import get_logger
+from utils.redis_client import get_redis_client
+
+logger = get_logger("qbo.rate_limit")
+
+# Reserves one request from the realm's bucket and returns {1, seconds until it may be sent}.
+# The bucket may go negative, so waiting callers are served in arrival order instead of racing for refills.
+# KEYS[2] is set by a 429 and blocks the realm for its Retry-After: then nothing is reserved and
+# {0, seconds left} tells the caller to try again after the block.
+_ACQUIRE_SCRIPT = """
+local blocked = redis.call('PTTL', KEYS[2])
+if blocked > 0 then
+    return {0, tostring(blocked / 1000)}
+end
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate) - 1
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil((burst - tokens) / rate * 1000) + 1000)
+return {1, tostring(math.max(0, -tokens / rate))}
+"""
+
+
+class _LocalBucket:
+    """
+    In-process version of the Redis bucket, used without Redis or while it is unreachable.
+    """
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+    def reserve(self) -> tuple[bool, float]:
+        with self.lock:
+            now = time.monotonic()
+            if self.blocked_until > now:
+                return False, self.blocked_until - now
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate) - 1
+            self.updated = now
+            return True, max(0.0, -self.tokens / self.rate)
+
+    def block(self, seconds: float) -> None:
+        with self.lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+class AdaptiveConcurrency:
+    """
+    AIMD limit on a realm's in-flight requests within this process: the limit grows by
+    1/limit per fast response (about +1 per round of requests), shrinks by 10% when a
+    response is slower than latency_target, and halves on a 429.
+    """
+
+    def __init__(self, minimum: int, maximum: int, latency_target: float):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.latency_target = latency_target
+        # Start at the cap and let throttling and latency pull it down, rather than ramping up every sync.
+        self.limit = float(maximum)
+        self.in_flight = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._condition: Optional[asyncio.Condition] = None
+
+    def _loop_condition(self) -> asyncio.Condition:
+        # Each Celery task runs its own event loop; requests of a finished loop are no longer in flight.
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._condition = asyncio.Condition()
+            self.in_flight = 0
+        return self._condition
+
+    async def acquire(self) -> None:
+        condition = self._loop_condition()
+        async with condition:
+            await condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    def record(self, latency: float, throttled: bool) -> None:
+        if throttled:
+            self.limit = max(self.minimum, self.limit / 2)
+        elif latency > self.latency_target:
+            self.limit = max(self.minimum, self.limit * 0.9)
+        else:
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+
+    async def release(self) -> None:
+        condition = self._loop_condition()
+        async with condition:
+            self.in_flight = max(0, self.in_flight - 1)
+            condition.notify_all()
+
+
+class QBORateLimiter:
+    """
+    Keeps each realm's QBO calls under its throttling limits.
+
+    Requests are drawn from a per-realm token bucket (rate_per_minute, refilled continuously,
+    up to burst at once) that lives in Redis so every API and worker process shares it; a 429
+    blocks the realm in Redis for its Retry-After (or cooldown seconds), so all processes back
+    off together. Within a process, AdaptiveConcurrency caps the realm's in-flight requests.
+    """
+
+    def __init__(
+        self,
+        redis_client: Optional[redis.Redis] = None,
+        rate_per_minute: float = QBO_RATE_LIMIT_PER_MINUTE,
+        burst: float = QBO_RATE_LIMIT_BURST,
+        min_concurrency: int = QBO_CONCURRENCY_MIN,
+        max_concurrency: int = QBO_CONCURRENCY_MAX,
+        latency_target: float = QBO_LATENCY_TARGET,
+        cooldown: float = QBO_THROTTLE_COOLDOWN,
+    ):
+        self.redis = redis_client
+        self.rate = rate_per_minute / 60
+        self.burst = burst
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.latency_target = latency_target
+        self.cooldown = cooldown
+        self._buckets: dict[str, _LocalBucket] = {}
+        self._concurrency: dict[str, AdaptiveConcurrency] = {}
+        self._guard = threading.Lock()
+
+    def _local_bucket(self, realm_id: str) -> _LocalBucket:
+        with self._guard:
+            return self._buckets.setdefault(realm_id, _LocalBucket(self.rate, self.burst))
+
+    def concurrency(self, realm_id: str) -> AdaptiveConcurrency:
+        with self._guard:
+            return self._concurrency.setdefault(
+                realm_id, AdaptiveConcurrency(self.min_concurrency, self.max_concurrency, self.latency_target)
+            )
+
+    def _reserve(self, realm_id: str) -> tuple[bool, float]:
+        if self.redis is not None:
+            try:
+                reserved, wait = self.redis.eval(
+                    _ACQUIRE_SCRIPT, 2, f"qbo-rate:{realm_id}", f"qbo-rate-block:{realm_id}", self.rate, self.burst
+                )
+                return bool(reserved), float(wait)
+            except redis.RedisError as e:
+                logger.warning(f"⚠️ Shared QBO rate limit unavailable, limiting in-process: {e}")
+        return self._local_bucket(realm_id).reserve()
+
+    def _block(self, realm_id: str, seconds: float) -> None:
+        self._local_bucket(realm_id).block(seconds)
+        if self.redis is not None:
+            try:
+                self.redis.set(f"qbo-rate-block:{realm_id}", 1, px=max(1, int(seconds * 1000)))
+            except redis.RedisError as e:
+                logger.warning(f"⚠️ Could not share QBO throttling of realm {realm_id}: {e}")
+
+    async def acquire(self, realm_id: str) -> float:
+        """
+        Waits for a concurrency slot and a request from the realm's bucket; returns the seconds waited.
+        Every acquire must be followed by release.
+        """
+        started = time.perf_counter()
+        concurrency = self.concurrency(realm_id)
+        await concurrency.acquire()
+        try:
+            while True:
+                reserved, wait = await asyncio.to_thread(self._reserve, realm_id)
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                if reserved:
+                    break
+        except BaseException:
+            await concurrency.release()
+            raise
+        return time.perf_counter() - started
+
+    async def release(self, realm_id: str, latency: float, status_code: Optional[int], retry_after: Optional[float] = None) -> None:
+        """
+        Frees the realm's slot and feeds the response into the AIMD limit; a 429 also blocks
+        the realm for retry_after seconds (cooldown when QBO sent none).
+        """
+        throttled = status_code == 429
+        if throttled:
+            seconds = retry_after if retry_after is not None else self.cooldown
+            logger.warning(f"🐢 QBO throttled realm {realm_id}; pausing its requests for {seconds:.1f}s")
+            await asyncio.to_thread(self._block, realm_id, seconds)
+        concurrency = self.concurrency(realm_id)
+        concurrency.record(latency, throttled)
+        await concurrency.release()
+
+
+qbo_rate_limiter = QBORateLimiter(get_redis_client())
@@ -0,0 +1,79 @@
+import base64
+import binascii
+import json
+from typing import Optional, Sequence
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Session
+from models.account import Account
+from schemas.account import AccountOut
+from exceptions.exeptions import raise_invalid_query
+
+SEARCH_FIELDS = list(AccountOut.model_fields)
+_KEY_FIELDS = ["realm_id", "id"]
+
+
+def encode_cursor(realm_id: str, account_id: int) -> str:
+    """
+    Encodes the key of the last returned account as an opaque cursor.
+    """
+    return base64.urlsafe_b64encode(json.dumps([realm_id, account_id]).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[str, int]:
+    try:
+        realm_id, account_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return str(realm_id), int(account_id)
+    except (binascii.Error, ValueError, TypeError):
+        raise_invalid_query("Malformed cursor")
+
+
+def parse_fields(fields: Optional[str]) -> list[str]:
+    """
+    Parses a comma separated fields= projection, defaulting to every AccountOut field.
+    """
+    if not fields:
+        return SEARCH_FIELDS
+    requested = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in requested if name not in SEARCH_FIELDS]
+    if unknown:
+        raise_invalid_query(f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(SEARCH_FIELDS)}")
+    return requested
+
+
+def search_accounts(
+    db: Session,
+    realm_id: Optional[str] = None,
+    active: Optional[bool] = None,
+    classification: Optional[str] = None,
+    fields: Sequence[str] = SEARCH_FIELDS,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+) -> tuple[list[dict], Optional[str]]:
+    """
+    Returns one keyset page of matching accounts as plain dicts holding only the requested fields,
+    plus the cursor of the next page (None on the last page).
+    Only the needed columns are selected, so no ORM objects are built.
+    Pages are ordered by (realm_id, id) and resume strictly after the cursor's key.
+    """
+    selected = list(dict.fromkeys([*fields, *_KEY_FIELDS]))
+    conditions = []
+    if realm_id is not None:
+        conditions.append(Account.realm_id == realm_id)
+    if active is not None:
+        conditions.append(Account.active == active)
+    if classification:
+        conditions.append(Account.classification == classification)
+    if cursor:
+        conditions.append(tuple_(Account.realm_id, Account.id) > tuple_(*decode_cursor(cursor)))
+
+    rows = (
+        db.query(*[getattr(Account, name) for name in selected])
+        .filter(*conditions)
+        .order_by(Account.realm_id, Account.id)
+        .limit(limit + 1)
+        .all()
+    )
+
+    page = [dict(zip(selected, row)) for row in rows[:limit]]
+    next_cursor = encode_cursor(page[-1]["realm_id"], page[-1]["id"]) if len(rows) > limit else None
+    return [{name: row[name] for name in fields} for row in page], next_cursor
@@ -0,0 +1,155 @@
+import argparse
+import gzip
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Iterator, Optional
+from sqlalchemy.orm import Session
+from models.page_snapshot import PageSnapshot
+from models.sync_run import SyncRun
+from core.config import SNAPSHOT_CODEC, SNAPSHOT_RETENTION_DAYS
+from utils.fast_json import dumps
+from utils.logger import get_logger
+
+try:
+    import zstandard
+except ImportError:  # zstandard is optional; snapshots are gzip-compressed without it.
+    zstandard = None
+
+logger = get_logger("qbo.snapshot")
+
+
+def snapshot_codec() -> str:
+    """
+    Returns the codec new snapshots are written with: SNAPSHOT_CODEC, or gzip when zstd is not installed.
+    """
+    return "zstd" if SNAPSHOT_CODEC == "zstd" and zstandard is not None else "gzip"
+
+
+def compress_payloads(payloads: list[dict], codec: str) -> tuple[bytes, int]:
+    """
+    Encodes a page of QBO payloads as JSON and compresses it; returns the data and the uncompressed size.
+    """
+    raw = dumps(payloads)
+    if codec == "zstd":
+        return zstandard.ZstdCompressor().compress(raw), len(raw)
+    return gzip.compress(raw, compresslevel=6), len(raw)
+
+
+def decompress_payloads(data: bytes, codec: str) -> list[dict]:
+    """
+    Inverse of compress_payloads.
+    """
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstd snapshots need the zstandard package")
+        raw = zstandard.ZstdDecompressor().decompress(data)
+    else:
+        raw = gzip.decompress(data)
+    return json.loads(raw)
+
+
+def save_page_snapshot(db: Session, sync_run_id: int, realm_id: str, entity: str, page: int, payloads: list[dict]) -> bool:
+    """
+    Stores one fetched page of a sync run and commits; returns whether it was stored.
+    Failures are logged rather than raised: a missing snapshot must never fail the sync itself.
+    """
+    codec = snapshot_codec()
+    try:
+        data, raw_bytes = compress_payloads(payloads, codec)
+        db.add(PageSnapshot(
+            sync_run_id=sync_run_id, page=page, realm_id=realm_id, entity=entity,
+            codec=codec, row_count=len(payloads), raw_bytes=raw_bytes, data=data,
+        ))
+        db.commit()
+        return True
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"⚠️ Could not store snapshot of page {page} of sync run {sync_run_id}: {e}")
+        return False
+
+
+def snapshot_pages(db: Session, sync_run_id: int) -> list[int]:
+    """
+    Returns the page numbers stored for a sync run, in fetch order.
+    """
+    rows = db.query(PageSnapshot.page).filter(PageSnapshot.sync_run_id == sync_run_id).order_by(PageSnapshot.page).all()
+    return [page for page, in rows]
+
+
+def iter_snapshot_pages(db: Session, sync_run_id: int) -> Iterator[list[dict]]:
+    """
+    Yields the payloads of each stored page of a sync run in fetch order, loading one page at a time.
+    """
+    for page in snapshot_pages(db, sync_run_id):
+        data, codec = (
+            db.query(PageSnapshot.data, PageSnapshot.codec)
+            .filter(PageSnapshot.sync_run_id == sync_run_id, PageSnapshot.page == page)
+            .one()
+        )
+        yield decompress_payloads(data, codec)
+
+
+def latest_snapshot_run(db: Session, realm_id: str, entity: str) -> Optional[SyncRun]:
+    """
+    Returns the most recent sync run of the realm and entity that has stored snapshots.
+    """
+    return (
+        db.query(SyncRun)
+        .filter(SyncRun.realm_id == realm_id, SyncRun.entity == entity)
+        .filter(SyncRun.id.in_(db.query(PageSnapshot.sync_run_id)))
+        .order_by(SyncRun.started_at.desc())
+        .first()
+    )
+
+
+def prune_snapshots(db: Session, retention_days: float = SNAPSHOT_RETENTION_DAYS) -> int:
+    """
+    Deletes the snapshots older than retention_days and returns how many pages were removed.
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(days=retention_days)
+    deleted = db.query(PageSnapshot).filter(PageSnapshot.created_at < cutoff).delete(synchronize_session=False)
+    db.commit()
+    return deleted
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    """
+    Replays a stored sync run into the database without calling QBO.
+    """
+    from database.session import SessionLocal
+    from services.quickbooks_service import replay_sync_run
+
+    parser = argparse.ArgumentParser(
+        prog="python -m services.snapshot_service",
+        description="Re-run the transform and write pipeline of a sync run from its stored QBO page snapshots.",
+    )
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--run-id", type=int, help="sync_runs.id to replay")
+    target.add_argument("--latest", nargs=2, metavar=("REALM_ID", "ENTITY"), help="replay the newest run with snapshots")
+    destination = parser.add_mutually_exclusive_group(required=True)
+    destination.add_argument("--into-realm", help="write the rows under this realm_id instead of the run's own")
+    destination.add_argument(
+        "--overwrite-live", action="store_true",
+        help="write the rows into the run's own realm, rolling them back to the run's values until the next full sync",
+    )
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        run_id = args.run_id
+        if args.latest:
+            run = latest_snapshot_run(db, *args.latest)
+            if run is None:
+                parser.error(f"no snapshots stored for realm {args.latest[0]} and entity {args.latest[1]}")
+            run_id = run.id
+        try:
+            result = replay_sync_run(db, run_id, realm_id=args.into_realm, overwrite_live=args.overwrite_live)
+        except ValueError as e:
+            parser.error(str(e))
+        print(json.dumps(result, indent=2))
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
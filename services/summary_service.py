@@ -0,0 +1,94 @@
+import json
+from typing import Optional, Sequence
+from sqlalchemy import and_, func, select
+from sqlalchemy.orm import Session
+from models.account import Account
+
+# Extra dimensions the balance summary can be broken down by, below classification.
+SUMMARY_GROUP_COLUMNS = {
+    "account_type": Account.account_type,
+    "currency": Account.currency,
+    "active": Account.active,
+}
+
+
+def _summary_key(value) -> str:
+    # JSON object keys must be strings: True/False/None become "true"/"false"/"null".
+    return value if isinstance(value, str) else json.dumps(value)
+
+
+def _sort_nested(summary: dict) -> dict:
+    return {
+        key: _sort_nested(value) if isinstance(value, dict) else value
+        for key, value in sorted(summary.items())
+    }
+
+
+def get_balance_summary(db: Session, realm_id: Optional[str] = None, group_by: Sequence[str] = ()) -> dict:
+    """
+    Sums current balances per classification in a single GROUP BY query.
+    Each entry of group_by nests the totals one level deeper, e.g. group_by=["currency"]
+    returns {classification: {currency: total}}.
+    """
+    columns = [Account.classification] + [SUMMARY_GROUP_COLUMNS[name] for name in group_by]
+    query = db.query(*columns, func.sum(Account.current_balance)).filter(Account.classification.isnot(None))
+    if realm_id is not None:
+        query = query.filter(Account.realm_id == realm_id)
+
+    summary = {}
+    for *keys, total in query.group_by(*columns).all():
+        node = summary
+        for key in keys[:-1]:
+            node = node.setdefault(_summary_key(key), {})
+        node[_summary_key(keys[-1])] = round(total or 0.0, 2)
+    return _sort_nested(summary)
+
+
+def get_subtree_totals(db: Session, realm_id: Optional[str] = None) -> list[dict]:
+    """
+    Returns every account with its own balance and the total of its whole subtree,
+    rolled up parent_id links by a recursive CTE in one query.
+    """
+    accounts = Account.__table__
+    anchor = select(
+        accounts.c.realm_id,
+        accounts.c.id.label("ancestor_id"),
+        accounts.c.id,
+        accounts.c.current_balance,
+    )
+    if realm_id is not None:
+        anchor = anchor.where(accounts.c.realm_id == realm_id)
+    descendants = anchor.cte("descendants", recursive=True)
+
+    child = accounts.alias("child")
+    descendants = descendants.union_all(
+        select(child.c.realm_id, descendants.c.ancestor_id, child.c.id, child.c.current_balance)
+        .where(child.c.realm_id == descendants.c.realm_id, child.c.parent_id == descendants.c.id)
+    )
+
+    totals = (
+        select(
+            descendants.c.realm_id,
+            descendants.c.ancestor_id,
+            func.sum(descendants.c.current_balance).label("subtree_balance"),
+        )
+        .group_by(descendants.c.realm_id, descendants.c.ancestor_id)
+        .subquery()
+    )
+    stmt = (
+        select(
+            accounts.c.realm_id,
+            accounts.c.id,
+            accounts.c.name,
+            accounts.c.parent_id,
+            accounts.c.current_balance,
+            totals.c.subtree_balance,
+        )
+        .join(totals, and_(totals.c.realm_id == accounts.c.realm_id, totals.c.ancestor_id == accounts.c.id))
+        .order_by(accounts.c.realm_id, accounts.c.id)
+    )
+
+    return [
+        {**row, "subtree_balance": round(row["subtree_balance"] or 0.0, 2)}
+        for row in db.execute(stmt).mappings()
+    ]
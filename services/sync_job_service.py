@@ -0,0 +1,140 @@
+from dataclasses import dataclass
+from typing import Optional
+import redis
+from core.config import SYNC_JOB_LOCK_TTL
+from exceptions.custom_exceptions import SyncDeduplicationUnavailable
+from utils.logger import get_logger
+from utils.redis_client import get_redis_client
+
+logger = get_logger("qbo.sync")
+
+# A claim holds the job id, suffixed with ":full" for full syncs; the scripts compare the job id alone.
+
+# Drops the claim if it still belongs to the finishing job, handing it to the full sync queued behind it, if any.
+_RELEASE_SCRIPT = """
+local owner = redis.call('get', KEYS[1])
+if not owner or string.gsub(owner, ':full$', '') ~= ARGV[1] then
+    return false
+end
+local deferred = redis.call('get', KEYS[2])
+if deferred then
+    redis.call('del', KEYS[2])
+    redis.call('set', KEYS[1], deferred .. ':full', 'EX', ARGV[2])
+    return deferred
+end
+redis.call('del', KEYS[1])
+return false
+"""
+# Queues a full sync behind the in-flight job, unless that job has released its claim in the meantime.
+# Returns the id of the full sync queued behind it, which is an earlier request's when there already is one.
+_DEFER_SCRIPT = """
+local owner = redis.call('get', KEYS[1])
+if not owner or string.gsub(owner, ':full$', '') ~= ARGV[1] then
+    return false
+end
+redis.call('set', KEYS[2], ARGV[2], 'NX', 'EX', ARGV[3])
+return redis.call('get', KEYS[2])
+"""
+
+
+@dataclass(frozen=True)
+class SyncClaim:
+    """
+    The job holding a realm's sync claim, and whether it is a full sync.
+    """
+    job_id: str
+    full: bool = False
+
+
+def _job_key(realm_id: str, entity: str) -> str:
+    return f"sync-job:{entity}:{realm_id}"
+
+
+def _deferred_key(realm_id: str, entity: str) -> str:
+    return f"sync-job-full:{entity}:{realm_id}"
+
+
+def claim_sync_job(realm_id: str, job_id: str, entity: str = "Account", full: bool = False) -> Optional[SyncClaim]:
+    """
+    Registers job_id as the realm's in-flight sync (SET NX), unless another job already is.
+    Returns the claim of that other job, or None when the claim succeeded.
+    Without Redis every claim succeeds, so syncs are simply not deduplicated.
+    """
+    if _redis is None:
+        return None
+    key = _job_key(realm_id, entity)
+    try:
+        if _redis.set(key, f"{job_id}:full" if full else job_id, nx=True, ex=SYNC_JOB_LOCK_TTL):
+            return None
+        existing = _redis.get(key)
+    except redis.RedisError as e:
+        logger.warning(f"⚠️ Sync deduplication unavailable: {e}")
+        return None
+    if existing is None:
+        # The other job released its claim in between; try once more.
+        return claim_sync_job(realm_id, job_id, entity, full)
+    existing_id, _, mode = existing.decode().partition(":")
+    return SyncClaim(existing_id, mode == "full")
+
+
+def defer_full_sync(realm_id: str, in_flight_job_id: str, job_id: str, entity: str = "Account") -> Optional[str]:
+    """
+    Queues job_id as a full sync to run once the realm's in-flight job has finished; release_sync_job
+    hands the claim over to it. Returns the id of the full sync queued behind the job (job_id, or an
+    earlier request's), or None when the in-flight job released its claim in the meantime.
+    Raises SyncDeduplicationUnavailable when Redis fails (e.g. scripting is disabled), so the caller can
+    enqueue the sync without deduplication instead.
+    """
+    if _redis is None:
+        return None
+    try:
+        deferred = _redis.eval(
+            _DEFER_SCRIPT, 2, _job_key(realm_id, entity), _deferred_key(realm_id, entity),
+            in_flight_job_id, job_id, SYNC_JOB_LOCK_TTL,
+        )
+    except redis.RedisError as e:
+        logger.warning(f"⚠️ Sync deduplication unavailable: {e}")
+        raise SyncDeduplicationUnavailable(str(e)) from e
+    return deferred.decode() if deferred else None
+
+
+def release_sync_job(realm_id: str, job_id: str, entity: str = "Account") -> Optional[str]:
+    """
+    Drops the realm's claim once its job has finished, if the claim is still this job's.
+    When a full sync was queued behind the job, the claim passes to it and its id is returned;
+    the caller must then enqueue it.
+    """
+    if _redis is None:
+        return None
+    try:
+        deferred = _redis.eval(
+            _RELEASE_SCRIPT, 2, _job_key(realm_id, entity), _deferred_key(realm_id, entity), job_id, SYNC_JOB_LOCK_TTL
+        )
+    except redis.RedisError as e:
+        # A claim left in place would block every sync of the realm for SYNC_JOB_LOCK_TTL.
+        logger.warning(f"⚠️ Could not release sync job {job_id} with a script, releasing it without: {e}")
+        return _release_without_script(realm_id, job_id, entity)
+    return deferred.decode() if deferred else None
+
+
+def _release_without_script(realm_id: str, job_id: str, entity: str) -> Optional[str]:
+    # The steps of _RELEASE_SCRIPT one command at a time, for Redis servers that refuse EVAL.
+    # Not atomic: a claim that expires between the GET and the DEL can be dropped for its next owner.
+    key, deferred_key = _job_key(realm_id, entity), _deferred_key(realm_id, entity)
+    try:
+        owner = _redis.get(key)
+        if owner is None or owner.decode().partition(":")[0] != job_id:
+            return None
+        deferred = _redis.get(deferred_key)
+        if deferred is None:
+            _redis.delete(key)
+            return None
+        _redis.delete(deferred_key)
+        _redis.set(key, f"{deferred.decode()}:full", ex=SYNC_JOB_LOCK_TTL)
+        return deferred.decode()
+    except redis.RedisError as e:
+        logger.warning(f"⚠️ Could not release sync job {job_id}: {e}")
+        return None
+
+
+_redis = get_redis_client()
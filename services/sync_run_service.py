@@ -0,0 +1,76 @@
+from dataclasses import dataclass, fields
+from datetime import datetime, timezone
+from typing import Optional
+from sqlalchemy.orm import Session
+from models.sync_run import SyncRun
+from services.upsert_service import UpsertResult
+from utils.logger import get_logger
+
+logger = get_logger("qbo.sync")
+
+
+@dataclass
+class SyncRunStats:
+    """
+    Counters a sync accumulates while it runs; stored on its SyncRun row when it finishes.
+    """
+    fetch_seconds: float = 0.0
+    parse_seconds: float = 0.0
+    write_seconds: float = 0.0
+    hierarchy_seconds: float = 0.0
+    pages: int = 0
+    bytes_downloaded: int = 0
+    rows_fetched: int = 0
+    rows_inserted: int = 0
+    rows_updated: int = 0
+    rows_unchanged: int = 0
+
+    def add_upsert(self, result: UpsertResult) -> None:
+        self.rows_inserted += result.inserted
+        self.rows_updated += result.updated
+        self.rows_unchanged += result.unchanged
+
+
+def start_sync_run(db: Session, realm_id: str, entity: str, trigger: str, full: bool = False) -> SyncRun:
+    """
+    Records that a sync has started and returns its run.
+    """
+    run = SyncRun(
+        realm_id=realm_id, entity=entity, trigger=trigger, full=full,
+        status="running", started_at=datetime.now(timezone.utc),
+    )
+    db.add(run)
+    db.commit()
+    return run
+
+
+def finish_sync_run(db: Session, run: SyncRun, stats: SyncRunStats, error: Optional[str] = None) -> None:
+    """
+    Stores the run's final status, duration and stats.
+    Failures here are logged rather than raised, so they never hide the sync's own outcome.
+    """
+    try:
+        if error is not None:
+            # The sync may have left the session mid-transaction.
+            db.rollback()
+        finished_at = datetime.now(timezone.utc)
+        started_at = run.started_at if run.started_at.tzinfo else run.started_at.replace(tzinfo=timezone.utc)
+        for field in fields(stats):
+            setattr(run, field.name, getattr(stats, field.name))
+        run.status = "failed" if error is not None else "succeeded"
+        run.error = error
+        run.finished_at = finished_at
+        run.duration_seconds = (finished_at - started_at).total_seconds()
+        db.commit()
+    except Exception as e:
+        logger.warning(f"⚠️ Could not record sync run {run.id}: {e}")
+
+
+def list_sync_runs(db: Session, realm_id: Optional[str] = None, limit: int = 50) -> list[SyncRun]:
+    """
+    Returns the most recent sync runs, newest first, optionally of one realm.
+    """
+    query = db.query(SyncRun)
+    if realm_id is not None:
+        query = query.filter(SyncRun.realm_id == realm_id)
+    return query.order_by(SyncRun.started_at.desc()).limit(limit).all()
@@ -0,0 +1,27 @@
+from datetime import datetime, timezone
+from typing import Optional
+from sqlalchemy.orm import Session
+from models.sync_state import SyncState
+
+def get_high_water_mark(db: Session, realm_id: str, entity: str) -> Optional[datetime]:
+    """
+    Returns the LastUpdatedTime up to which the entity has been synced for the realm,
+    or None when the realm has never been synced.
+    """
+    state = db.get(SyncState, (realm_id, entity))
+    if not state or state.last_updated_time is None:
+        return None
+    if state.last_updated_time.tzinfo is None:
+        return state.last_updated_time.replace(tzinfo=timezone.utc)
+    return state.last_updated_time
+
+def set_high_water_mark(db: Session, realm_id: str, entity: str, last_updated_time: datetime) -> None:
+    """
+    Stores the high-water mark for the entity and realm.
+    """
+    db.merge(SyncState(
+        realm_id=realm_id,
+        entity=entity,
+        last_updated_time=last_updated_time.astimezone(timezone.utc),
+    ))
+    db.commit()
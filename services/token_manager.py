@@ -0,0 +1,150 @@
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+import redis
+from sqlalchemy.orm import Session
+from models.token import Token
+from core.config import TOKEN_REFRESH_MARGIN, TOKEN_REFRESH_LOCK_TIMEOUT
+from services.token_service import get_latest_token, get_realm_ids, refresh_token
+from exceptions.exeptions import raise_token_not_found
+from utils.logger import get_logger
+from utils.redis_client import get_redis_client
+
+logger = get_logger("token")
+
+
+def _expires_at(token: Token) -> datetime:
+    created_at = token.created_at if token.created_at.tzinfo else token.created_at.replace(tzinfo=timezone.utc)
+    return created_at + timedelta(seconds=int(token.expires_in))
+
+
+def _detached_copy(token: Token) -> Token:
+    # ORM instances expire with their session; the cache keeps a plain, session-less copy.
+    return Token(**{column.key: getattr(token, column.key) for column in Token.__table__.columns})
+
+
+class TokenManager:
+    """
+    Hands out QBO access tokens per realm from an in-process cache.
+
+    A cached token is served until it is within refresh_margin seconds of expiring, after
+    which it is re-read from the database (another process may have renewed it already).
+    Refreshes are single-flight: a per-realm thread lock within the process and a Redis lock
+    across processes, and the refresh is skipped when the database already holds a newer token
+    than the one that was rejected, so concurrent 401s never invalidate each other's refresh token.
+    renew_expiring() is run by Celery beat to renew tokens before they expire, so syncs
+    normally never refresh inline.
+    """
+
+    def __init__(
+        self,
+        redis_client: Optional[redis.Redis] = None,
+        refresh_margin: float = TOKEN_REFRESH_MARGIN,
+        lock_timeout: float = TOKEN_REFRESH_LOCK_TIMEOUT,
+    ):
+        self.redis = redis_client
+        self.refresh_margin = timedelta(seconds=refresh_margin)
+        self.lock_timeout = lock_timeout
+        self._tokens: dict[str, Token] = {}
+        self._locks: dict[str, threading.Lock] = {}
+        self._guard = threading.Lock()
+
+    def _is_fresh(self, token: Optional[Token]) -> bool:
+        return token is not None and _expires_at(token) - self.refresh_margin > datetime.now(timezone.utc)
+
+    def _realm_lock(self, realm_id: str) -> threading.Lock:
+        with self._guard:
+            return self._locks.setdefault(realm_id, threading.Lock())
+
+    def _cache(self, token: Token) -> Token:
+        copy = _detached_copy(token)
+        with self._guard:
+            self._tokens[token.realm_id] = copy
+        return copy
+
+    def get_token(self, db: Session, realm_id: Optional[str] = None) -> Token:
+        """
+        Returns a token of the realm (the most recently connected one when realm_id is None)
+        that stays valid for at least refresh_margin seconds, refreshing it only as a fallback.
+        """
+        if realm_id is not None:
+            cached = self._tokens.get(realm_id)
+            if self._is_fresh(cached):
+                return cached
+
+        token = get_latest_token(db, realm_id)
+        if not token:
+            raise_token_not_found()
+        if self._is_fresh(token):
+            return self._cache(token)
+        return self.refresh(db, token)
+
+    def refresh(self, db: Session, stale: Token) -> Token:
+        """
+        Replaces a rejected or expiring token with a fresh one, at most one refresh per realm at a time.
+        The token is re-read once the lock is held (or its wait timed out), and is only refreshed when the
+        database has no fresh replacement for it yet.
+        """
+        with self._realm_lock(stale.realm_id), self._distributed_lock(stale.realm_id):
+            # Whoever held the lock before us, or still holds it after our wait timed out, may have refreshed already.
+            current = get_latest_token(db, stale.realm_id)
+            if current is not None and current.access_token != stale.access_token and self._is_fresh(current):
+                return self._cache(current)
+            logger.info(f"🔄 Refreshing QBO token for realm {stale.realm_id}")
+            return self._cache(refresh_token(db, current or stale))
+
+    @contextmanager
+    def _distributed_lock(self, realm_id: str):
+        if self.redis is None:
+            yield
+            return
+        lock = self.redis.lock(f"token-refresh:{realm_id}", timeout=self.lock_timeout)
+        try:
+            acquired = lock.acquire(blocking_timeout=self.lock_timeout)
+            if not acquired:
+                logger.warning(
+                    f"⚠️ Timed out after {self.lock_timeout}s waiting for the token refresh lock of realm {realm_id}; "
+                    "refreshing without it unless another process already has"
+                )
+        except redis.RedisError as e:
+            logger.warning(f"⚠️ Token refresh lock unavailable, refreshing without it: {e}")
+            acquired = False
+        try:
+            yield
+        finally:
+            if acquired:
+                try:
+                    lock.release()
+                except redis.RedisError as e:
+                    logger.warning(f"⚠️ Could not release token refresh lock: {e}")
+
+    def renew_expiring(self, db: Session) -> list[str]:
+        """
+        Refreshes every realm's token that expires within refresh_margin and returns those realm ids.
+        A realm whose refresh fails is logged and skipped so the others still renew.
+        """
+        renewed = []
+        for realm_id in get_realm_ids(db):
+            token = get_latest_token(db, realm_id)
+            if token is None or self._is_fresh(token):
+                continue
+            try:
+                self.refresh(db, token)
+                renewed.append(realm_id)
+            except Exception as e:
+                logger.warning(f"⚠️ Could not renew QBO token for realm {realm_id}: {e}")
+        return renewed
+
+    def invalidate(self, realm_id: Optional[str] = None) -> None:
+        """
+        Drops the cached token of a realm (of every realm when realm_id is None).
+        """
+        with self._guard:
+            if realm_id is None:
+                self._tokens.clear()
+            else:
+                self._tokens.pop(realm_id, None)
+
+
+token_manager = TokenManager(get_redis_client())
@@ -1,54 +1,70 @@
+from typing import Optional
 from sqlalchemy.orm import Session
 from models.token import Token
 from exceptions.exeptions import raise_qbo_error, raise_token_refresh_failed, raise_token_not_found
-from core.config import auth_client
+from core.config import auth_client, auth_client_lock
 from intuitlib.exceptions import AuthClientError
+from utils.metrics import TOKEN_REFRESHES
 
-def get_valid_token(db: Session) -> Token:
+def get_valid_token(db: Session, realm_id: Optional[str] = None) -> Token:
     """
-    Fetches the latest token from the database and checks if it is expired.
+    Fetches the latest token (of the realm, when given) from the database and checks if it is expired.
     If expired, it refreshes the token and returns the new token.
     """
-    token = db.query(Token).order_by(Token.created_at.desc()).first()
+    token = get_latest_token(db, realm_id)
     if not token:
         raise_qbo_error("Token not found. Please authenticate first.")
     if token.is_token_expired():
         token = refresh_token(db, token)
     return token
 
-def get_latest_token(db: Session) -> Token:
+def get_latest_token(db: Session, realm_id: Optional[str] = None) -> Token:
     """
     Fetches the latest token from the database.
+    When realm_id is given, only that company's tokens are considered.
     """
-    return db.query(Token).order_by(Token.created_at.desc()).first()
+    query = db.query(Token)
+    if realm_id is not None:
+        query = query.filter(Token.realm_id == realm_id)
+    return query.order_by(Token.created_at.desc()).first()
+
+def get_realm_ids(db: Session) -> list[str]:
+    """
+    Returns the realm ids of every connected QBO company.
+    """
+    return [realm_id for (realm_id,) in db.query(Token.realm_id).distinct().all() if realm_id]
 
 def refresh_token(db: Session, token: Token) -> Token:
     """
-    Refreshes the token using the refresh token.'
+    Refreshes the token using the refresh token.
+    Callers that may race should go through token_manager.refresh, which makes this single-flight.
     """
-    try:
-        auth_client.refresh(refresh_token=token.refresh_token)
-    except AuthClientError as e:
-        raise_token_refresh_failed(str(e))
+    with auth_client_lock:
+        try:
+            auth_client.refresh(refresh_token=token.refresh_token)
+        except AuthClientError as e:
+            TOKEN_REFRESHES.inc(outcome="failure")
+            raise_token_refresh_failed(str(e))
 
-    new_token_data = {
-        "access_token": auth_client.access_token,
-        "refresh_token": auth_client.refresh_token,
-        "expires_in": auth_client.expires_in,
-        "realm_id": token.realm_id,
-        "token_type": "Bearer"
-    }
+        new_token_data = {
+            "access_token": auth_client.access_token,
+            "refresh_token": auth_client.refresh_token,
+            "expires_in": auth_client.expires_in,
+            "realm_id": token.realm_id,
+            "token_type": "Bearer"
+        }
+    TOKEN_REFRESHES.inc(outcome="success")
 
     save_tokens_to_db(db, new_token_data)
-    return get_latest_token(db)
+    return get_latest_token(db, token.realm_id)
 
 def save_tokens_to_db(db: Session, token_data: dict) -> None:
     """
-    Saves the token data to the database."
+    Saves the token data to the database, replacing the previous tokens of the same realm.
     """
     if not token_data or not isinstance(token_data, dict) :
         raise_token_not_found("Token data is empty or invalid.")
-    db.query(Token).delete()
+    db.query(Token).filter(Token.realm_id == token_data["realm_id"]).delete()
     db.commit()
     token = Token(
         access_token=token_data["access_token"],
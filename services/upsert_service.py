@@ -0,0 +1,151 @@
+import hashlib
+import json
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Optional, Sequence
+from sqlalchemy import delete, insert, or_, select, tuple_, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from models.account import Account
+from core.config import UPSERT_BATCH_SIZE
+
+
+@dataclass
+class UpsertResult:
+    """
+    Row counts reported by a bulk upsert.
+    """
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+
+    def __add__(self, other: "UpsertResult") -> "UpsertResult":
+        return UpsertResult(
+            inserted=self.inserted + other.inserted,
+            updated=self.updated + other.updated,
+            unchanged=self.unchanged + other.unchanged,
+        )
+
+
+def row_content_hash(row: dict) -> str:
+    """
+    Fingerprint of the stored QBO fields of a row, used to skip rows QBO returned unchanged.
+    """
+    payload = {name: value for name, value in row.items() if name != "content_hash"}
+    return hashlib.blake2b(json.dumps(payload, sort_keys=True, default=str).encode(), digest_size=16).hexdigest()
+
+
+def upsert_rows(
+    db: Session,
+    model: type,
+    rows: list[dict],
+    key: Optional[Sequence[str]] = None,
+    batch_size: int = UPSERT_BATCH_SIZE,
+) -> UpsertResult:
+    """
+    Inserts or updates rows of the model in batches without committing.
+    key defaults to the model's primary key; the model needs a content_hash column.
+    Each batch first reads the stored content hashes of its keys; rows whose hash matches
+    are skipped without being written, so an unchanged resync writes nothing at all.
+    New and changed rows go through INSERT ... ON CONFLICT (key) DO UPDATE on PostgreSQL,
+    and through bulk INSERT and bulk UPDATE statements on other dialects (SQLite in tests).
+    Written rows get the current time in updated_at when the model has that column.
+    """
+    table = model.__table__
+    key = tuple(key or (c.name for c in table.primary_key.columns))
+    # QBO never returns an entity twice, but ON CONFLICT rejects duplicate keys in one statement.
+    rows = list({tuple(row[name] for name in key): row for row in rows}.values())
+    write_batch = _write_batch_postgresql if db.get_bind().dialect.name == "postgresql" else _write_batch_generic
+
+    stamp = "updated_at" in table.c
+
+    result = UpsertResult()
+    for i in range(0, len(rows), batch_size):
+        batch = [{**row, "content_hash": row_content_hash(row)} for row in rows[i:i + batch_size]]
+        if stamp:
+            # Added after hashing, so the time never makes an unchanged row look changed.
+            written_at = datetime.now(timezone.utc)
+            batch = [{**row, "updated_at": written_at} for row in batch]
+        stored = _stored_hashes(db, table, key, batch)
+        new_rows, changed_rows = [], []
+        for row in batch:
+            row_key = tuple(row[name] for name in key)
+            if row_key not in stored:
+                new_rows.append(row)
+            elif stored[row_key] != row["content_hash"]:
+                changed_rows.append(row)
+        write_batch(db, model, key, new_rows, changed_rows)
+        result += UpsertResult(
+            inserted=len(new_rows),
+            updated=len(changed_rows),
+            unchanged=len(batch) - len(new_rows) - len(changed_rows),
+        )
+    return result
+
+
+def delete_missing_rows(
+    db: Session,
+    model: type,
+    realm_id: str,
+    seen_keys: set[tuple],
+    key: Optional[Sequence[str]] = None,
+    batch_size: int = UPSERT_BATCH_SIZE,
+    written_before: Optional[datetime] = None,
+) -> int:
+    """
+    Deletes the realm's rows of the model whose key is not in seen_keys, without committing,
+    and returns how many were deleted. A sync that walked every row QBO has passes the keys it
+    saw, so rows deleted in QBO (e.g. deleted invoices and bills) are removed locally too.
+    With written_before, rows whose updated_at is at or after it are kept: a sync running alongside
+    the walk may have written them after the walk passed their position.
+    """
+    table = model.__table__
+    key = tuple(key or (c.name for c in table.primary_key.columns))
+    key_columns = [table.c[name] for name in key]
+    query = select(*key_columns).where(table.c.realm_id == realm_id)
+    if written_before is not None:
+        query = query.where(or_(table.c.updated_at.is_(None), table.c.updated_at < written_before))
+    stale = [tuple(stored) for stored in db.execute(query) if tuple(stored) not in seen_keys]
+    for i in range(0, len(stale), batch_size):
+        db.execute(delete(table).where(tuple_(*key_columns).in_(stale[i:i + batch_size])))
+    return len(stale)
+
+
+def upsert_accounts(db: Session, rows: list[dict], batch_size: int = UPSERT_BATCH_SIZE) -> UpsertResult:
+    """
+    Inserts or updates account rows keyed by (realm_id, id); see upsert_rows.
+    """
+    return upsert_rows(db, Account, rows, batch_size=batch_size)
+
+
+def _stored_hashes(db: Session, table, key: tuple[str, ...], batch: list[dict]) -> dict[tuple, str]:
+    key_columns = [table.c[name] for name in key]
+    keys = [tuple(row[name] for name in key) for row in batch]
+    return {
+        tuple(stored[:-1]): stored[-1]
+        for stored in db.execute(select(*key_columns, table.c.content_hash).where(tuple_(*key_columns).in_(keys)))
+    }
+
+
+def _write_batch_postgresql(
+    db: Session, model: type, key: tuple[str, ...], new_rows: list[dict], changed_rows: list[dict]
+) -> None:
+    rows = new_rows + changed_rows
+    if not rows:
+        return
+    # Only the mapped QBO fields are written; derived columns (e.g. account path/depth) keep their values.
+    columns = [name for name in rows[0] if name not in key]
+
+    stmt = pg_insert(model.__table__).values(rows)
+    # ON CONFLICT keeps the write safe if another sync inserted one of the "new" rows meanwhile.
+    db.execute(stmt.on_conflict_do_update(index_elements=list(key), set_={name: stmt.excluded[name] for name in columns}))
+
+
+def _write_batch_generic(
+    db: Session, model: type, key: tuple[str, ...], new_rows: list[dict], changed_rows: list[dict]
+) -> None:
+    if new_rows:
+        db.execute(insert(model), new_rows)
+    if changed_rows:
+        # ORM bulk UPDATE matches rows on the primary key, which is the upsert key for every registered entity.
+        db.execute(update(model), changed_rows)
@@ -1,9 +1,27 @@
+import asyncio
+import time
+import uuid
+from typing import Optional
 from celery import Celery
-from utils.logger import get_logger
-from services.token_service import get_latest_token
-from services.quickbooks_service import fetch_accounts_from_qbo, save_accounts_to_db
-from core.config import CELERY_REDIS_URL, CELERY_SCHEDULE_INTERVAL
+from celery.result import AsyncResult
+from celery.states import READY_STATES
+from celery.signals import task_prerun, task_postrun, worker_process_shutdown
+from fastapi import HTTPException
+from utils.logger import get_logger, get_log_handler
+from services.token_service import get_realm_ids
+from services.token_manager import token_manager
+from services.sync_job_service import claim_sync_job, defer_full_sync, release_sync_job
+from exceptions.custom_exceptions import SyncDeduplicationUnavailable
+from services.quickbooks_service import sync_entity_pages
+from services.entity_registry import QBOEntity, get_entity
+from services.qbo_client import close_qbo_client
+from services.snapshot_service import prune_snapshots
+from core.config import (
+    QBO_SYNC_ENTITIES, CELERY_REDIS_URL, CELERY_SCHEDULE_INTERVAL, CELERY_WORKER_CONCURRENCY, TOKEN_RENEW_INTERVAL,
+    SNAPSHOT_PRUNE_INTERVAL, QBO_FULL_SYNC_INTERVAL,
+)
 from database.session import SessionLocal
+from utils.metrics import REGISTRY, CELERY_TASK_DURATION
 
 
 celery_logger = get_logger("celery.task")
@@ -17,37 +35,215 @@ celery_app = Celery(
 celery_app.conf.update(
     timezone="UTC",
     beat_schedule={
-        'update-qbo-accounts-every-minute': {
-            'task': 'tasks.tasks.update_qbo_accounts',
+        'sync-qbo-realms': {
+            'task': 'tasks.tasks.dispatch_realm_syncs',
             'schedule': CELERY_SCHEDULE_INTERVAL,
         },
+        'full-sync-qbo-realms': {
+            'task': 'tasks.tasks.dispatch_realm_syncs',
+            'schedule': QBO_FULL_SYNC_INTERVAL,
+            'kwargs': {'full': True},
+        },
+        'renew-qbo-tokens': {
+            'task': 'tasks.tasks.renew_qbo_tokens',
+            'schedule': TOKEN_RENEW_INTERVAL,
+        },
+        'prune-qbo-snapshots': {
+            'task': 'tasks.tasks.prune_qbo_snapshots',
+            'schedule': SNAPSHOT_PRUNE_INTERVAL,
+        },
     },
+    worker_concurrency=CELERY_WORKER_CONCURRENCY,
+    # Realm syncs are long-running; don't let one worker process hoard queued realms.
+    worker_prefetch_multiplier=1,
+    # Lets GET /accounts/sync/{job_id} tell queued jobs from running ones.
+    task_track_started=True,
     broker_pool_limit=5,
     broker_connection_timeout=10,
     broker_heartbeat=0
 )
 
 
+_task_started_at: dict[str, float] = {}
+
+@worker_process_shutdown.connect
+def _flush_logs(**kwargs):
+    # Prefork children leave through os._exit, so the atexit flush never runs there.
+    get_log_handler().flush()
+
+@task_prerun.connect
+def _record_task_start(task_id=None, **kwargs):
+    _task_started_at[task_id] = time.perf_counter()
+
+@task_postrun.connect
+def _record_task_duration(task_id=None, task=None, state=None, **kwargs):
+    """
+    Records the task's run time and publishes the worker process's metrics for the API's /metrics endpoint.
+    """
+    started_at = _task_started_at.pop(task_id, None)
+    if started_at is not None:
+        CELERY_TASK_DURATION.observe(time.perf_counter() - started_at, task=task.name, state=state or "UNKNOWN")
+    REGISTRY.publish()
+
+async def _sync_entity_and_close(db, token, entity: QBOEntity, full: bool) -> int:
+    # Each task runs in a fresh event loop, so its pooled client is closed with it.
+    try:
+        return await sync_entity_pages(db, token, entity, full=full, trigger="celery")
+    finally:
+        await close_qbo_client()
 
 @celery_app.task
-def update_qbo_accounts():
-    celery_logger.info("🚀 Background task started: Checking token and updating accounts")
+def dispatch_realm_syncs(full: bool = False):
+    """
+    Fans out one sync_qbo_entity task per connected realm and entity in QBO_SYNC_ENTITIES,
+    so the worker pool syncs a realm's entities in parallel.
+    """
     db = SessionLocal()
-
-    token = get_latest_token(db)
-    if not token or token.is_token_expired():
-        celery_logger.warning("⚠️ No valid token found. Please refresh the token.")
+    try:
+        realm_ids = get_realm_ids(db)
+    finally:
         db.close()
+
+    for realm_id in realm_ids:
+        for entity in QBO_SYNC_ENTITIES:
+            enqueue_entity_sync(realm_id, entity, full=full)
+    celery_logger.info(f"📤 Dispatched {', '.join(QBO_SYNC_ENTITIES)} sync for {len(realm_ids)} realm(s)")
+    return realm_ids
+
+def enqueue_entity_sync(realm_id: str, entity: str, full: bool = False) -> dict:
+    """
+    Enqueues sync_qbo_entity for the realm and entity unless a sync of them is already queued or running,
+    in which case that job is returned instead of starting a second one.
+    A full sync requested while an incremental one is in flight is queued to run right after it instead,
+    so the full walk (and its deletion pass) is never dropped; its job id is returned.
+    """
+    get_entity(entity)
+    job_id = str(uuid.uuid4())
+    # Claims that keep changing hands are retried once; after that, or when Redis fails, the sync is
+    # enqueued without deduplication, the same way claim_sync_job degrades without Redis.
+    for _ in range(2):
+        existing = claim_sync_job(realm_id, job_id, entity, full)
+        if existing is None:
+            break
+        if AsyncResult(existing.job_id, app=celery_app).state in READY_STATES:
+            # The previous job finished without releasing its claim (e.g. its worker was killed).
+            _start_deferred_full_sync(realm_id, entity, release_sync_job(realm_id, existing.job_id, entity))
+            continue
+        if not full or existing.full:
+            return {"job_id": existing.job_id, "realm_id": realm_id, "entity": entity, "deduplicated": True}
+        try:
+            deferred = defer_full_sync(realm_id, existing.job_id, job_id, entity)
+        except SyncDeduplicationUnavailable:
+            break
+        if deferred is not None:
+            return {"job_id": deferred, "realm_id": realm_id, "entity": entity, "deduplicated": deferred != job_id}
+        # The incremental job released its claim in between.
+    else:
+        celery_logger.warning(f"⚠️ Could not claim the {entity} sync of realm {realm_id}; enqueueing it without deduplication")
+
+    try:
+        sync_qbo_entity.apply_async((realm_id, entity), {"full": full}, task_id=job_id)
+    except Exception:
+        # The job never reached the broker, so nothing would ever release its claim.
+        _start_deferred_full_sync(realm_id, entity, release_sync_job(realm_id, job_id, entity))
+        raise
+    return {"job_id": job_id, "realm_id": realm_id, "entity": entity, "deduplicated": False}
+
+def _start_deferred_full_sync(realm_id: str, entity: str, job_id: Optional[str]) -> None:
+    """
+    Enqueues the full sync that a released claim was handed over to, if any.
+    """
+    if job_id is None:
         return
     try:
-        response = fetch_accounts_from_qbo(token)
-        if response.status_code == 200:
-            accounts_data = response.json().get("QueryResponse", {}).get("Account", [])
-            save_accounts_to_db(db, accounts_data)
-            celery_logger.info("✅ Accounts updated successfully.")
-        else:
-            celery_logger.warning(f"⚠️ Failed to update accounts. Status: {response.status_code}")
+        sync_qbo_entity.apply_async((realm_id, entity), {"full": True}, task_id=job_id)
+    except Exception:
+        celery_logger.exception(f"💥 Could not enqueue the full {entity} sync {job_id} of realm {realm_id}")
+        _start_deferred_full_sync(realm_id, entity, release_sync_job(realm_id, job_id, entity))
+
+def enqueue_account_sync(realm_id: str, full: bool = False) -> dict:
+    """
+    Enqueues an Account sync of the realm; see enqueue_entity_sync.
+    """
+    return enqueue_entity_sync(realm_id, "Account", full)
+
+def get_sync_job(job_id: str) -> dict:
+    """
+    Reports a sync job's state from the result backend: queued, running, succeeded or failed.
+    Unknown job ids are reported as queued, as Celery cannot tell them apart from waiting jobs.
+    """
+    result = AsyncResult(job_id, app=celery_app)
+    job = {"job_id": job_id, "status": "queued", "result": None}
+    if result.state == "SUCCESS":
+        job["result"] = result.result
+        job["status"] = "failed" if isinstance(result.result, dict) and result.result.get("error") else "succeeded"
+    elif result.state == "FAILURE":
+        job["status"] = "failed"
+        job["result"] = {"error": str(result.result)}
+    elif result.state in {"STARTED", "RETRY"}:
+        job["status"] = "running"
+    return job
+
+def _run_entity_sync(task, realm_id: Optional[str], entity_name: str, full: bool) -> dict:
+    celery_logger.info(f"🚀 Background task started: Checking token and updating {entity_name} (realm={realm_id}, full={full})")
+    db = SessionLocal()
+
+    try:
+        entity = get_entity(entity_name)
+        # Normally served from the cache: renew_qbo_tokens keeps tokens ahead of their expiry.
+        token = token_manager.get_token(db, realm_id)
+        pages = asyncio.run(_sync_entity_and_close(db, token, entity, full))
+        celery_logger.info(f"✅ {entity_name} updated successfully for realm {token.realm_id}. Pages: {pages}")
+        return {"realm_id": token.realm_id, "entity": entity_name, "pages": pages}
+    except HTTPException as e:
+        celery_logger.warning(f"⚠️ Failed to update {entity_name}. Status: {e.status_code} Details: {e.detail}")
+        return {"realm_id": realm_id, "entity": entity_name, "error": e.detail}
     except Exception as e:
-        celery_logger.exception(f"💥 Exception during account update: {str(e)}")
+        celery_logger.exception(f"💥 Exception during {entity_name} update: {str(e)}")
+        return {"realm_id": realm_id, "entity": entity_name, "error": str(e)}
+    finally:
+        db.close()
+        if realm_id is not None and task.request.id:
+            _start_deferred_full_sync(realm_id, entity_name, release_sync_job(realm_id, task.request.id, entity_name))
+
+@celery_app.task(bind=True)
+def sync_qbo_entity(self, realm_id: Optional[str] = None, entity: str = "Account", full: bool = False):
+    """
+    Syncs one registered QBO entity of a realm.
+    """
+    return _run_entity_sync(self, realm_id, entity, full)
+
+@celery_app.task(bind=True)
+def update_qbo_accounts(self, realm_id: Optional[str] = None, full: bool = False):
+    """
+    Syncs a realm's accounts; kept so Account jobs queued before sync_qbo_entity existed still run.
+    """
+    return _run_entity_sync(self, realm_id, "Account", full)
+
+@celery_app.task
+def renew_qbo_tokens():
+    """
+    Refreshes the tokens that expire within TOKEN_REFRESH_MARGIN, so syncs never wait on a refresh.
+    """
+    db = SessionLocal()
+    try:
+        renewed = token_manager.renew_expiring(db)
+    finally:
+        db.close()
+    if renewed:
+        celery_logger.info(f"🔑 Renewed QBO tokens for {len(renewed)} realm(s)")
+    return renewed
+
+@celery_app.task
+def prune_qbo_snapshots():
+    """
+    Deletes the QBO page snapshots older than SNAPSHOT_RETENTION_DAYS.
+    """
+    db = SessionLocal()
+    try:
+        deleted = prune_snapshots(db)
     finally:
         db.close()
+    if deleted:
+        celery_logger.info(f"🧹 Pruned {deleted} QBO page snapshot(s)")
+    return deleted
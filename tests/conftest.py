@@ -0,0 +1,35 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from database.base import Base
+from services.cache_service import account_cache
+
+
+@pytest.fixture(autouse=True)
+def clear_account_cache():
+    """
+    Route tests mock the database per test, so responses cached by an earlier test must not leak into the next.
+    """
+    account_cache.clear()
+    yield
+    account_cache.clear()
+
+
+@pytest.fixture
+def engine():
+    """
+    A fresh in-memory SQLite database with every table. One shared connection (StaticPool) that
+    any thread may use, so syncs that write from worker threads see the same data.
+    """
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(engine):
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
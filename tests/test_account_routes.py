@@ -1,7 +1,10 @@
+import gzip
 from unittest.mock import patch, MagicMock
 from fastapi.testclient import TestClient
 from models.account import Account
 from main import app
+from services.cache_service import AccountCache, LocalTTLCache
+from tests.test_cache_service import FakeRedis
 from schemas.account import AccountOut
 from database.session import get_db
 
@@ -21,7 +24,7 @@ def test_sync_accounts_route_success():
             currency="USD",
             active=True,
             current_balance=1000.0
-        ),
+        ).model_dump(),
         AccountOut(
             id=2,
             name="Sales Account",
@@ -30,7 +33,7 @@ def test_sync_accounts_route_success():
             currency="USD",
             active=True,
             current_balance=3000.5
-        )
+        ).model_dump()
     ]
 
     mock_db = MagicMock()
@@ -53,21 +56,12 @@ def test_search_accounts():
     """
     Test the search_accounts route with filters.
     """
-    mock_account = Account(
-        id=1,
-        name="Test Account",
-        classification="Asset",
-        currency="USD",
-        account_type="Bank",
-        active=True,
-        current_balance=100.0
-    )
+    # Column projection: rows come back as plain tuples in AccountOut field order plus the key
+    mock_row = ("12345", 1, "Test Account", "Asset", "USD", "Bank", True, 100.0)
 
     mock_db = MagicMock()
     mock_query = mock_db.query.return_value
-    mock_filter_1 = mock_query.filter.return_value
-    mock_filter_2 = mock_filter_1.filter.return_value
-    mock_filter_2.all.return_value = [mock_account]
+    mock_query.filter.return_value.order_by.return_value.limit.return_value.all.return_value = [mock_row]
 
     def override_get_db():
         yield mock_db
@@ -86,6 +80,37 @@ def test_search_accounts():
     assert data[0]["currency"] == "USD"
     assert data[0]["active"] is True
     assert data[0]["current_balance"] == 100.0
+    assert "X-Next-Cursor" not in response.headers
+
+    app.dependency_overrides = {}
+
+def test_search_accounts_projection_and_next_cursor():
+    """
+    Test the search_accounts route with fields= and a page that has a successor.
+    """
+    mock_db = MagicMock()
+    mock_query = mock_db.query.return_value
+    mock_query.filter.return_value.order_by.return_value.limit.return_value.all.return_value = [
+        (1, "Cash", "12345"),
+        (2, "Bank", "12345"),
+    ]
+
+    def override_get_db():
+        yield mock_db
+
+    app.dependency_overrides[get_db] = override_get_db
+
+    response = client.get("/accounts/search", params={"fields": "id,name", "limit": 1})
+
+    assert response.status_code == 200
+    assert response.json() == [{"id": 1, "name": "Cash"}]
+    assert response.headers["X-Next-Cursor"]
+    assert 'rel="next"' in response.headers["Link"]
+    selected = [column.key for column in mock_db.query.call_args[0]]
+    assert selected == ["id", "name", "realm_id"]
+
+    response = client.get("/accounts/search", params={"fields": "id,secret"})
+    assert response.status_code == 400
 
     app.dependency_overrides = {}
 
@@ -96,25 +121,13 @@ def test_get_account_balance_summary():
     """
     mock_db = MagicMock()
 
-    # Mock distinct classifications
-    mock_db.query().distinct().all.return_value = [
-        ("Asset",),
-        ("Liability",),
-        ("Expense",),
+    # One grouped aggregate query returns every classification total
+    mock_db.query.return_value.filter.return_value.group_by.return_value.all.return_value = [
+        ("Asset", 5000.0),
+        ("Liability", -1200.5),
+        ("Expense", 800.25),
     ]
 
-    # Mock sum queries
-    def scalar_side_effect():
-        filter_arg = mock_db.query().filter.call_args[0][0]
-        classification = str(filter_arg.right.value)  # extract value from SQLAlchemy BinaryExpression
-        return {
-            "Asset": 5000.0,
-            "Liability": -1200.5,
-            "Expense": 800.25,
-        }.get(classification, 0.0)
-
-    mock_db.query().filter().scalar.side_effect = scalar_side_effect
-
     def override_get_db():
         yield mock_db
 
@@ -128,6 +141,88 @@ def test_get_account_balance_summary():
     assert summary["Asset"] == 5000.0
     assert summary["Liability"] == -1200.5
     assert summary["Expense"] == 800.25
+    assert list(summary) == ["Asset", "Expense", "Liability"]
+    assert mock_db.query.call_count == 1
+
+    app.dependency_overrides = {}
+
+def test_get_account_balance_summary_grouped():
+    """
+    Test the get_account_balance_summary route with group_by columns.
+    """
+    mock_db = MagicMock()
+    mock_db.query.return_value.filter.return_value.group_by.return_value.all.return_value = [
+        ("Asset", "USD", True, 100.0),
+        ("Asset", "EUR", False, 20.0),
+    ]
+
+    def override_get_db():
+        yield mock_db
+
+    app.dependency_overrides[get_db] = override_get_db
+
+    response = client.get("/accounts/summary", params={"group_by": ["currency", "active"]})
+    assert response.status_code == 200
+    assert response.json() == {"Asset": {"EUR": {"false": 20.0}, "USD": {"true": 100.0}}}
+
+    response = client.get("/accounts/summary", params={"group_by": "name"})
+    assert response.status_code == 422
+
+    app.dependency_overrides = {}
+
+def test_get_account_balance_summary_conditional_request():
+    """
+    Test that a matching If-None-Match gets 304 without querying, and a sync that writes accounts changes the ETag.
+    """
+    mock_db = MagicMock()
+    mock_db.query.return_value.filter.return_value.group_by.return_value.all.return_value = [("Asset", 10.0)]
+
+    def override_get_db():
+        yield mock_db
+
+    app.dependency_overrides[get_db] = override_get_db
+    account_cache = AccountCache(LocalTTLCache(maxsize=8, ttl=60), FakeRedis())
+    with patch("routes.account_routes.account_cache", account_cache):
+        response = client.get("/accounts/summary", params={"realm_id": "111"})
+        etag = response.headers["ETag"]
+        assert response.status_code == 200
+        assert response.headers["Cache-Control"] == "private, no-cache"
+
+        with patch.object(account_cache, "get_or_load", return_value={}) as mock_load:
+            not_modified = client.get("/accounts/summary", params={"realm_id": "111"}, headers={"If-None-Match": f"W/{etag}"})
+            other_params = client.get(
+                "/accounts/summary", params={"realm_id": "111", "rollup": "subtree"}, headers={"If-None-Match": etag}
+            )
+        assert not_modified.status_code == 304
+        assert not_modified.content == b""
+        assert not_modified.headers["ETag"] == etag
+        assert mock_load.call_count == 1
+        assert other_params.headers["ETag"] != etag
+
+        account_cache.bump_version("111")
+        response = client.get("/accounts/summary", params={"realm_id": "111"}, headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+
+    app.dependency_overrides = {}
+
+def test_account_reads_send_no_etag_without_shared_versions():
+    """
+    Test that without Redis no ETag is sent and If-None-Match never yields a 304, as syncs in other processes go unseen.
+    """
+    mock_db = MagicMock()
+    mock_db.query.return_value.filter.return_value.group_by.return_value.all.return_value = [("Asset", 10.0)]
+
+    def override_get_db():
+        yield mock_db
+
+    app.dependency_overrides[get_db] = override_get_db
+    with patch("routes.account_routes.account_cache", AccountCache(LocalTTLCache(maxsize=8, ttl=60), None)):
+        response = client.get("/accounts/summary", params={"realm_id": "111"}, headers={"If-None-Match": "*"})
+
+    assert response.status_code == 200
+    assert "ETag" not in response.headers
+    assert response.headers["Cache-Control"] == "private, no-cache"
 
     app.dependency_overrides = {}
 
@@ -139,7 +234,7 @@ def test_get_account_tree():
     account_sub_child = Account(id=4, name="Savings", parent_id=3)
 
     mock_db = MagicMock()
-    mock_db.query().all.return_value = [
+    mock_db.query().filter().order_by().all.return_value = [
         account_root, account_child_1, account_child_2, account_sub_child
     ]
     def override_get_db():
@@ -153,8 +248,78 @@ def test_get_account_tree():
     assert isinstance(tree, list)
     assert len(tree) == 1
     assert tree[0]["name"] == "Assets"
+    assert "classification" in tree[0] and "current_balance" in tree[0]
     assert len(tree[0]["children"]) == 2
     assert tree[0]["children"][1]["name"] == "Bank"
     assert tree[0]["children"][1]["children"][0]["name"] == "Savings"
 
     app.dependency_overrides = {}
+
+def test_get_account_tree_unknown_root():
+    mock_db = MagicMock()
+    mock_db.query().filter().first.return_value = None
+    def override_get_db():
+        yield mock_db
+    app.dependency_overrides[get_db] = override_get_db
+
+    response = client.get("/accounts/tree", params={"realm_id": "111", "root_id": 42})
+    assert response.status_code == 404
+
+    app.dependency_overrides = {}
+
+def test_get_account_tree_root_requires_realm():
+    response = client.get("/accounts/tree", params={"root_id": 1})
+    assert response.status_code == 400
+    assert response.json()["detail"]["details"] == "root_id requires realm_id"
+
+# ---- Test: Background Sync Jobs ----
+def test_start_account_sync_enqueues_job():
+    mock_db = MagicMock()
+    mock_db.query.return_value.order_by.return_value.first.return_value = MagicMock(realm_id="12345")
+
+    def override_get_db():
+        yield mock_db
+
+    app.dependency_overrides[get_db] = override_get_db
+    job = {"job_id": "job-1", "realm_id": "12345", "deduplicated": False}
+    with patch("routes.account_routes.enqueue_account_sync", return_value=job) as mock_enqueue:
+        response = client.post("/accounts/sync", params={"full": True})
+
+    assert response.status_code == 202
+    assert response.json() == job
+    mock_enqueue.assert_called_once_with("12345", full=True)
+
+    app.dependency_overrides = {}
+
+def test_get_account_sync_polls_job():
+    job = {"job_id": "job-1", "status": "running", "result": None}
+    with patch("routes.account_routes.get_sync_job", return_value=job):
+        response = client.get("/accounts/sync/job-1")
+
+    assert response.status_code == 200
+    assert response.json()["status"] == "running"
+
+def test_export_accounts_streams_gzip():
+    """
+    Test that /accounts/export streams the export and gzips it when the client accepts gzip.
+    """
+    body = gzip.compress(b"id,name\n1,Cash\n")
+    with patch("routes.account_routes.iter_account_export", return_value=iter([body[:10], body[10:]])) as export:
+        response = client.get(
+            "/accounts/export", params={"format": "csv", "realm_id": "111"}, headers={"Accept-Encoding": "gzip"}
+        )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["content-disposition"] == 'attachment; filename="accounts.csv"'
+    assert response.content == b"id,name\n1,Cash\n"
+    export.assert_called_once_with("csv", "111", None, None, gzip=True)
+
+    with patch("routes.account_routes.iter_account_export", return_value=iter([b"{}\n"])) as export:
+        response = client.get("/accounts/export", headers={"Accept-Encoding": "identity"})
+
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert "content-encoding" not in response.headers
+    assert response.content == b"{}\n"
+    export.assert_called_once_with("ndjson", None, None, None, gzip=False)
@@ -0,0 +1,124 @@
+import json
+import redis
+from unittest.mock import patch, MagicMock
+from services.cache_service import LocalTTLCache, AccountCache
+
+
+class FakeRedis:
+    """
+    Minimal dict-backed stand-in for the Redis commands the cache uses.
+    """
+
+    def __init__(self):
+        self.store = {}
+
+    def get(self, key):
+        return self.store.get(key)
+
+    def set(self, key, value, ex=None):
+        self.store[key] = value
+
+    def incr(self, key):
+        self.store[key] = int(self.store.get(key, 0)) + 1
+        return self.store[key]
+
+
+def test_local_ttl_cache_evicts_least_recently_used():
+    cache = LocalTTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("a") == (True, 1)
+    assert cache.get("b") == (False, None)
+    assert cache.get("c") == (True, 3)
+
+
+def test_local_ttl_cache_expires_entries():
+    cache = LocalTTLCache(maxsize=2, ttl=10)
+    with patch("services.cache_service.time.monotonic", return_value=100.0):
+        cache.set("a", 1)
+    with patch("services.cache_service.time.monotonic", return_value=111.0):
+        assert cache.get("a") == (False, None)
+
+
+def test_get_or_load_serves_repeat_reads_from_memory():
+    cache = AccountCache(LocalTTLCache(16, 60), redis_client=None)
+    loader = MagicMock(return_value={"Asset": 10.0})
+
+    assert cache.get_or_load("summary", "111", {}, loader) == {"Asset": 10.0}
+    assert cache.get_or_load("summary", "111", {}, loader) == {"Asset": 10.0}
+    loader.assert_called_once()
+
+
+def test_bump_version_invalidates_realm_and_cross_realm_entries():
+    cache = AccountCache(LocalTTLCache(16, 60), redis_client=None)
+    loader = MagicMock(return_value=[])
+
+    cache.get_or_load("search", "111", {}, loader)
+    cache.get_or_load("search", "222", {}, loader)
+    cache.get_or_load("search", None, {}, loader)
+    cache.bump_version("111")
+    cache.get_or_load("search", "111", {}, loader)
+    cache.get_or_load("search", "222", {}, loader)
+    cache.get_or_load("search", None, {}, loader)
+
+    assert loader.call_count == 5  # realm 222 is still cached
+
+
+def test_redis_tier_shares_values_and_versions_between_processes():
+    """
+    Test that a second process (separate local tier) reads values from Redis and sees version bumps.
+    """
+    fake_redis = FakeRedis()
+    api = AccountCache(LocalTTLCache(16, 60), redis_client=fake_redis)
+    other = AccountCache(LocalTTLCache(16, 60), redis_client=fake_redis)
+
+    api.get_or_load("tree", "111", {}, lambda: [{"id": 1}])
+    assert other.get_or_load("tree", "111", {}, MagicMock()) == [{"id": 1}]
+
+    other.bump_version("111")
+    with patch("services.cache_service.CACHE_VERSION_CHECK_INTERVAL", 0):
+        assert api.get_or_load("tree", "111", {}, lambda: [{"id": 2}]) == [{"id": 2}]
+    assert any(json.loads(value) == [{"id": 2}] for key, value in fake_redis.store.items() if ":v1:" in key)
+
+
+def test_redis_errors_fall_back_to_loader():
+    broken_redis = MagicMock()
+    broken_redis.get.side_effect = redis.ConnectionError("down")
+    broken_redis.set.side_effect = redis.ConnectionError("down")
+    broken_redis.incr.side_effect = redis.ConnectionError("down")
+    cache = AccountCache(LocalTTLCache(16, 60), redis_client=broken_redis)
+
+    assert cache.get_or_load("summary", "111", {}, lambda: {"Asset": 1.0}) == {"Asset": 1.0}
+    cache.bump_version("111")
+    assert cache.get_or_load("summary", "111", {}, lambda: {"Asset": 2.0}) == {"Asset": 2.0}
+
+
+def test_etag_follows_the_shared_data_version():
+    """
+    Test that two API processes agree on an ETag and that a sync in either one changes it.
+    """
+    shared = FakeRedis()
+    api_a = AccountCache(LocalTTLCache(maxsize=8, ttl=60), shared)
+    api_b = AccountCache(LocalTTLCache(maxsize=8, ttl=60), shared)
+
+    etag = api_a.etag("tree", "111", {"depth": 1})
+    assert etag == api_b.etag("tree", "111", {"depth": 1})
+    assert etag != api_a.etag("tree", "111", {"depth": 2})
+    assert etag != api_a.etag("tree", "222", {"depth": 1})
+
+    api_b.bump_version("111")
+    assert api_b.etag("tree", "111", {"depth": 1}) != etag
+
+
+def test_no_etag_without_shared_versions():
+    """
+    Test that ETags are only given while versions come from Redis, as per-process versions miss other processes' syncs.
+    """
+    assert AccountCache(LocalTTLCache(maxsize=8, ttl=60), None).etag("summary", "111", {}) is None
+
+    broken_redis = MagicMock()
+    broken_redis.get.side_effect = redis.ConnectionError("down")
+    assert AccountCache(LocalTTLCache(maxsize=8, ttl=60), broken_redis).etag("summary", "111", {}) is None
@@ -0,0 +1,56 @@
+from datetime import date
+import pytest
+from models.invoice import Invoice
+from services.entity_registry import ENTITIES, INVOICE, ITEM, field, get_entity
+from services.upsert_service import upsert_rows, UpsertResult
+
+
+def test_field_reads_dotted_paths_with_defaults():
+    payload = {"CurrencyRef": {"value": "USD"}, "Id": "3"}
+
+    assert field("CurrencyRef.value")(payload) == "USD"
+    assert field("Id", int)(payload) == 3
+    assert field("ParentRef.value", int)(payload) is None
+    assert field("Balance", default=0.0)(payload) == 0.0
+
+
+def test_invoice_row_from_qbo():
+    """
+    Test that an Invoice payload is mapped to the columns of the invoices table.
+    """
+    payload = {
+        "Id": "130", "DocNumber": "1037", "TxnDate": "2025-03-01", "DueDate": "2025-03-31",
+        "CustomerRef": {"value": "24", "name": "Sonnenschein"}, "CurrencyRef": {"value": "USD"},
+        "TotalAmt": 362.07, "Balance": 362.07, "Line": [{"Amount": 362.07}],
+    }
+
+    assert INVOICE.row_from_qbo(payload, "12345") == {
+        "realm_id": "12345", "id": 130, "doc_number": "1037", "txn_date": date(2025, 3, 1),
+        "due_date": date(2025, 3, 31), "customer_id": 24, "currency": "USD",
+        "total_amount": 362.07, "balance": 362.07,
+    }
+
+
+def test_every_registered_field_is_a_model_column():
+    for entity in ENTITIES.values():
+        columns = set(entity.model.__table__.columns.keys())
+        assert {"realm_id", *entity.fields, "content_hash"} <= columns, entity.name
+        assert set(entity.key) <= columns
+
+
+def test_upsert_rows_writes_registered_entities(db):
+    """
+    Test that the generic upsert skips unchanged invoices like it does accounts.
+    """
+    rows = [INVOICE.row_from_qbo({"Id": "1", "TxnDate": "2025-01-02", "TotalAmt": 10.0}, "12345")]
+
+    assert upsert_rows(db, Invoice, rows) == UpsertResult(inserted=1)
+    db.commit()
+    assert upsert_rows(db, Invoice, rows) == UpsertResult(unchanged=1)
+    assert db.get(Invoice, ("12345", 1)).txn_date == date(2025, 1, 2)
+
+
+def test_get_entity_rejects_unknown_names():
+    assert get_entity("Item") is ITEM
+    with pytest.raises(ValueError):
+        get_entity("Payroll")
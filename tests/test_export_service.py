@@ -0,0 +1,68 @@
+import csv
+import io
+import json
+import zlib
+import pytest
+from sqlalchemy.orm import sessionmaker
+from models.account import Account
+from services.export_service import iter_account_export, EXPORT_FIELDS
+
+
+@pytest.fixture
+def session_factory(engine):
+    factory = sessionmaker(bind=engine)
+    with factory() as session:
+        session.add_all(
+            [Account(realm_id="111", id=i, name=f"Account {i}", classification="Asset", active=i % 2 == 0,
+                     current_balance=i * 10.5)
+             for i in range(1, 8)]
+            + [Account(realm_id="222", id=1, name="Other", classification="Liability", active=True)]
+        )
+        session.commit()
+    return factory
+
+
+def test_ndjson_export_yields_one_chunk_per_batch(session_factory):
+    """
+    Test that NDJSON rows come out in (realm_id, id) order, batch_size rows per chunk.
+    """
+    chunks = list(iter_account_export("ndjson", realm_id="111", batch_size=3, session_factory=session_factory))
+
+    assert [chunk.count(b"\n") for chunk in chunks] == [3, 3, 1]
+    rows = [json.loads(line) for line in b"".join(chunks).splitlines()]
+    assert [row["id"] for row in rows] == list(range(1, 8))
+    assert list(rows[0]) == EXPORT_FIELDS
+    assert rows[1]["current_balance"] == 21.0
+
+
+def test_csv_export_filters_and_writes_header_once(session_factory):
+    """
+    Test that CSV exports have a single header row and apply the filters.
+    """
+    body = b"".join(iter_account_export("csv", active=True, batch_size=2, session_factory=session_factory))
+
+    rows = list(csv.reader(io.StringIO(body.decode())))
+    assert rows[0] == EXPORT_FIELDS
+    records = [dict(zip(rows[0], row)) for row in rows[1:]]
+    assert [(r["realm_id"], r["id"], r["name"]) for r in records] == [
+        ("111", "2", "Account 2"), ("111", "4", "Account 4"), ("111", "6", "Account 6"), ("222", "1", "Other")
+    ]
+
+
+def test_csv_export_without_rows_still_has_header(session_factory):
+    """
+    Test that an empty CSV export is just the header row.
+    """
+    body = b"".join(iter_account_export("csv", classification="Equity", session_factory=session_factory))
+    assert body.decode().splitlines() == [",".join(EXPORT_FIELDS)]
+
+
+def test_gzip_export_is_one_gzip_stream(session_factory):
+    """
+    Test that gzip chunks concatenate into a single valid gzip stream of the plain export.
+    """
+    plain = b"".join(iter_account_export("ndjson", batch_size=2, session_factory=session_factory))
+    compressed = b"".join(iter_account_export("ndjson", gzip=True, batch_size=2, session_factory=session_factory))
+
+    assert compressed[:2] == b"\x1f\x8b"
+    assert zlib.decompress(compressed, 31) == plain
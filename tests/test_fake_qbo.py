@@ -0,0 +1,60 @@
+from benchmarks.fake_qbo import FakeQBO, FakeQBOConfig, make_accounts
+from services.entity_registry import ACCOUNT, CUSTOMER
+from services.quickbooks_service import latest_update_time
+
+
+def test_make_accounts_builds_a_bounded_hierarchy():
+    """
+    Test that every parent precedes its children and the hierarchy stays within the requested depth.
+    """
+    accounts = make_accounts(500, depth=3)
+    levels = {}
+    for acc in accounts:
+        parent = acc.get("ParentRef", {}).get("value")
+        assert parent is None or int(parent) < int(acc["Id"])
+        levels[acc["Id"]] = 0 if parent is None else levels[parent] + 1
+    assert max(levels.values()) == 2
+
+
+def test_run_query_pages_and_filters_like_qbo():
+    """
+    Test that the app's own queries are answered page by page and by LastUpdatedTime.
+    """
+    qbo = FakeQBO(FakeQBOConfig(accounts=10, realm_accounts={"big": 25}))
+
+    page = qbo.run_query("big", ACCOUNT.query(21, 10))["QueryResponse"]["Account"]
+    assert [acc["Id"] for acc in page] == [str(i) for i in range(21, 26)]
+
+    since = latest_update_time(qbo.rows("Customer", "small")[0][:7])
+    changed = qbo.run_query("small", CUSTOMER.query(1, 100, since))["QueryResponse"]["Customer"]
+    assert [row["Id"] for row in changed] == ["7", "8", "9", "10"]
+    assert "Fault" in qbo.run_query("small", "select Id from Account")
+
+
+def test_run_query_leaves_inactive_rows_out_unless_asked():
+    """
+    Test that, like QBO, a query without an Active filter only returns active rows.
+    """
+    qbo = FakeQBO(FakeQBOConfig(accounts=100))
+    inactive = {acc["Id"] for acc in qbo.rows("Account", "111")[0] if not acc["Active"]}
+
+    active_only = qbo.run_query("111", "select * from Account")["QueryResponse"]["Account"]
+    every_row = qbo.run_query("111", ACCOUNT.query(1, 1000))["QueryResponse"]["Account"]
+    assert inactive and not inactive & {acc["Id"] for acc in active_only}
+    assert len(every_row) == 100
+
+
+def test_check_rejects_unknown_tokens_and_throttles():
+    """
+    Test that unknown or used-up tokens get a 401 and requests above the per-minute limit a 429.
+    """
+    qbo = FakeQBO(FakeQBOConfig(throttle_per_minute=2, token_requests=3, retry_after=2))
+    token = qbo.issue_token()
+
+    assert qbo.check("111", "Bearer unknown").status_code == 401
+    assert qbo.check("111", f"Bearer {token}") is None
+    assert qbo.check("111", f"Bearer {token}") is None
+    throttled = qbo.check("111", f"Bearer {token}")
+    assert (throttled.status_code, throttled.headers["retry-after"]) == (429, "2")
+    assert qbo.check("111", f"Bearer {token}").status_code == 401
+    assert qbo.stats() == {"tokens_issued": 1, "401": 2, "429": 1}
@@ -0,0 +1,36 @@
+import json
+from datetime import date
+from decimal import Decimal
+from unittest.mock import patch
+import pytest
+from utils import fast_json
+from utils.fast_json import FastJSONResponse, dumps, rows_to_dicts
+
+CONTENT = [{"id": 1, "name": "Café", "balance": Decimal("10.50"), "opened": date(2025, 1, 2), "active": None}]
+
+
+@pytest.mark.skipif(fast_json.orjson is None, reason="orjson is not installed")
+def test_orjson_and_stdlib_encode_alike():
+    """
+    Test that the stdlib fallback produces the same bytes as orjson.
+    """
+    with_orjson = dumps(CONTENT)
+    with patch.object(fast_json, "orjson", None):
+        with_stdlib = dumps(CONTENT)
+
+    assert with_orjson == with_stdlib
+    assert json.loads(with_stdlib) == [{"id": 1, "name": "Café", "balance": 10.5, "opened": "2025-01-02", "active": None}]
+
+
+def test_rows_to_dicts_keys_tuples_by_field():
+    assert rows_to_dicts([(1, "Cash"), (2, "Bank")], ["id", "name"]) == [
+        {"id": 1, "name": "Cash"}, {"id": 2, "name": "Bank"},
+    ]
+
+
+def test_fast_json_response_renders_plain_content():
+    response = FastJSONResponse({"items": [1, 2]}, headers={"X-Next-Cursor": "abc"})
+
+    assert response.body == b'{"items":[1,2]}'
+    assert response.headers["content-type"] == "application/json"
+    assert response.headers["x-next-cursor"] == "abc"
@@ -0,0 +1,55 @@
+import pytest
+from models.account import Account
+from services.hierarchy_service import refresh_account_paths, get_account_subtree
+
+
+@pytest.fixture
+def db(db):
+    db.add_all([
+        Account(realm_id="111", id=1, name="Assets"),
+        Account(realm_id="111", id=2, name="Bank", parent_id=1),
+        Account(realm_id="111", id=3, name="Savings", parent_id=2),
+        Account(realm_id="111", id=4, name="Cash", parent_id=1),
+        Account(realm_id="111", id=5, name="Orphan", parent_id=99),
+        Account(realm_id="222", id=1, name="Other realm"),
+    ])
+    db.commit()
+    refresh_account_paths(db, "111")
+    return db
+
+
+def _ids(accounts):
+    return [account.id for account in accounts]
+
+
+def test_refresh_account_paths_materializes_hierarchy(db):
+    paths = {a.id: (a.path, a.depth) for a in db.query(Account).filter(Account.realm_id == "111")}
+
+    assert paths == {
+        1: ("/1/", 0),
+        2: ("/1/2/", 1),
+        3: ("/1/2/3/", 2),
+        4: ("/1/4/", 1),
+        5: ("/5/", 0),  # missing parent: kept as a root
+    }
+    assert db.get(Account, ("222", 1)).path is None  # other realms are untouched
+
+
+def test_refresh_account_paths_follows_reparenting(db):
+    db.get(Account, ("111", 2)).parent_id = 4
+    db.commit()
+
+    refresh_account_paths(db, "111")
+
+    assert db.get(Account, ("111", 3)).path == "/1/4/2/3/"
+    assert db.get(Account, ("111", 3)).depth == 3
+
+
+def test_get_account_subtree_by_root_and_depth(db):
+    assert _ids(get_account_subtree(db, "111", root_id=2)) == [2, 3]
+    assert _ids(get_account_subtree(db, "111", root_id=1, depth=1)) == [1, 2, 4]
+    assert _ids(get_account_subtree(db, "111", depth=0)) == [1, 5]
+    assert _ids(get_account_subtree(db, "111")) == [1, 5, 2, 4, 3]
+    assert get_account_subtree(db, "111", root_id=42) is None
+    with pytest.raises(ValueError):
+        get_account_subtree(db, root_id=2)
@@ -0,0 +1,113 @@
+import logging
+import os
+import threading
+import time
+from utils.logger import BatchingHandler, StreamSink
+
+
+def _record(message):
+    return logging.LogRecord("test", logging.INFO, __file__, 1, message, None, None)
+
+
+def test_batching_handler_ships_records_in_batches():
+    """
+    Test that records reach the sink in batches of at most batch_size, in order.
+    """
+    batches = []
+    handler = BatchingHandler(batches.append, batch_size=3, flush_interval=0.05)
+
+    for i in range(7):
+        handler.emit(_record(f"message {i}"))
+    handler.close()
+
+    assert all(len(batch) <= 3 for batch in batches)
+    assert [line for batch in batches for line in batch] == [f"message {i}" for i in range(7)]
+
+
+def test_batching_handler_emit_does_not_wait_for_the_sink():
+    """
+    Test that a stalled sink fills the bounded queue and further records are dropped and reported, not blocked on.
+    """
+    release = threading.Event()
+    shipped = []
+
+    def slow_sink(lines):
+        release.wait(5)
+        shipped.extend(lines)
+
+    handler = BatchingHandler(slow_sink, queue_size=2, batch_size=1, flush_interval=0.05)
+    handler.emit(_record("first"))
+    # Let the background thread pick up the first record and block in the sink
+    while not handler.queue.empty():
+        time.sleep(0.001)
+
+    for i in range(5):
+        handler.emit(_record(f"queued {i}"))
+
+    assert handler.dropped == 3
+    release.set()
+    handler.close()
+
+    assert [line for line in shipped if "dropped" not in line] == ["first", "queued 0", "queued 1"]
+    assert any("3 log records dropped" in line for line in shipped)
+
+
+def test_batching_handler_survives_sink_errors():
+    """
+    Test that a failing sink loses only its batch and the handler keeps shipping.
+    """
+    shipped = []
+
+    def flaky_sink(lines):
+        if "boom" in lines:
+            raise ConnectionError("Loggly unreachable")
+        shipped.extend(lines)
+
+    handler = BatchingHandler(flaky_sink, batch_size=1, flush_interval=0.05)
+    handler.emit(_record("boom"))
+    handler.flush()
+    handler.emit(_record("after"))
+    handler.close()
+
+    assert handler.failed_batches == 1
+    assert shipped == ["after"]
+
+
+def test_stream_sink_writes_one_line_per_record(tmp_path):
+    """
+    Test the file fallback used when no Loggly token is configured.
+    """
+    path = tmp_path / "app.log"
+    handler = BatchingHandler(StreamSink(str(path)), flush_interval=0.05)
+    handler.setFormatter(logging.Formatter("%(levelname)s | %(message)s"))
+
+    handler.emit(_record("hello"))
+    handler.close()
+
+    assert path.read_text() == "INFO | hello\n"
+
+
+def test_batching_handler_ships_from_a_forked_child(tmp_path):
+    """
+    Test that a forked child (a prefork Celery worker) gets its own shipper thread, so its records
+    reach the sink without anyone flushing.
+    """
+    path = tmp_path / "child.log"
+    handler = BatchingHandler(StreamSink(str(path)), flush_interval=0.05)
+
+    pid = os.fork()
+    if pid == 0:
+        shipped = False
+        try:
+            handler.emit(_record("from the child"))
+            deadline = time.monotonic() + 5
+            while not shipped and time.monotonic() < deadline:
+                time.sleep(0.01)
+                shipped = "from the child" in path.read_text()
+        finally:
+            # Like a Celery child: no atexit handlers, no flush.
+            os._exit(0 if shipped and handler._thread.is_alive() else 1)
+
+    _, status = os.waitpid(pid, 0)
+    handler.close()
+    assert os.waitstatus_to_exitcode(status) == 0
@@ -0,0 +1,80 @@
+from unittest.mock import patch
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import RedirectResponse
+from fastapi.testclient import TestClient
+from middlewares.logger_middleware import RequestLoggerMiddleware
+
+
+def make_client(**options) -> TestClient:
+    app = FastAPI()
+
+    @app.get("/ok")
+    def ok():
+        return {"status": "ok"}
+
+    @app.get("/moved")
+    def moved():
+        return RedirectResponse("/ok", status_code=307)
+
+    @app.delete("/ok", status_code=204)
+    def delete():
+        return None
+
+    @app.get("/missing")
+    def missing():
+        raise HTTPException(status_code=404, detail="x" * 100)
+
+    @app.get("/boom")
+    def boom():
+        raise RuntimeError("boom")
+
+    app.add_middleware(RequestLoggerMiddleware, **options)
+    return TestClient(app)
+
+
+def test_logs_one_line_per_successful_request():
+    with patch("middlewares.logger_middleware.logger") as mock_logger:
+        response = make_client().get("/ok")
+
+    assert response.json() == {"status": "ok"}
+    mock_logger.info.assert_called_once()
+    assert "GET /ok Status: 200" in mock_logger.info.call_args[0][0]
+    mock_logger.warning.assert_not_called()
+
+
+@pytest.mark.parametrize("method, path, status", [("DELETE", "/ok", 204), ("GET", "/moved", 307)])
+def test_non_error_statuses_are_logged_as_responses(method, path, status):
+    with patch("middlewares.logger_middleware.logger") as mock_logger:
+        response = make_client().request(method, path, follow_redirects=False)
+
+    assert response.status_code == status
+    assert f"{method} {path} Status: {status}" in mock_logger.info.call_args[0][0]
+    mock_logger.warning.assert_not_called()
+
+
+def test_error_body_is_truncated_and_passed_through_untouched():
+    with patch("middlewares.logger_middleware.logger") as mock_logger:
+        response = make_client(max_error_body=10).get("/missing")
+
+    assert response.status_code == 404
+    assert response.json() == {"detail": "x" * 100}
+    mock_logger.info.assert_not_called()
+    message = mock_logger.warning.call_args[0][0]
+    assert "Status: 404" in message
+    assert 'Body: {"detail": (truncated, 113 bytes)' in message
+
+
+def test_error_body_sampling_can_be_disabled():
+    with patch("middlewares.logger_middleware.logger") as mock_logger:
+        make_client(error_body_sample_rate=0.0).get("/missing")
+
+    assert "Body:" not in mock_logger.warning.call_args[0][0]
+
+
+def test_exceptions_are_logged_and_reraised():
+    with patch("middlewares.logger_middleware.logger") as mock_logger:
+        with pytest.raises(RuntimeError):
+            make_client().get("/boom")
+
+    mock_logger.exception.assert_called_once()
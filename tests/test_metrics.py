@@ -0,0 +1,77 @@
+import asyncio
+import json
+from unittest.mock import MagicMock, AsyncMock, patch
+import httpx
+from fastapi.testclient import TestClient
+from main import app
+from services.qbo_client import qbo_get
+from utils.metrics import MetricsRegistry, QBO_REQUEST_DURATION, merge_snapshots, render
+
+client = TestClient(app)
+
+
+def test_registry_renders_prometheus_text():
+    registry = MetricsRegistry()
+    refreshes = registry.counter("refreshes_total", "Token refreshes.", ["outcome"])
+    latency = registry.histogram("latency_seconds", "Latency.", ["route"], buckets=(0.1, 1.0))
+
+    refreshes.inc(outcome="success")
+    refreshes.inc(2, outcome="success")
+    latency.observe(0.05, route="/accounts")
+    latency.observe(0.5, route="/accounts")
+
+    text = registry.render()
+
+    assert "# TYPE refreshes_total counter" in text
+    assert 'refreshes_total{outcome="success"} 3' in text
+    assert 'latency_seconds_bucket{route="/accounts",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{route="/accounts",le="1"} 2' in text
+    assert 'latency_seconds_bucket{route="/accounts",le="+Inf"} 2' in text
+    assert 'latency_seconds_count{route="/accounts"} 2' in text
+    assert 'latency_seconds_sum{route="/accounts"} 0.55' in text
+
+
+def test_worker_snapshots_are_added_to_the_local_ones():
+    registry = MetricsRegistry()
+    tasks = registry.histogram("task_seconds", "Task time.", ["task"], buckets=(1.0,))
+    tasks.observe(0.5, task="sync")
+
+    text = render(merge_snapshots([registry.snapshot(), registry.snapshot()]))
+
+    assert 'task_seconds_bucket{task="sync",le="1"} 2' in text
+    assert 'task_seconds_sum{task="sync"} 1' in text
+
+
+def test_worker_metrics_are_read_from_redis():
+    worker = MetricsRegistry()
+    worker.counter("syncs_total", "Syncs.").inc()
+    redis_client = MagicMock()
+    redis_client.scan_iter.return_value = ["metrics:worker:host:1"]
+    redis_client.mget.return_value = [json.dumps(worker.snapshot())]
+
+    api = MetricsRegistry(redis_client)
+    api.counter("syncs_total", "Syncs.").inc()
+
+    assert "syncs_total 2" in api.render()
+
+
+def test_metrics_endpoint_reports_route_latency():
+    client.get("/health")
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'http_request_duration_seconds_count{method="GET",route="/health",status="200"}' in response.text
+
+
+def test_qbo_get_records_status_codes():
+    before = dict((tuple(k), v) for k, v in QBO_REQUEST_DURATION.snapshot()["values"])
+    mock_client = MagicMock()
+    mock_client.get = AsyncMock(return_value=httpx.Response(429))
+
+    with patch("services.qbo_client.get_qbo_client", return_value=mock_client):
+        response = asyncio.run(qbo_get("https://qbo.test/query", headers={}, params={}))
+
+    after = dict((tuple(k), v) for k, v in QBO_REQUEST_DURATION.snapshot()["values"])
+    assert response.status_code == 429
+    assert after[("429",)][-2] == before.get(("429",), [0, 0])[-2] + 1
@@ -0,0 +1,46 @@
+import asyncio
+from unittest.mock import patch, MagicMock
+import pytest
+from fastapi import HTTPException
+from models.token import Token
+from services.qbo_batch import build_batch_request, parse_batch_response, post_batch
+
+
+@pytest.fixture
+def token():
+    return Token(access_token="abc123", realm_id="12345", expires_in="3600")
+
+
+def _response(payload, status_code=200):
+    response = MagicMock(status_code=status_code)
+    response.json.return_value = payload
+    return response
+
+
+def test_build_batch_request_rejects_more_than_30_operations():
+    assert build_batch_request(["select * from Account"])["BatchItemRequest"] == [
+        {"bId": "0", "Query": "select * from Account"}
+    ]
+    with pytest.raises(ValueError):
+        build_batch_request(["select * from Account"] * 31)
+
+
+def test_parse_batch_response_fails_on_a_faulted_operation():
+    payload = {"BatchItemResponse": [
+        {"bId": "0", "QueryResponse": {"Account": []}},
+        {"bId": "1", "Fault": {"Error": [{"Message": "Invalid query"}], "type": "ValidationFault"}},
+    ]}
+
+    with pytest.raises(HTTPException) as exc_info:
+        parse_batch_response(payload, 2)
+
+    assert exc_info.value.detail["details"]["type"] == "ValidationFault"
+
+
+def test_post_batch_sends_the_queries_to_the_realm_batch_url(token):
+    with patch("services.qbo_batch.qbo_post", return_value=_response({})) as mock_post:
+        asyncio.run(post_batch(token, ["select * from Bill", "select * from Item"]))
+
+    assert mock_post.call_args.args[0].endswith("/company/12345/batch")
+    assert mock_post.call_args.kwargs["json"] == build_batch_request(["select * from Bill", "select * from Item"])
+    assert mock_post.call_args.kwargs["realm_id"] == "12345"
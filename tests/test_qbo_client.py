@@ -0,0 +1,30 @@
+import asyncio
+from services.qbo_client import get_qbo_client, close_qbo_client
+
+
+def test_get_qbo_client_is_shared_within_a_loop():
+    """
+    Test that calls on the same event loop reuse one pooled client, and closing it releases the pool.
+    """
+    async def scenario():
+        first = get_qbo_client()
+        second = get_qbo_client()
+        await close_qbo_client()
+        return first, second
+
+    first, second = asyncio.run(scenario())
+
+    assert first is second
+    assert first.is_closed
+
+
+def test_get_qbo_client_per_event_loop():
+    """
+    Test that separate event loops (one per Celery task run) get separate clients.
+    """
+    async def scenario():
+        client = get_qbo_client()
+        await close_qbo_client()
+        return client
+
+    assert asyncio.run(scenario()) is not asyncio.run(scenario())
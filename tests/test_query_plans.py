@@ -0,0 +1,128 @@
+import json
+from datetime import datetime, timedelta, timezone
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+from core.config import DATABASE_URL
+from database.base import Base
+from models.account import Account
+from models.token import Token
+from services.hierarchy_service import get_account_subtree
+from services.search_service import encode_cursor, search_accounts
+from services.summary_service import get_balance_summary, get_subtree_totals
+from services.token_service import get_latest_token
+
+pytestmark = pytest.mark.skipif(
+    not (DATABASE_URL or "").startswith("postgresql"),
+    reason="query plans are only checked against PostgreSQL",
+)
+
+CHECKED_TABLES = {"accounts", "tokens"}
+
+
+@pytest.fixture
+def db():
+    """
+    Seeds two realms inside a transaction that is rolled back afterwards, so the
+    test can run against the migrated development database without leaving rows behind.
+    """
+    engine = create_engine(DATABASE_URL)
+    connection = engine.connect()
+    transaction = connection.begin()
+    Base.metadata.create_all(connection)
+    session = Session(bind=connection)
+
+    created_at = datetime.now(timezone.utc)
+    for realm_id in ("plan-a", "plan-b"):
+        session.add_all([
+            Account(
+                realm_id=realm_id, id=i, name=f"Account {i}",
+                classification=["Asset", "Liability", "Expense"][i % 3],
+                active=i % 5 != 0, current_balance=float(i),
+                parent_id=None if i <= 10 else i // 10,
+                path=f"/{i}/", depth=0,
+            )
+            for i in range(1, 501)
+        ])
+        session.add_all([
+            Token(access_token=f"{realm_id}-{i}", realm_id=realm_id, expires_in="3600",
+                  created_at=created_at - timedelta(minutes=i))
+            for i in range(50)
+        ])
+    session.flush()
+    connection.exec_driver_sql("ANALYZE accounts")
+    connection.exec_driver_sql("ANALYZE tokens")
+    # Any sequential scan left in a plan then means no index matches the query.
+    connection.exec_driver_sql("SET LOCAL enable_seqscan = off")
+
+    yield session
+
+    session.close()
+    transaction.rollback()
+    connection.close()
+    engine.dispose()
+
+
+def _captured_statements(db, call):
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    connection = db.connection()
+    event.listen(connection, "before_cursor_execute", capture)
+    try:
+        call()
+    finally:
+        event.remove(connection, "before_cursor_execute", capture)
+    return statements
+
+
+def _plan_nodes(plan):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _plan_nodes(child)
+
+
+def _plan(db, statement, parameters):
+    result = db.connection().exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters).scalar()
+    return (json.loads(result) if isinstance(result, str) else result)[0]["Plan"]
+
+
+def _seq_scans(plan):
+    return [
+        node["Relation Name"] for node in _plan_nodes(plan)
+        if node["Node Type"] == "Seq Scan" and node.get("Relation Name") in CHECKED_TABLES
+    ]
+
+
+def _index_names(plan):
+    return {node["Index Name"] for node in _plan_nodes(plan) if "Index Name" in node}
+
+
+# Each case names the index its query is meant to use; a scan of the primary key alone would also
+# avoid sequential scans, so only asserting their absence would not catch a missing index.
+# The whole-forest read has no index of its own: every realm-leading index serves it equally.
+@pytest.mark.parametrize("name, call, indexes", [
+    ("search active+classification", lambda db: search_accounts(db, "plan-a", True, "Asset"),
+     {"ix_accounts_realm_id_classification_active_id"}),
+    ("search inactive", lambda db: search_accounts(db, "plan-a", False), {"accounts_pkey"}),
+    ("search active", lambda db: search_accounts(db, "plan-a", True, limit=20), {"ix_accounts_realm_id_active_id"}),
+    ("search next page", lambda db: search_accounts(db, "plan-a", cursor=encode_cursor("plan-a", 250)), {"accounts_pkey"}),
+    ("summary", lambda db: get_balance_summary(db, "plan-a"), {"ix_accounts_realm_id_classification_balance"}),
+    ("summary subtree rollup", lambda db: get_subtree_totals(db, "plan-a"), {"ix_accounts_realm_id_parent_id"}),
+    ("tree", lambda db: get_account_subtree(db, "plan-a"), {"accounts_pkey", "ix_accounts_realm_id_path"}),
+    ("subtree", lambda db: get_account_subtree(db, "plan-a", root_id=3, depth=1), {"ix_accounts_realm_id_path"}),
+    ("latest token of realm", lambda db: get_latest_token(db, "plan-a"), {"ix_tokens_realm_id_created_at"}),
+    ("latest token", lambda db: get_latest_token(db), {"ix_tokens_created_at"}),
+])
+def test_endpoint_queries_use_indexes(db, name, call, indexes):
+    statements = _captured_statements(db, lambda: call(db))
+    assert statements, name
+
+    used = set()
+    for statement, parameters in statements:
+        plan = _plan(db, statement, parameters)
+        assert _seq_scans(plan) == [], f"{name}: {statement}"
+        used |= _index_names(plan)
+    assert used & indexes, f"{name}: used {sorted(used)}, expected one of {sorted(indexes)}"
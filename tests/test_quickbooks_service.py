@@ -1,10 +1,20 @@
+import asyncio
+import httpx
 import pytest
-from unittest.mock import patch, MagicMock
-from services.quickbooks_service import fetch_accounts_from_qbo, sync_qbo_accounts, build_account_tree
+from unittest.mock import patch, MagicMock, AsyncMock
+from datetime import datetime, timedelta, timezone
+from services.quickbooks_service import (
+    fetch_accounts_from_qbo, sync_qbo_accounts, build_account_tree, iter_account_pages, save_accounts_to_db,
+    sync_accounts_pages, fetch_entity_from_qbo, sync_entity_pages, save_entity_rows,
+)
+from services.upsert_service import UpsertResult
+from services.entity_registry import ACCOUNT, CUSTOMER, INVOICE
+from exceptions.custom_exceptions import InvalidAccountData
 from models.token import Token
-from requests.exceptions import RequestException
-from requests.models import Response
-from core.config import ACCOUNT_API_URL
+from models.account import Account
+from models.invoice import Invoice
+from benchmarks.fake_qbo import FakeQBO, FakeQBOConfig
+from core.config import ACCOUNT_API_URL, QBO_BATCH_PAGES, QBO_SYNC_OVERLAP
 
 @pytest.fixture
 def mock_token():
@@ -18,32 +28,360 @@ def test_fetch_accounts_success(mock_token):
     """
     Test the fetch_accounts_from_qbo function with a valid token and successful account fetch.
     """
-    mock_response = MagicMock(spec=Response)
+    mock_response = MagicMock(spec=httpx.Response)
     mock_response.status_code = 200
 
-    with patch("services.quickbooks_service.requests.get", return_value=mock_response) as mock_get:
-        response = fetch_accounts_from_qbo(mock_token)
+    with patch("services.quickbooks_service.qbo_get", return_value=mock_response) as mock_get:
+        response = asyncio.run(fetch_accounts_from_qbo(mock_token))
 
-        expected_url = ACCOUNT_API_URL.format(realm_id="12345") + "?query=select * from Account&minorversion=65"
+        expected_url = ACCOUNT_API_URL.format(realm_id="12345")
+        expected_params = {"query": "select * from Account where Active IN (true, false) ORDERBY Id", "minorversion": 65}
         expected_headers = {
             "Authorization": "Bearer abc123",
             "Accept": "application/json",
             "Content-Type": "application/text"
         }
 
-        mock_get.assert_called_once_with(expected_url, headers=expected_headers)
+        mock_get.assert_called_once_with(expected_url, headers=expected_headers, params=expected_params, realm_id="12345")
         assert response.status_code == 200
 
 
+def test_fetch_accounts_page_query(mock_token):
+    """
+    Test that a paged fetch asks for inactive accounts too, in Id order, and adds STARTPOSITION and MAXRESULTS.
+    """
+    with patch("services.quickbooks_service.qbo_get", return_value=MagicMock(status_code=200)) as mock_get:
+        asyncio.run(fetch_accounts_from_qbo(mock_token, start_position=101, max_results=100))
+
+        query = mock_get.call_args.kwargs["params"]["query"]
+        assert query == "select * from Account where Active IN (true, false) ORDERBY Id STARTPOSITION 101 MAXRESULTS 100"
+
+
+def test_fetch_accounts_incremental_query(mock_token):
+    """
+    Test that an incremental fetch filters on LastUpdatedTime and includes inactive accounts.
+    """
+    since = datetime(2025, 3, 1, 12, 0, tzinfo=timezone.utc)
+
+    with patch("services.quickbooks_service.qbo_get", return_value=MagicMock(status_code=200)) as mock_get:
+        asyncio.run(fetch_accounts_from_qbo(mock_token, updated_since=since))
+
+        query = mock_get.call_args.kwargs["params"]["query"]
+        assert query == (
+            "select * from Account where Active IN (true, false) "
+            "and Metadata.LastUpdatedTime >= '2025-03-01T12:00:00+00:00' ORDERBY Id"
+        )
+
+
+def test_fetch_entity_incremental_query_without_active_flag(mock_token):
+    """
+    Test that entities without an Active flag (transactions) are filtered on LastUpdatedTime alone.
+    """
+    since = datetime(2025, 3, 1, 12, 0, tzinfo=timezone.utc)
+
+    with patch("services.quickbooks_service.qbo_get", return_value=MagicMock(status_code=200)) as mock_get:
+        asyncio.run(fetch_entity_from_qbo(mock_token, INVOICE, 1, 100, updated_since=since))
+
+        query = mock_get.call_args.kwargs["params"]["query"]
+        assert query == (
+            "select * from Invoice where Metadata.LastUpdatedTime >= '2025-03-01T12:00:00+00:00' "
+            "ORDERBY Id STARTPOSITION 1 MAXRESULTS 100"
+        )
+
+
+def _page_response(ids, status_code=200):
+    response = MagicMock()
+    response.status_code = status_code
+    response.json.return_value = {"QueryResponse": {"Account": [{"Id": str(i)} for i in ids]}}
+    return response
+
+
+async def _collect(pages):
+    return [page async for page in pages]
+
+
+async def _async_pages(pages):
+    for page in pages:
+        yield page
+
+
+def test_iter_account_pages_walks_until_short_page(mock_token):
+    """
+    Test that pages are requested until a page shorter than the page size comes back.
+    """
+    pages = {1: _page_response([1, 2]), 3: _page_response([3, 4]), 5: _page_response([5])}
+
+    with patch("services.quickbooks_service.fetch_entity_from_qbo",
+               side_effect=lambda token, entity, start, size, **kwargs: pages[start]) as mock_fetch:
+        result = asyncio.run(_collect(iter_account_pages(MagicMock(), mock_token, page_size=2, concurrency=1, batch=False)))
+
+    assert [[acc["Id"] for acc in page] for page in result] == [["1", "2"], ["3", "4"], ["5"]]
+    assert mock_fetch.call_count == 3
+
+
+def test_iter_account_pages_refreshes_token_on_401(mock_token):
+    """
+    Test that a 401 refreshes the token once and retries the batch with the new token.
+    """
+    new_token = MagicMock(spec=Token)
+    responses = {mock_token: _page_response([], status_code=401), new_token: _page_response([1])}
+
+    with patch("services.quickbooks_service.fetch_entity_from_qbo",
+               side_effect=lambda token, entity, start, size, **kwargs: responses[token]), \
+         patch("services.quickbooks_service.token_manager.refresh", return_value=new_token) as mock_refresh:
+        result = asyncio.run(_collect(
+            iter_account_pages(MagicMock(), mock_token, page_size=10, concurrency=2, batch=False)
+        ))
+
+    mock_refresh.assert_called_once()
+    assert result == [[{"Id": "1"}]]
+
+
+def _batch_response(pages, status_code=200):
+    response = MagicMock(status_code=status_code, content=b"{}")
+    # QBO does not promise to answer the operations in request order.
+    response.json.return_value = {"BatchItemResponse": [
+        {"bId": str(i), "QueryResponse": {"Account": [{"Id": str(id)} for id in ids]}}
+        for i, ids in reversed(list(enumerate(pages)))
+    ]}
+    return response
+
+
+def test_iter_account_pages_sends_the_pages_after_the_first_as_batches(mock_token):
+    """
+    Test that the first page is one /query request and the following ones go out a window per /batch request.
+    """
+    windows = [_batch_response([[3, 4], [5, 6]]), _batch_response([[7], []])]
+
+    with patch("services.quickbooks_service.fetch_entity_from_qbo", return_value=_page_response([1, 2])) as mock_fetch, \
+         patch("services.quickbooks_service.post_batch", side_effect=windows) as mock_post:
+        result = asyncio.run(_collect(iter_account_pages(MagicMock(), mock_token, page_size=2, batch=True, batch_pages=2)))
+
+    assert [[acc["Id"] for acc in page] for page in result] == [["1", "2"], ["3", "4"], ["5", "6"], ["7"]]
+    assert mock_fetch.call_count == 1
+    assert mock_post.call_args_list[1].args[1] == [
+        "select * from Account where Active IN (true, false) ORDERBY Id STARTPOSITION 7 MAXRESULTS 2",
+        "select * from Account where Active IN (true, false) ORDERBY Id STARTPOSITION 9 MAXRESULTS 2",
+    ]
+
+
+def test_iter_account_pages_sends_concurrency_batches_at_once(mock_token):
+    """
+    Test that with batch, QBO_PAGE_CONCURRENCY still sets how many /batch requests go out per window.
+    """
+    windows = [_batch_response([[3, 4], [5, 6]]), _batch_response([[7, 8], [9]])]
+
+    with patch("services.quickbooks_service.fetch_entity_from_qbo", return_value=_page_response([1, 2])), \
+         patch("services.quickbooks_service.post_batch", side_effect=windows) as mock_post:
+        result = asyncio.run(_collect(
+            iter_account_pages(MagicMock(), mock_token, page_size=2, concurrency=2, batch=True, batch_pages=2)
+        ))
+
+    assert [[acc["Id"] for acc in page] for page in result] == [["1", "2"], ["3", "4"], ["5", "6"], ["7", "8"], ["9"]]
+    assert [[query.split(" STARTPOSITION ")[1] for query in c.args[1]] for c in mock_post.call_args_list] == [
+        ["3 MAXRESULTS 2", "5 MAXRESULTS 2"], ["7 MAXRESULTS 2", "9 MAXRESULTS 2"],
+    ]
+
+
+def test_iter_account_pages_makes_fewer_requests_with_the_defaults(mock_token):
+    """
+    Test that with the default settings a five page walk takes two HTTP requests instead of five.
+    """
+    window = _batch_response([[3, 4], [5, 6], [7, 8], [9]] + [[]] * (QBO_BATCH_PAGES - 4))
+
+    with patch("services.quickbooks_service.fetch_entity_from_qbo", return_value=_page_response([1, 2])) as mock_fetch, \
+         patch("services.quickbooks_service.post_batch", return_value=window) as mock_post:
+        result = asyncio.run(_collect(iter_account_pages(MagicMock(), mock_token, page_size=2)))
+
+    assert len(result) == 5
+    assert mock_fetch.call_count + mock_post.call_count == 2
+
+
+def test_sync_accounts_pages_advances_high_water_mark(mock_token):
+    """
+    Test that an incremental sync starts from the stored mark and stores the newest LastUpdatedTime it saw.
+    """
+    db = MagicMock()
+    since = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    page = [
+        {"Id": "1", "MetaData": {"LastUpdatedTime": "2025-02-01T10:00:00-08:00"}},
+        {"Id": "2", "MetaData": {"LastUpdatedTime": "2025-02-03T10:00:00-08:00"}},
+    ]
+
+    with patch("services.quickbooks_service.get_high_water_mark", return_value=since), \
+         patch("services.quickbooks_service.iter_entity_pages",
+               side_effect=lambda *args, **kwargs: _async_pages([page])) as mock_pages, \
+         patch("services.quickbooks_service.save_entity_rows", return_value=UpsertResult(updated=2)) as mock_save, \
+         patch("services.entity_registry.refresh_account_paths") as mock_refresh_paths, \
+         patch("services.quickbooks_service.set_high_water_mark") as mock_set:
+        pages = asyncio.run(sync_accounts_pages(db, mock_token))
+
+    assert pages == 1
+    assert mock_pages.call_args.kwargs["updated_since"] == since
+    mock_save.assert_called_once_with(db, ACCOUNT, page, "12345", False)
+    mock_refresh_paths.assert_called_once_with(db, "12345")
+    mock_set.assert_called_once_with(db, "12345", "Account", datetime.fromisoformat("2025-02-03T10:00:00-08:00"))
+
+
+def test_sync_keeps_the_mark_below_rows_updated_mid_walk(mock_token):
+    """
+    Test that when a later page holds a row changed after the walk started, the mark stays before the start,
+    so a lower-Id row QBO updated after its page was read is still fetched by the next incremental sync.
+    """
+    walk_started = datetime.now(timezone.utc)
+    pages = [
+        [{"Id": "1", "MetaData": {"LastUpdatedTime": (walk_started - timedelta(days=1)).isoformat()}}],
+        [{"Id": "2", "MetaData": {"LastUpdatedTime": (walk_started + timedelta(seconds=5)).isoformat()}}],
+    ]
+
+    with patch("services.quickbooks_service.get_high_water_mark", return_value=walk_started - timedelta(days=2)), \
+         patch("services.quickbooks_service.iter_entity_pages", side_effect=lambda *args, **kwargs: _async_pages(pages)), \
+         patch("services.quickbooks_service.save_entity_rows", return_value=UpsertResult(updated=1)), \
+         patch("services.quickbooks_service.set_high_water_mark") as mock_set:
+        asyncio.run(sync_entity_pages(MagicMock(), mock_token, INVOICE))
+
+    mark = mock_set.call_args[0][3]
+    # Id 1, updated in QBO right after its page was read, is at or after the mark.
+    assert walk_started - timedelta(seconds=QBO_SYNC_OVERLAP + 60) < mark < walk_started
+
+
+def test_sync_accounts_pages_full_ignores_high_water_mark(mock_token):
+    """
+    Test that a full resync fetches every account and leaves the mark alone when nothing came back.
+    """
+    with patch("services.quickbooks_service.get_high_water_mark") as mock_get_mark, \
+         patch("services.quickbooks_service.iter_entity_pages",
+               side_effect=lambda *args, **kwargs: _async_pages([])) as mock_pages, \
+         patch("services.entity_registry.refresh_account_paths") as mock_refresh_paths, \
+         patch("services.quickbooks_service.set_high_water_mark") as mock_set:
+        pages = asyncio.run(sync_accounts_pages(MagicMock(), mock_token, full=True))
+
+    assert pages == 0
+    mock_get_mark.assert_not_called()
+    mock_refresh_paths.assert_not_called()
+    assert mock_pages.call_args.kwargs["updated_since"] is None
+    mock_set.assert_not_called()
+
+
+def test_sync_entity_pages_reads_the_entity_key_and_skips_account_hooks(mock_token):
+    """
+    Test that a Customer sync reads QueryResponse.Customer, keeps its own high-water mark
+    and leaves the account cache and hierarchy alone.
+    """
+    db = MagicMock()
+    response = MagicMock(status_code=200, content=b"{}")
+    response.json.return_value = {"QueryResponse": {"Customer": [{"Id": "7", "DisplayName": "Acme"}]}}
+
+    with patch("services.quickbooks_service.fetch_entity_from_qbo", return_value=response), \
+         patch("services.quickbooks_service.get_high_water_mark", return_value=None) as mock_get_mark, \
+         patch("services.quickbooks_service.save_entity_rows", return_value=UpsertResult(inserted=1)) as mock_save, \
+         patch("services.entity_registry.refresh_account_paths") as mock_refresh_paths, \
+         patch("services.entity_registry.account_cache") as mock_cache:
+        pages = asyncio.run(sync_entity_pages(db, mock_token, CUSTOMER))
+
+    assert pages == 1
+    assert mock_get_mark.call_args[0][1:] == ("12345", "Customer")
+    mock_save.assert_called_once_with(db, CUSTOMER, [{"Id": "7", "DisplayName": "Acme"}], "12345", False)
+    mock_refresh_paths.assert_not_called()
+    mock_cache.bump_version.assert_not_called()
+
+
+def test_full_sync_deletes_rows_deleted_in_qbo(db, mock_token):
+    """
+    Test that a full sync removes the realm's invoices QBO no longer returns, and only those.
+    """
+    db.add_all([Invoice(realm_id="12345", id=i, doc_number=str(i)) for i in (1, 2, 3)])
+    db.add(Invoice(realm_id="other", id=2, doc_number="2"))
+    db.commit()
+    response = MagicMock(status_code=200, content=b"{}")
+    response.json.return_value = {"QueryResponse": {"Invoice": [{"Id": "1"}, {"Id": "3"}]}}
+
+    with patch("services.quickbooks_service.fetch_entity_from_qbo", return_value=response):
+        asyncio.run(sync_entity_pages(db, mock_token, INVOICE, full=True))
+
+    assert sorted(db.query(Invoice.realm_id, Invoice.id).all()) == [("12345", 1), ("12345", 3), ("other", 2)]
+
+
+def test_full_sync_keeps_rows_another_sync_wrote_mid_walk(db, mock_token):
+    """
+    Test that a row written by an incremental sync after the full walk passed it is not deleted as unseen.
+    """
+    db.add_all([Invoice(realm_id="12345", id=i, doc_number=str(i)) for i in (1, 2, 3, 4)])
+    db.commit()
+
+    async def walk(*args, **kwargs):
+        yield [{"Id": "1", "DocNumber": "1"}]
+        # An incremental sync of the realm writes invoice 2 while the full walk is between pages.
+        save_entity_rows(db, INVOICE, [{"Id": "2", "DocNumber": "2-changed"}], "12345", False)
+        yield [{"Id": "3", "DocNumber": "3"}]
+
+    with patch("services.quickbooks_service.iter_entity_pages", side_effect=walk):
+        asyncio.run(sync_entity_pages(db, mock_token, INVOICE, full=True))
+
+    assert [(i.id, i.doc_number) for i in db.query(Invoice).order_by(Invoice.id)] == [(1, "1"), (2, "2-changed"), (3, "3")]
+
+
+def test_full_sync_keeps_inactive_accounts(db, mock_token):
+    """
+    Test that a full sync against QBO's active-only default still sees, and keeps, inactive accounts.
+    """
+    qbo = FakeQBO(FakeQBOConfig(accounts=5))
+    for row in qbo.rows("Account", "12345")[0]:
+        row["Active"] = row["Id"] != "2"
+    db.add(Account(realm_id="12345", id=2, name="Account 2", active=False))
+    db.commit()
+
+    async def fetch(token, entity, start, size, updated_since=None):
+        response = MagicMock(status_code=200, content=b"{}")
+        response.json.return_value = qbo.run_query(token.realm_id, entity.query(start, size, updated_since))
+        return response
+
+    with patch("services.quickbooks_service.fetch_entity_from_qbo", side_effect=fetch), \
+         patch("services.entity_registry.account_cache"):
+        asyncio.run(sync_entity_pages(db, mock_token, ACCOUNT, full=True))
+
+    assert [(a.id, a.active) for a in db.query(Account).order_by(Account.id)] == [
+        (1, True), (2, False), (3, True), (4, True), (5, True)
+    ]
+
+
+def test_full_sync_deletes_nothing_when_qbo_returns_no_rows(db, mock_token):
+    db.add(Invoice(realm_id="12345", id=1, doc_number="1"))
+    db.commit()
+    response = MagicMock(status_code=200, content=b"{}")
+    response.json.return_value = {"QueryResponse": {}}
+
+    with patch("services.quickbooks_service.fetch_entity_from_qbo", return_value=response):
+        asyncio.run(sync_entity_pages(db, mock_token, INVOICE, full=True))
+
+    assert db.query(Invoice).count() == 1
+
+
+def test_incremental_sync_keeps_rows_it_did_not_see(db, mock_token):
+    db.add_all([Invoice(realm_id="12345", id=i, doc_number=str(i)) for i in (1, 2)])
+    db.commit()
+    response = MagicMock(status_code=200, content=b"{}")
+    response.json.return_value = {"QueryResponse": {"Invoice": [{"Id": "1"}]}}
+
+    with patch("services.quickbooks_service.get_high_water_mark", return_value=datetime(2025, 1, 1, tzinfo=timezone.utc)), \
+         patch("services.quickbooks_service.fetch_entity_from_qbo", return_value=response):
+        asyncio.run(sync_entity_pages(db, mock_token, INVOICE))
+
+    assert db.query(Invoice).count() == 2
+
+
 def test_fetch_accounts_retries_on_failure(mock_token):
     """
     Test that the function retries on failure using backoff.
     """
-    with patch("services.quickbooks_service.requests.get", side_effect=RequestException("Network error")) as mock_get:
-        with pytest.raises(RequestException):
-            fetch_accounts_from_qbo(mock_token)
+    mock_client = MagicMock()
+    mock_client.get = AsyncMock(side_effect=httpx.ConnectError("Network error"))
+
+    with patch("services.qbo_client.get_qbo_client", return_value=mock_client):
+        with pytest.raises(httpx.ConnectError):
+            asyncio.run(fetch_accounts_from_qbo(mock_token))
 
-        assert mock_get.call_count == 3  # Because of backoff max_tries=3
+        assert mock_client.get.call_count == 3  # Because of backoff max_tries=3
 
 def test_sync_qbo_accounts_success():
     db = MagicMock()
@@ -59,19 +397,61 @@ def test_sync_qbo_accounts_success():
         }
     }
 
-    with patch("services.quickbooks_service.get_latest_token", return_value=mock_token), \
-         patch("services.quickbooks_service.fetch_accounts_from_qbo", return_value=mock_response), \
-         patch("services.quickbooks_service.save_accounts_to_db") as mock_save:
+    with patch("services.quickbooks_service.token_manager.get_token", return_value=mock_token), \
+         patch("services.quickbooks_service.fetch_entity_from_qbo", return_value=mock_response), \
+         patch("services.quickbooks_service.save_entity_rows") as mock_save:
 
-        result = sync_qbo_accounts(db)
+        result = asyncio.run(sync_qbo_accounts(db))
 
         mock_save.assert_called_once()
         db.query.assert_called_once()
 
+def test_save_accounts_to_db_maps_payload():
+    """
+    Test that QBO payloads are mapped to account rows and written with one bulk upsert.
+    """
+    db = MagicMock()
+    accounts_data = [
+        {"Id": "1", "Name": "Cash", "Classification": "Asset", "CurrencyRef": {"value": "USD"},
+         "AccountType": "Bank", "Active": True, "CurrentBalance": 10.5},
+        {"Id": "2", "Name": "Petty Cash", "SubAccount": True, "ParentRef": {"value": "1"}},
+    ]
+
+    with patch("services.quickbooks_service.upsert_rows",
+               return_value=UpsertResult(inserted=2)) as mock_upsert, \
+         patch("services.entity_registry.refresh_account_paths") as mock_refresh_paths, \
+         patch("services.entity_registry.account_cache") as mock_cache:
+        result = save_accounts_to_db(db, accounts_data, "12345")
+
+    rows = mock_upsert.call_args[0][2]
+    assert rows[0] == {
+        "realm_id": "12345", "id": 1, "name": "Cash", "classification": "Asset", "currency": "USD",
+        "account_type": "Bank", "active": True, "current_balance": 10.5, "parent_id": None,
+    }
+    assert rows[1]["parent_id"] == 1
+    assert result.inserted == 2
+    db.commit.assert_called_once()
+    mock_cache.bump_version.assert_called_once_with("12345")
+    mock_refresh_paths.assert_called_once_with(db, "12345")
+
+
+def test_save_accounts_to_db_keeps_cache_when_nothing_changed():
+    with patch("services.quickbooks_service.upsert_rows", return_value=UpsertResult(unchanged=1)), \
+         patch("services.entity_registry.account_cache") as mock_cache:
+        save_accounts_to_db(MagicMock(), [{"Id": "1"}], "12345")
+
+    mock_cache.bump_version.assert_not_called()
+
+
+def test_save_accounts_to_db_rejects_empty_data():
+    with pytest.raises(InvalidAccountData):
+        save_accounts_to_db(MagicMock(), [], "12345")
+
+
 def test_build_account_tree_single_root():
-    account1 = MagicMock(id=1, name="Root Account", parent_id=None)
-    account2 = MagicMock(id=2, name="Child Account", parent_id=1)
-    account3 = MagicMock(id=3, name="Another Child", parent_id=1)
+    account1 = MagicMock(realm_id="12345", id=1, name="Root Account", parent_id=None)
+    account2 = MagicMock(realm_id="12345", id=2, name="Child Account", parent_id=1)
+    account3 = MagicMock(realm_id="12345", id=3, name="Another Child", parent_id=1)
 
     accounts = [account1, account2, account3]
 
@@ -85,10 +465,10 @@ def test_build_account_tree_single_root():
 
 
 def test_build_account_tree_multiple_roots():
-    account1 = MagicMock(id=1, name="Root A", parent_id=None)
-    account2 = MagicMock(id=2, name="Root B", parent_id=None)
-    account3 = MagicMock(id=3, name="Child of A", parent_id=1)
-    account4 = MagicMock(id=4, name="Child of B", parent_id=2)
+    account1 = MagicMock(realm_id="12345", id=1, name="Root A", parent_id=None)
+    account2 = MagicMock(realm_id="12345", id=2, name="Root B", parent_id=None)
+    account3 = MagicMock(realm_id="12345", id=3, name="Child of A", parent_id=1)
+    account4 = MagicMock(realm_id="12345", id=4, name="Child of B", parent_id=2)
 
     accounts = [account1, account2, account3, account4]
 
@@ -106,12 +486,13 @@ def test_build_account_tree_multiple_roots():
 
 
 def test_build_account_tree_orphan_node():
-    account1 = MagicMock(id=1, name="Root", parent_id=None)
-    account2 = MagicMock(id=2, name="Orphan", parent_id=99)  # 99 does not exist
+    account1 = MagicMock(realm_id="12345", id=1, name="Root", parent_id=None)
+    account2 = MagicMock(realm_id="12345", id=2, name="Orphan", parent_id=99)  # 99 does not exist
 
     accounts = [account1, account2]
     tree = build_account_tree(accounts)
 
-    assert len(tree) == 1
+    assert len(tree) == 2
     assert tree[0]["id"] == 1
-    assert len(tree[0]["children"]) == 0  # Orphan should be ignored
\ No newline at end of file
+    assert len(tree[0]["children"]) == 0
+    assert tree[1]["id"] == 2  # Orphan is kept as a root instead of being dropped
\ No newline at end of file
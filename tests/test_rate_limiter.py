@@ -0,0 +1,140 @@
+import asyncio
+import time
+from unittest.mock import patch, MagicMock, AsyncMock
+import httpx
+from services.rate_limiter import QBORateLimiter, AdaptiveConcurrency
+from services.qbo_client import qbo_get, retry_after_seconds
+
+
+def test_bucket_spaces_requests_beyond_the_burst():
+    """
+    Test that requests past the burst wait for the bucket to refill at the configured rate.
+    """
+    limiter = QBORateLimiter(rate_per_minute=600, burst=2, max_concurrency=10)
+
+    async def send_three():
+        started = time.perf_counter()
+        for _ in range(3):
+            await limiter.acquire("111")
+            await limiter.release("111", 0.01, 200)
+        return time.perf_counter() - started
+
+    assert 0.08 <= asyncio.run(send_three()) < 0.5
+
+
+def test_concurrency_limit_holds_back_extra_requests():
+    limiter = QBORateLimiter(rate_per_minute=60000, burst=100, max_concurrency=1)
+    order = []
+
+    async def request(name):
+        await limiter.acquire("111")
+        order.append(f"{name} start")
+        await asyncio.sleep(0.01)
+        order.append(f"{name} end")
+        await limiter.release("111", 0.01, 200)
+
+    async def main():
+        await asyncio.gather(request("a"), request("b"))
+
+    asyncio.run(main())
+    assert order == ["a start", "a end", "b start", "b end"]
+
+
+def test_aimd_halves_on_429_and_grows_additively():
+    concurrency = AdaptiveConcurrency(minimum=1, maximum=10, latency_target=1.0)
+
+    concurrency.record(0.1, throttled=True)
+    assert concurrency.limit == 5
+    concurrency.record(2.0, throttled=False)
+    assert concurrency.limit == 4.5
+    for _ in range(5):
+        concurrency.record(0.1, throttled=False)
+    assert 5.4 < concurrency.limit < 5.6
+    for _ in range(10):
+        concurrency.record(0.1, throttled=True)
+    assert concurrency.limit == 1
+
+
+def test_throttled_realm_is_blocked_in_redis():
+    """
+    Test that a 429 pauses the realm for every process through a Redis key expiring after Retry-After.
+    """
+    redis_client = MagicMock()
+    redis_client.eval.return_value = [1, b"0"]
+    limiter = QBORateLimiter(redis_client)
+
+    async def throttled():
+        await limiter.acquire("111")
+        await limiter.release("111", 0.1, 429, retry_after=3)
+
+    asyncio.run(throttled())
+    assert redis_client.eval.call_args[0][2:4] == ("qbo-rate:111", "qbo-rate-block:111")
+    redis_client.set.assert_called_once_with("qbo-rate-block:111", 1, px=3000)
+
+
+def test_qbo_get_retries_429_after_retry_after():
+    limiter = QBORateLimiter(rate_per_minute=60000, burst=100)
+    client = MagicMock()
+    client.get = AsyncMock(side_effect=[
+        httpx.Response(429, headers={"Retry-After": "0.05"}),
+        httpx.Response(200, json={}),
+    ])
+
+    async def get():
+        started = time.perf_counter()
+        response = await qbo_get("https://qbo/query", headers={}, params={}, realm_id="111")
+        return response, time.perf_counter() - started
+
+    with patch("services.qbo_client.qbo_rate_limiter", limiter), \
+         patch("services.qbo_client.get_qbo_client", return_value=client):
+        response, elapsed = asyncio.run(get())
+
+    assert response.status_code == 200
+    assert client.get.call_count == 2
+    assert elapsed >= 0.05
+    assert limiter.concurrency("111").limit == 5.2  # halved by the 429, then +1/limit for the 200
+
+
+def test_qbo_get_gives_up_after_max_retries():
+    limiter = QBORateLimiter(rate_per_minute=60000, burst=100, cooldown=0)
+    client = MagicMock()
+    client.get = AsyncMock(return_value=httpx.Response(429))
+
+    with patch("services.qbo_client.qbo_rate_limiter", limiter), \
+         patch("services.qbo_client.QBO_THROTTLE_MAX_RETRIES", 2), \
+         patch("services.qbo_client.get_qbo_client", return_value=client):
+        response = asyncio.run(qbo_get("https://qbo/query", headers={}, params={}, realm_id="111"))
+
+    assert response.status_code == 429
+    assert client.get.call_count == 3
+
+
+def test_retry_after_seconds_reads_seconds_and_dates():
+    assert retry_after_seconds(httpx.Response(429, headers={"Retry-After": "7"})) == 7
+    assert retry_after_seconds(httpx.Response(429, headers={"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"})) == 0
+    assert retry_after_seconds(httpx.Response(429, headers={"Retry-After": "soon"})) is None
+    assert retry_after_seconds(httpx.Response(429)) is None
+
+
+def test_qbo_get_frees_the_slot_whatever_send_raises():
+    """
+    Test that errors other than transport errors (a bad body, too many redirects) still release the realm's slot.
+    """
+    limiter = QBORateLimiter(rate_per_minute=60000, burst=100, min_concurrency=1, max_concurrency=1)
+    client = MagicMock()
+    client.get = AsyncMock(side_effect=[httpx.DecodingError("bad gzip"), httpx.TooManyRedirects("loop"), httpx.Response(200)])
+
+    async def get_three():
+        results = []
+        for _ in range(3):
+            try:
+                results.append((await asyncio.wait_for(qbo_get("https://qbo/query", headers={}, params={}, realm_id="111"), 1)).status_code)
+            except httpx.HTTPError as e:
+                results.append(type(e).__name__)
+        return results
+
+    with patch("services.qbo_client.qbo_rate_limiter", limiter), \
+         patch("services.qbo_client.get_qbo_client", return_value=client):
+        assert asyncio.run(get_three()) == ["DecodingError", "TooManyRedirects", 200]
+
+    assert limiter.concurrency("111").in_flight == 0
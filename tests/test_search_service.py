@@ -0,0 +1,44 @@
+import pytest
+from fastapi import HTTPException
+from models.account import Account
+from services.search_service import search_accounts, encode_cursor, decode_cursor, parse_fields
+
+
+@pytest.fixture
+def db(db):
+    db.add_all(
+        [Account(realm_id="111", id=i, name=f"Account {i}", classification="Asset", active=i % 2 == 0)
+         for i in range(1, 8)]
+        + [Account(realm_id="222", id=1, name="Other", classification="Asset", active=True)]
+    )
+    db.commit()
+    return db
+
+
+def test_search_accounts_walks_pages_with_cursor(db):
+    """
+    Test that following next cursors returns every matching account exactly once, across realms.
+    """
+    seen, cursor = [], None
+    while True:
+        items, cursor = search_accounts(db, fields=["realm_id", "id"], limit=3, cursor=cursor)
+        seen += [(item["realm_id"], item["id"]) for item in items]
+        if cursor is None:
+            break
+
+    assert seen == [("111", i) for i in range(1, 8)] + [("222", 1)]
+
+
+def test_search_accounts_filters_and_projects(db):
+    items, cursor = search_accounts(db, realm_id="111", active=True, fields=["name"], limit=10)
+
+    assert items == [{"name": "Account 2"}, {"name": "Account 4"}, {"name": "Account 6"}]
+    assert cursor is None
+
+
+def test_cursor_round_trip_and_validation():
+    assert decode_cursor(encode_cursor("111", 7)) == ("111", 7)
+    with pytest.raises(HTTPException):
+        decode_cursor("not-a-cursor")
+    with pytest.raises(HTTPException):
+        parse_fields("id,password")
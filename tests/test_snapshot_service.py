@@ -0,0 +1,148 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch, MagicMock
+import pytest
+from models.account import Account
+from models.page_snapshot import PageSnapshot
+from models.sync_run import SyncRun
+from models.token import Token
+from services import snapshot_service
+from services.snapshot_service import (
+    compress_payloads, decompress_payloads, save_page_snapshot, iter_snapshot_pages, latest_snapshot_run, prune_snapshots,
+)
+from services.quickbooks_service import replay_sync_run, sync_accounts_pages
+
+PAGES = [
+    [{"Id": "1", "Name": "Cash", "Classification": "Asset", "Active": True, "CurrentBalance": 10.5}],
+    [{"Id": "2", "Name": "Petty Cash", "Classification": "Asset", "SubAccount": True, "ParentRef": {"value": "1"}}],
+]
+
+
+def _stored_run(db, realm_id="111", entity="Account") -> SyncRun:
+    run = SyncRun(realm_id=realm_id, entity=entity, trigger="celery", status="succeeded")
+    db.add(run)
+    db.commit()
+    for page, payloads in enumerate(PAGES, start=1):
+        assert save_page_snapshot(db, run.id, realm_id, entity, page, payloads)
+    return run
+
+
+@pytest.mark.parametrize("codec", ["zstd", "gzip"])
+def test_compress_payloads_round_trip(codec):
+    """
+    Test that both codecs give back the page they compressed and report its raw size.
+    """
+    if codec == "zstd" and snapshot_service.zstandard is None:
+        pytest.skip("zstandard is not installed")
+    data, raw_bytes = compress_payloads(PAGES[0], codec)
+
+    assert decompress_payloads(data, codec) == PAGES[0]
+    assert raw_bytes == len(snapshot_service.dumps(PAGES[0]))
+
+
+def test_snapshot_codec_falls_back_to_gzip():
+    """
+    Test that zstd is only used when the zstandard package is installed.
+    """
+    with patch.object(snapshot_service, "zstandard", None):
+        assert snapshot_service.snapshot_codec() == "gzip"
+    with patch.object(snapshot_service, "SNAPSHOT_CODEC", "gzip"):
+        assert snapshot_service.snapshot_codec() == "gzip"
+
+
+def test_snapshots_are_read_back_in_page_order(db):
+    """
+    Test that a run's pages come back in fetch order and the newest run with snapshots is found.
+    """
+    run = _stored_run(db)
+    db.add(SyncRun(realm_id="111", entity="Account", trigger="celery", started_at=datetime.now(timezone.utc) + timedelta(hours=1)))
+    db.commit()
+
+    assert list(iter_snapshot_pages(db, run.id)) == PAGES
+    assert latest_snapshot_run(db, "111", "Account").id == run.id
+    assert latest_snapshot_run(db, "111", "Customer") is None
+
+
+def test_save_page_snapshot_never_raises():
+    """
+    Test that a failed snapshot write is rolled back and reported, not raised.
+    """
+    db = MagicMock()
+    db.commit.side_effect = RuntimeError("disk full")
+
+    assert save_page_snapshot(db, 1, "111", "Account", 1, PAGES[0]) is False
+    db.rollback.assert_called_once()
+
+
+def test_prune_snapshots_deletes_old_pages(db):
+    """
+    Test that retention only removes snapshots older than the cutoff.
+    """
+    run = _stored_run(db)
+    db.query(PageSnapshot).filter(PageSnapshot.page == 1).update(
+        {PageSnapshot.created_at: datetime.now(timezone.utc) - timedelta(days=30)}
+    )
+    db.commit()
+
+    assert prune_snapshots(db, retention_days=14) == 1
+    assert [page.page for page in db.query(PageSnapshot).filter(PageSnapshot.sync_run_id == run.id)] == [2]
+
+
+def test_replay_sync_run_writes_rows_without_qbo(db):
+    """
+    Test that a replay maps and upserts the stored pages into the target realm and records a replay run.
+    """
+    run = _stored_run(db)
+
+    with patch("services.entity_registry.refresh_account_paths") as mock_refresh_paths, \
+         patch("services.quickbooks_service.iter_entity_pages") as mock_fetch:
+        result = replay_sync_run(db, run.id, realm_id="scratch")
+
+    mock_fetch.assert_not_called()
+    mock_refresh_paths.assert_called_once_with(db, "scratch")
+    assert (result["pages"], result["rows"], result["inserted"]) == (2, 2, 2)
+    accounts = db.query(Account).filter(Account.realm_id == "scratch").order_by(Account.id).all()
+    assert [(a.id, a.name, a.parent_id) for a in accounts] == [(1, "Cash", None), (2, "Petty Cash", 1)]
+    replay = db.get(SyncRun, result["sync_run_id"])
+    assert (replay.trigger, replay.status, replay.rows_inserted) == ("replay", "succeeded", 2)
+
+    with patch("services.entity_registry.refresh_account_paths"):
+        assert replay_sync_run(db, run.id, realm_id="scratch")["unchanged"] == 2
+    with pytest.raises(ValueError):
+        replay_sync_run(db, 999)
+
+
+def test_replay_sync_run_needs_overwrite_live_for_the_runs_own_realm(db):
+    """
+    Test that a replay refuses to roll back the live rows of the run's realm unless told to.
+    """
+    run = _stored_run(db)
+
+    with pytest.raises(ValueError):
+        replay_sync_run(db, run.id)
+    with pytest.raises(ValueError):
+        replay_sync_run(db, run.id, realm_id=run.realm_id)
+    assert db.query(Account).count() == 0
+
+    with patch("services.entity_registry.refresh_account_paths"):
+        result = replay_sync_run(db, run.id, overwrite_live=True)
+    assert (result["realm_id"], result["inserted"]) == (run.realm_id, 2)
+
+
+def test_sync_stores_each_fetched_page(db):
+    """
+    Test that a sync snapshots every page under its own run before writing it.
+    """
+    token = MagicMock(spec=Token)
+    token.realm_id = "111"
+
+    async def pages(*args, **kwargs):
+        for page in PAGES:
+            yield page
+
+    with patch("services.quickbooks_service.iter_entity_pages", side_effect=pages), \
+         patch("services.entity_registry.refresh_account_paths"):
+        asyncio.run(sync_accounts_pages(db, token, full=True))
+
+    run = db.query(SyncRun).one()
+    assert list(iter_snapshot_pages(db, run.id)) == PAGES
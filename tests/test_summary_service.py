@@ -0,0 +1,46 @@
+import pytest
+from models.account import Account
+from services.summary_service import get_balance_summary, get_subtree_totals
+
+
+@pytest.fixture
+def db(db):
+    db.add_all([
+        Account(realm_id="111", id=1, name="Bank", classification="Asset", currency="USD",
+                account_type="Bank", active=True, current_balance=100.0),
+        Account(realm_id="111", id=2, name="Checking", classification="Asset", currency="USD",
+                account_type="Bank", active=True, current_balance=50.0, parent_id=1),
+        Account(realm_id="111", id=3, name="Payroll", classification="Asset", currency="USD",
+                account_type="Bank", active=False, current_balance=25.5, parent_id=2),
+        Account(realm_id="111", id=4, name="Loan", classification="Liability", currency="EUR",
+                account_type="Long Term Liability", active=True, current_balance=-300.0),
+        Account(realm_id="222", id=1, name="Cash", classification="Asset", currency="USD",
+                account_type="Bank", active=True, current_balance=7.0),
+    ])
+    db.commit()
+    return db
+
+
+def test_get_balance_summary_by_classification(db):
+    assert get_balance_summary(db) == {"Asset": 182.5, "Liability": -300.0}
+    assert get_balance_summary(db, realm_id="111") == {"Asset": 175.5, "Liability": -300.0}
+
+
+def test_get_balance_summary_nested_groups(db):
+    assert get_balance_summary(db, realm_id="111", group_by=["currency", "active"]) == {
+        "Asset": {"USD": {"false": 25.5, "true": 150.0}},
+        "Liability": {"EUR": {"true": -300.0}},
+    }
+
+
+def test_get_subtree_totals_rolls_up_children(db):
+    totals = {row["id"]: row["subtree_balance"] for row in get_subtree_totals(db, realm_id="111")}
+
+    assert totals == {1: 175.5, 2: 75.5, 3: 25.5, 4: -300.0}
+
+
+def test_get_subtree_totals_keeps_realms_apart(db):
+    rows = get_subtree_totals(db)
+
+    assert [(row["realm_id"], row["id"]) for row in rows] == [("111", 1), ("111", 2), ("111", 3), ("111", 4), ("222", 1)]
+    assert rows[-1]["subtree_balance"] == 7.0
@@ -0,0 +1,70 @@
+import pytest
+import redis
+from unittest.mock import patch, MagicMock
+from services.sync_job_service import SyncClaim, claim_sync_job, defer_full_sync, release_sync_job
+from exceptions.custom_exceptions import SyncDeduplicationUnavailable
+
+
+def test_claim_sync_job_sets_the_realm_key_once():
+    redis_client = MagicMock()
+    redis_client.set.return_value = True
+
+    with patch("services.sync_job_service._redis", redis_client):
+        assert claim_sync_job("111", "job-1") is None
+
+    redis_client.set.assert_called_once()
+    assert redis_client.set.call_args[0][:2] == ("sync-job:Account:111", "job-1")
+    assert redis_client.set.call_args.kwargs["nx"] is True
+
+
+def test_claim_sync_job_returns_the_job_in_flight():
+    redis_client = MagicMock()
+    redis_client.set.return_value = None
+    redis_client.get.return_value = b"job-1"
+
+    with patch("services.sync_job_service._redis", redis_client):
+        assert claim_sync_job("111", "job-2") == SyncClaim("job-1", full=False)
+
+
+def test_claim_sync_job_records_full_syncs():
+    redis_client = MagicMock()
+    redis_client.set.return_value = None
+    redis_client.get.return_value = b"job-1:full"
+
+    with patch("services.sync_job_service._redis", redis_client):
+        assert claim_sync_job("111", "job-2", full=True) == SyncClaim("job-1", full=True)
+
+    assert redis_client.set.call_args[0][:2] == ("sync-job:Account:111", "job-2:full")
+
+
+def test_release_sync_job_returns_the_full_sync_it_handed_the_claim_to():
+    redis_client = MagicMock()
+    redis_client.eval.return_value = b"job-3"
+
+    with patch("services.sync_job_service._redis", redis_client):
+        assert release_sync_job("111", "job-1") == "job-3"
+
+    assert redis_client.eval.call_args[0][2:5] == ("sync-job:Account:111", "sync-job-full:Account:111", "job-1")
+
+
+def test_claims_without_redis_always_succeed():
+    with patch("services.sync_job_service._redis", None):
+        assert claim_sync_job("111", "job-1") is None
+        assert defer_full_sync("111", "job-1", "job-2") is None
+        assert release_sync_job("111", "job-1") is None
+
+
+def test_release_sync_job_works_without_scripting():
+    """
+    Test that a release still drops the claim when Redis refuses EVAL, so the realm is not blocked until the TTL.
+    """
+    redis_client = MagicMock()
+    redis_client.eval.side_effect = redis.ResponseError("unknown command 'EVAL'")
+    redis_client.get.side_effect = lambda key: {"sync-job:Account:111": b"job-1"}.get(key)
+
+    with patch("services.sync_job_service._redis", redis_client):
+        assert release_sync_job("111", "job-1") is None
+        with pytest.raises(SyncDeduplicationUnavailable):
+            defer_full_sync("111", "job-1", "job-2")
+
+    redis_client.delete.assert_called_once_with("sync-job:Account:111")
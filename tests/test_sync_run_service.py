@@ -0,0 +1,84 @@
+import asyncio
+from unittest.mock import patch, MagicMock
+import httpx
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from database.session import get_db
+from main import app
+from models.sync_run import SyncRun
+from models.token import Token
+from services.quickbooks_service import sync_accounts_pages
+from services.sync_run_service import list_sync_runs
+
+
+@pytest.fixture
+def token():
+    return Token(access_token="abc123", realm_id="12345", expires_in="3600")
+
+
+def _response(accounts, status_code=200):
+    return httpx.Response(status_code, json={"QueryResponse": {"Account": accounts}})
+
+
+def test_sync_accounts_pages_records_a_run(db, token):
+    """
+    Test that a sync stores its trigger, page and row counts, bytes and phase timings.
+    """
+    accounts = [{"Id": "1", "Name": "Cash"}, {"Id": "2", "Name": "Bank"}]
+    response = _response(accounts)
+
+    with patch("services.quickbooks_service.fetch_entity_from_qbo", return_value=response):
+        asyncio.run(sync_accounts_pages(db, token, full=True, trigger="celery"))
+
+    run = db.query(SyncRun).one()
+    assert (run.realm_id, run.entity, run.trigger, run.full, run.status) == ("12345", "Account", "celery", True, "succeeded")
+    assert run.pages == 1
+    assert run.rows_fetched == 2
+    assert (run.rows_inserted, run.rows_updated, run.rows_unchanged) == (2, 0, 0)
+    assert run.bytes_downloaded == len(response.content)
+    assert run.duration_seconds >= run.fetch_seconds + run.parse_seconds >= 0
+    assert run.write_seconds > 0
+
+
+def test_sync_accounts_pages_records_failures(db, token):
+    with patch("services.quickbooks_service.fetch_entity_from_qbo", return_value=_response([], status_code=500)):
+        with pytest.raises(HTTPException):
+            asyncio.run(sync_accounts_pages(db, token))
+
+    run = db.query(SyncRun).one()
+    assert run.status == "failed"
+    assert run.error.startswith("HTTPException")
+    assert run.finished_at is not None
+
+
+def test_list_sync_runs_newest_first(db, token):
+    with patch("services.quickbooks_service.fetch_entity_from_qbo", return_value=_response([])):
+        for _ in range(3):
+            asyncio.run(sync_accounts_pages(db, token))
+
+    runs = list_sync_runs(db, "12345", limit=2)
+    assert [run.id for run in runs] == [3, 2]
+    assert list_sync_runs(db, "other") == []
+
+
+def test_get_sync_runs_route():
+    run = SyncRun(
+        id=1, realm_id="12345", entity="Account", trigger="api", full=False, status="succeeded",
+        started_at="2026-01-01T00:00:00+00:00", fetch_seconds=0.5, parse_seconds=0.1, write_seconds=0.2,
+        hierarchy_seconds=0.0, pages=1, bytes_downloaded=2048, rows_fetched=10, rows_inserted=1,
+        rows_updated=2, rows_unchanged=7,
+    )
+    mock_db = MagicMock()
+
+    def override_get_db():
+        yield mock_db
+
+    app.dependency_overrides[get_db] = override_get_db
+    with patch("routes.sync_routes.list_sync_runs", return_value=[run]) as mock_list:
+        response = TestClient(app).get("/sync/runs", params={"realm_id": "12345", "limit": 5})
+    app.dependency_overrides = {}
+
+    assert response.status_code == 200
+    assert response.json()[0]["rows_unchanged"] == 7
+    mock_list.assert_called_once_with(mock_db, "12345", 5)
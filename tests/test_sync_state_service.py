@@ -0,0 +1,20 @@
+from datetime import datetime, timezone, timedelta
+from services.sync_state_service import get_high_water_mark, set_high_water_mark
+
+
+def test_get_high_water_mark_without_state(db):
+    assert get_high_water_mark(db, "12345", "Account") is None
+
+
+def test_high_water_mark_round_trip_per_realm(db):
+    """
+    Test that the mark is stored per realm and read back as an aware UTC datetime.
+    """
+    mark = datetime(2025, 2, 3, 10, 0, tzinfo=timezone(timedelta(hours=-8)))
+
+    set_high_water_mark(db, "12345", "Account", mark)
+    set_high_water_mark(db, "12345", "Account", mark + timedelta(hours=1))
+
+    assert get_high_water_mark(db, "12345", "Account") == mark + timedelta(hours=1)
+    assert get_high_water_mark(db, "12345", "Account").tzinfo is not None
+    assert get_high_water_mark(db, "67890", "Account") is None
@@ -0,0 +1,202 @@
+import pytest
+from unittest.mock import patch, MagicMock
+from fastapi import HTTPException
+from tasks.tasks import (
+    dispatch_realm_syncs, update_qbo_accounts, sync_qbo_entity, renew_qbo_tokens, enqueue_account_sync, get_sync_job,
+)
+from services.sync_job_service import SyncClaim
+from exceptions.custom_exceptions import SyncDeduplicationUnavailable
+
+
+def test_dispatch_realm_syncs_fans_out_per_realm_and_entity():
+    """
+    Test that the beat task enqueues one sync task per connected realm and configured entity.
+    """
+    with patch("tasks.tasks.SessionLocal") as mock_session, \
+         patch("tasks.tasks.get_realm_ids", return_value=["111", "222"]), \
+         patch("tasks.tasks.QBO_SYNC_ENTITIES", ["Account", "Invoice"]), \
+         patch("tasks.tasks.enqueue_entity_sync") as mock_enqueue:
+        result = dispatch_realm_syncs()
+
+    assert result == ["111", "222"]
+    assert [c.args for c in mock_enqueue.call_args_list] == [
+        ("111", "Account"), ("111", "Invoice"), ("222", "Account"), ("222", "Invoice"),
+    ]
+    mock_session.return_value.close.assert_called_once()
+
+
+def test_update_qbo_accounts_skips_realm_without_valid_token():
+    """
+    Test that the per-realm task does not call QBO when the realm has no usable token.
+    """
+    with patch("tasks.tasks.SessionLocal"), \
+         patch("tasks.tasks.token_manager.get_token",
+               side_effect=HTTPException(status_code=401, detail="QuickBooks token not found")) as mock_get_token, \
+         patch("tasks.tasks.sync_entity_pages") as mock_sync:
+        update_qbo_accounts("111")
+
+    mock_get_token.assert_called_once()
+    assert mock_get_token.call_args[0][1] == "111"
+    mock_sync.assert_not_called()
+
+
+def test_renew_qbo_tokens_closes_session():
+    with patch("tasks.tasks.SessionLocal") as mock_session, \
+         patch("tasks.tasks.token_manager.renew_expiring", return_value=["111"]) as mock_renew:
+        assert renew_qbo_tokens() == ["111"]
+
+    mock_renew.assert_called_once_with(mock_session.return_value)
+    mock_session.return_value.close.assert_called_once()
+
+
+def test_enqueue_account_sync_deduplicates_in_flight_jobs():
+    """
+    Test that a second sync request for a realm returns the queued job instead of enqueueing another.
+    """
+    with patch("tasks.tasks.claim_sync_job", return_value=SyncClaim("job-1")), \
+         patch("tasks.tasks.AsyncResult") as mock_result, \
+         patch.object(sync_qbo_entity, "apply_async") as mock_apply:
+        mock_result.return_value.state = "STARTED"
+        job = enqueue_account_sync("111")
+
+    assert job == {"job_id": "job-1", "realm_id": "111", "entity": "Account", "deduplicated": True}
+    mock_apply.assert_not_called()
+
+
+def test_enqueue_account_sync_replaces_finished_claim():
+    with patch("tasks.tasks.claim_sync_job", side_effect=[SyncClaim("job-1"), None]), \
+         patch("tasks.tasks.release_sync_job", return_value=None) as mock_release, \
+         patch("tasks.tasks.AsyncResult") as mock_result, \
+         patch.object(sync_qbo_entity, "apply_async") as mock_apply:
+        mock_result.return_value.state = "SUCCESS"
+        job = enqueue_account_sync("111", full=True)
+
+    assert job["deduplicated"] is False
+    mock_release.assert_called_once_with("111", "job-1", "Account")
+    mock_apply.assert_called_once_with(("111", "Account"), {"full": True}, task_id=job["job_id"])
+
+
+def test_enqueue_full_sync_queues_behind_an_incremental_one():
+    """
+    Test that a full sync requested while an incremental one runs is queued after it rather than dropped.
+    """
+    with patch("tasks.tasks.claim_sync_job", return_value=SyncClaim("job-1", full=False)), \
+         patch("tasks.tasks.defer_full_sync", side_effect=lambda realm_id, in_flight, job_id, entity: job_id) as mock_defer, \
+         patch("tasks.tasks.AsyncResult") as mock_result, \
+         patch.object(sync_qbo_entity, "apply_async") as mock_apply:
+        mock_result.return_value.state = "STARTED"
+        job = enqueue_account_sync("111", full=True)
+
+    assert job["job_id"] != "job-1"
+    assert job["deduplicated"] is False
+    assert mock_defer.call_args[0][:2] == ("111", "job-1")
+    mock_apply.assert_not_called()
+
+
+def test_enqueue_full_sync_falls_back_to_no_deduplication_when_redis_fails():
+    with patch("tasks.tasks.claim_sync_job", return_value=SyncClaim("job-1", full=False)), \
+         patch("tasks.tasks.defer_full_sync", side_effect=SyncDeduplicationUnavailable("unknown command 'EVAL'")), \
+         patch("tasks.tasks.AsyncResult") as mock_result, \
+         patch.object(sync_qbo_entity, "apply_async") as mock_apply:
+        mock_result.return_value.state = "STARTED"
+        job = enqueue_account_sync("111", full=True)
+
+    assert job["deduplicated"] is False
+    mock_apply.assert_called_once_with(("111", "Account"), {"full": True}, task_id=job["job_id"])
+
+
+def test_enqueue_account_sync_retries_a_stale_claim_once():
+    """
+    Test that a finished job's claim that cannot be released is retried once, then the sync is enqueued anyway.
+    """
+    with patch("tasks.tasks.claim_sync_job", return_value=SyncClaim("job-1")) as mock_claim, \
+         patch("tasks.tasks.release_sync_job", return_value=None), \
+         patch("tasks.tasks.AsyncResult") as mock_result, \
+         patch.object(sync_qbo_entity, "apply_async") as mock_apply:
+        mock_result.return_value.state = "SUCCESS"
+        job = enqueue_account_sync("111")
+
+    assert mock_claim.call_count == 2
+    mock_apply.assert_called_once_with(("111", "Account"), {"full": False}, task_id=job["job_id"])
+
+
+def test_enqueue_full_sync_reuses_a_full_one_in_flight():
+    with patch("tasks.tasks.claim_sync_job", return_value=SyncClaim("job-1", full=True)), \
+         patch("tasks.tasks.defer_full_sync") as mock_defer, \
+         patch("tasks.tasks.AsyncResult") as mock_result:
+        mock_result.return_value.state = "STARTED"
+        job = enqueue_account_sync("111", full=True)
+
+    assert job == {"job_id": "job-1", "realm_id": "111", "entity": "Account", "deduplicated": True}
+    mock_defer.assert_not_called()
+
+
+def test_enqueue_account_sync_releases_claim_when_broker_is_down():
+    with patch("tasks.tasks.claim_sync_job", return_value=None) as mock_claim, \
+         patch("tasks.tasks.release_sync_job", return_value=None) as mock_release, \
+         patch.object(sync_qbo_entity, "apply_async", side_effect=ConnectionError("broker down")), \
+         pytest.raises(ConnectionError):
+        enqueue_account_sync("111")
+
+    mock_release.assert_called_once_with(*mock_claim.call_args[0])
+
+
+def test_get_sync_job_reports_handled_failures():
+    with patch("tasks.tasks.AsyncResult") as mock_result:
+        mock_result.return_value.state = "SUCCESS"
+        mock_result.return_value.result = {"realm_id": "111", "error": "QuickBooks token not found"}
+        job = get_sync_job("job-1")
+
+    assert job["status"] == "failed"
+    assert job["result"]["error"] == "QuickBooks token not found"
+
+
+def test_update_qbo_accounts_releases_its_claim():
+    with patch("tasks.tasks.SessionLocal"), \
+         patch("tasks.tasks.token_manager.get_token") as mock_get_token, \
+         patch("tasks.tasks._sync_entity_and_close", new=MagicMock(return_value=None)), \
+         patch("tasks.tasks.asyncio.run", return_value=2), \
+         patch("tasks.tasks.release_sync_job", return_value=None) as mock_release:
+        mock_get_token.return_value.realm_id = "111"
+        update_qbo_accounts.push_request(id="job-1")
+        try:
+            result = update_qbo_accounts.run("111")
+        finally:
+            update_qbo_accounts.pop_request()
+
+    assert result == {"realm_id": "111", "entity": "Account", "pages": 2}
+    mock_release.assert_called_once_with("111", "job-1", "Account")
+
+
+def test_sync_qbo_entity_releases_the_entity_claim():
+    with patch("tasks.tasks.SessionLocal"), \
+         patch("tasks.tasks.token_manager.get_token") as mock_get_token, \
+         patch("tasks.tasks._sync_entity_and_close", new=MagicMock(return_value=None)), \
+         patch("tasks.tasks.asyncio.run", return_value=1), \
+         patch("tasks.tasks.release_sync_job", return_value=None) as mock_release:
+        mock_get_token.return_value.realm_id = "111"
+        sync_qbo_entity.push_request(id="job-2")
+        try:
+            result = sync_qbo_entity.run("111", "Invoice")
+        finally:
+            sync_qbo_entity.pop_request()
+
+    assert result == {"realm_id": "111", "entity": "Invoice", "pages": 1}
+    mock_release.assert_called_once_with("111", "job-2", "Invoice")
+
+
+def test_finished_sync_starts_the_full_sync_queued_behind_it():
+    with patch("tasks.tasks.SessionLocal"), \
+         patch("tasks.tasks.token_manager.get_token") as mock_get_token, \
+         patch("tasks.tasks._sync_entity_and_close", new=MagicMock(return_value=None)), \
+         patch("tasks.tasks.asyncio.run", return_value=1), \
+         patch("tasks.tasks.release_sync_job", return_value="job-3"), \
+         patch.object(sync_qbo_entity, "apply_async") as mock_apply:
+        mock_get_token.return_value.realm_id = "111"
+        sync_qbo_entity.push_request(id="job-2")
+        try:
+            sync_qbo_entity.run("111", "Invoice")
+        finally:
+            sync_qbo_entity.pop_request()
+
+    mock_apply.assert_called_once_with(("111", "Invoice"), {"full": True}, task_id="job-3")
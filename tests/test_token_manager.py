@@ -0,0 +1,152 @@
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch, MagicMock
+import pytest
+from fastapi import HTTPException
+from models.token import Token
+from services.token_manager import TokenManager
+from services.token_service import save_tokens_to_db
+
+
+def make_token(access_token: str, realm_id: str = "111", age: float = 0, expires_in: int = 3600) -> Token:
+    return Token(
+        access_token=access_token,
+        refresh_token=f"refresh-{access_token}",
+        expires_in=str(expires_in),
+        realm_id=realm_id,
+        token_type="Bearer",
+        created_at=datetime.now(timezone.utc) - timedelta(seconds=age),
+    )
+
+
+def test_get_token_is_served_from_cache():
+    """
+    Test that a fresh token is read from the database once and then served from memory.
+    """
+    manager = TokenManager(refresh_margin=600)
+
+    with patch("services.token_manager.get_latest_token", return_value=make_token("a")) as mock_latest:
+        first = manager.get_token(MagicMock(), "111")
+        second = manager.get_token(MagicMock(), "111")
+
+    assert first.access_token == second.access_token == "a"
+    mock_latest.assert_called_once()
+
+
+def test_saved_token_is_fresh_however_long_the_process_has_run(db):
+    """
+    Test that a token written through save_tokens_to_db gets its own created_at, not the time the
+    module was imported: two hours into the process it is still served without a refresh.
+    """
+    class Later(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return datetime.now(tz) + timedelta(hours=2)
+
+    manager = TokenManager(refresh_margin=600)
+    with patch("models.token.datetime", Later), patch("services.token_manager.datetime", Later), \
+         patch("services.token_manager.refresh_token") as mock_refresh:
+        save_tokens_to_db(db, {
+            "access_token": "a", "refresh_token": "r", "expires_in": 3600, "realm_id": "111", "token_type": "Bearer",
+        })
+        first = manager.get_token(db, "111")
+        manager.invalidate()
+        second = manager.get_token(db, "111")
+
+    assert first.access_token == second.access_token == "a"
+    mock_refresh.assert_not_called()
+
+
+def test_get_token_refreshes_token_close_to_expiry():
+    manager = TokenManager(refresh_margin=600)
+    expiring = make_token("old", age=3300)
+
+    with patch("services.token_manager.get_latest_token", return_value=expiring), \
+         patch("services.token_manager.refresh_token", return_value=make_token("new")) as mock_refresh:
+        token = manager.get_token(MagicMock(), "111")
+
+    assert token.access_token == "new"
+    mock_refresh.assert_called_once()
+
+
+def test_get_token_without_token_raises():
+    with patch("services.token_manager.get_latest_token", return_value=None):
+        with pytest.raises(HTTPException) as exc_info:
+            TokenManager().get_token(MagicMock(), "111")
+
+    assert exc_info.value.status_code == 401
+
+
+def test_concurrent_refreshes_are_single_flight():
+    """
+    Test that several workers hitting a 401 with the same token trigger exactly one refresh,
+    and the others pick up the token it stored.
+    """
+    manager = TokenManager(refresh_margin=600)
+    stale = make_token("old")
+    stored = {"token": stale}
+
+    def slow_refresh(db, token):
+        time.sleep(0.05)
+        stored["token"] = make_token("new")
+        return stored["token"]
+
+    results = []
+    with patch("services.token_manager.get_latest_token", side_effect=lambda db, realm_id: stored["token"]), \
+         patch("services.token_manager.refresh_token", side_effect=slow_refresh) as mock_refresh:
+        threads = [
+            threading.Thread(target=lambda: results.append(manager.refresh(MagicMock(), stale)))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    mock_refresh.assert_called_once()
+    assert [token.access_token for token in results] == ["new"] * 5
+
+
+def test_refresh_holds_the_realm_redis_lock():
+    redis_client = MagicMock()
+    lock = redis_client.lock.return_value
+    lock.acquire.return_value = True
+    manager = TokenManager(redis_client, lock_timeout=5)
+
+    with patch("services.token_manager.get_latest_token", return_value=make_token("old")), \
+         patch("services.token_manager.refresh_token", return_value=make_token("new")):
+        manager.refresh(MagicMock(), make_token("old"))
+
+    assert redis_client.lock.call_args[0][0] == "token-refresh:111"
+    lock.acquire.assert_called_once_with(blocking_timeout=5)
+    lock.release.assert_called_once()
+
+
+def test_refresh_after_a_lock_timeout_uses_the_token_another_process_refreshed():
+    redis_client = MagicMock()
+    redis_client.lock.return_value.acquire.return_value = False
+    manager = TokenManager(redis_client, lock_timeout=5)
+
+    with patch("services.token_manager.get_latest_token", return_value=make_token("new")), \
+         patch("services.token_manager.refresh_token") as mock_refresh, \
+         patch("services.token_manager.logger") as mock_logger:
+        token = manager.refresh(MagicMock(), make_token("old"))
+
+    assert token.access_token == "new"
+    mock_refresh.assert_not_called()
+    redis_client.lock.return_value.release.assert_not_called()
+    assert "Timed out" in mock_logger.warning.call_args[0][0]
+
+
+def test_renew_expiring_only_refreshes_tokens_inside_the_margin():
+    manager = TokenManager(refresh_margin=600)
+    tokens = {"111": make_token("a", "111", age=3300), "222": make_token("b", "222", age=60)}
+
+    with patch("services.token_manager.get_realm_ids", return_value=["111", "222"]), \
+         patch("services.token_manager.get_latest_token", side_effect=lambda db, realm_id: tokens[realm_id]), \
+         patch("services.token_manager.refresh_token", return_value=make_token("a2", "111")) as mock_refresh:
+        renewed = manager.renew_expiring(MagicMock())
+
+    assert renewed == ["111"]
+    mock_refresh.assert_called_once()
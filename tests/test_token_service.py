@@ -2,7 +2,7 @@ import pytest
 from unittest.mock import patch, MagicMock
 from requests.models import Response
 from models.token import Token
-from services.token_service import get_valid_token, get_latest_token, save_tokens_to_db, refresh_token
+from services.token_service import get_valid_token, get_latest_token, save_tokens_to_db, refresh_token, get_realm_ids
 from intuitlib.exceptions import AuthClientError
 from fastapi import HTTPException
 
@@ -77,6 +77,30 @@ def test_get_latest_token_returns_none_when_no_token():
     db.query.assert_called_once_with(Token)
     assert result is None
 
+def test_get_latest_token_filters_by_realm():
+    """
+    Test the get_latest_token function when a realm id is given.
+    """
+    realm_token = MagicMock(spec=Token)
+
+    db = MagicMock()
+    db.query.return_value.filter.return_value.order_by.return_value.first.return_value = realm_token
+
+    result = get_latest_token(db, "78910")
+
+    filter_arg = db.query.return_value.filter.call_args[0][0]
+    assert filter_arg.right.value == "78910"
+    assert result == realm_token
+
+def test_get_realm_ids():
+    """
+    Test the get_realm_ids function skips tokens without a realm.
+    """
+    db = MagicMock()
+    db.query.return_value.distinct.return_value.all.return_value = [("111",), (None,), ("222",)]
+
+    assert get_realm_ids(db) == ["111", "222"]
+
 def test_save_tokens_to_db():
     """
     Test the save_tokens_to_db function with valid token data.
@@ -106,6 +130,7 @@ def test_save_tokens_to_db():
 
         db.merge.assert_called_once_with(mock_token_instance)
         assert db.commit.call_count == 2
+        db.query.return_value.filter.return_value.delete.assert_called_once()
 
 def test_refresh_token_success():
     """
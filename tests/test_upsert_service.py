@@ -0,0 +1,96 @@
+from sqlalchemy import event
+from models.account import Account
+from services.upsert_service import upsert_accounts, row_content_hash, UpsertResult
+
+
+def _row(id, name, balance=0.0, parent_id=None, realm_id="12345"):
+    return {
+        "realm_id": realm_id,
+        "id": id,
+        "name": name,
+        "classification": "Asset",
+        "currency": "USD",
+        "account_type": "Bank",
+        "active": True,
+        "current_balance": balance,
+        "parent_id": parent_id,
+    }
+
+
+def test_upsert_accounts_inserts_new_rows(db):
+    """
+    Test that rows not yet in the table are inserted in batches.
+    """
+    rows = [_row(1, "Cash"), _row(2, "Checking", parent_id=1), _row(3, "Savings", parent_id=1)]
+
+    result = upsert_accounts(db, rows, batch_size=2)
+    db.commit()
+
+    assert result == UpsertResult(inserted=3, updated=0, unchanged=0)
+    assert db.query(Account).count() == 3
+    assert db.get(Account, ("12345", 2)).parent_id == 1
+
+
+def test_upsert_accounts_counts_updated_and_unchanged(db):
+    """
+    Test that changed rows are updated and identical rows are reported as unchanged.
+    """
+    upsert_accounts(db, [_row(1, "Cash", 10.0), _row(2, "Checking", 20.0)])
+    db.commit()
+
+    result = upsert_accounts(db, [_row(1, "Cash", 10.0), _row(2, "Checking", 25.5), _row(3, "Savings")])
+    db.commit()
+
+    assert result == UpsertResult(inserted=1, updated=1, unchanged=1)
+    assert db.get(Account, ("12345", 2)).current_balance == 25.5
+
+
+def test_upsert_accounts_deduplicates_keys(db):
+    """
+    Test that a key appearing twice in one call is written once with the last values.
+    """
+    result = upsert_accounts(db, [_row(1, "Old"), _row(1, "New")])
+    db.commit()
+
+    assert result.inserted == 1
+    assert db.get(Account, ("12345", 1)).name == "New"
+
+
+def test_upsert_accounts_keys_rows_by_realm(db):
+    """
+    Test that the same QBO account id in two realms is stored as two rows.
+    """
+    result = upsert_accounts(db, [_row(1, "Cash", realm_id="111"), _row(1, "Bank", realm_id="222")])
+    db.commit()
+
+    assert result.inserted == 2
+    assert db.get(Account, ("111", 1)).name == "Cash"
+    assert db.get(Account, ("222", 1)).name == "Bank"
+
+
+def test_upsert_accounts_skips_unchanged_rows_without_writing(db):
+    """
+    Test that rows whose content hash matches the stored one are not written at all.
+    """
+    upsert_accounts(db, [_row(1, "Cash", 10.0), _row(2, "Checking", 20.0)])
+    db.commit()
+
+    statements = []
+    event.listen(db.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+    result = upsert_accounts(db, [_row(1, "Cash", 10.0), _row(2, "Checking", 20.0)])
+
+    assert result == UpsertResult(inserted=0, updated=0, unchanged=2)
+    assert [s.split()[0] for s in statements] == ["SELECT"]
+
+
+def test_upsert_accounts_rewrites_rows_without_a_hash(db):
+    """
+    Test that rows stored before hashing existed are rewritten once and hashed.
+    """
+    db.add(Account(**_row(1, "Cash")))
+    db.commit()
+
+    assert upsert_accounts(db, [_row(1, "Cash")]) == UpsertResult(updated=1)
+    db.commit()
+    assert db.get(Account, ("12345", 1)).content_hash == row_content_hash(_row(1, "Cash"))
+    assert upsert_accounts(db, [_row(1, "Cash")]) == UpsertResult(unchanged=1)
@@ -0,0 +1,47 @@
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Iterable, Sequence
+from starlette.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; the stdlib encoder produces the same JSON, only slower.
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """
+    Encodes plain dicts, lists and scalars (plus dates and Decimals) as compact UTF-8 JSON,
+    with orjson when it is installed.
+    """
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=_default, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+
+def rows_to_dicts(rows: Iterable[Sequence], fields: Sequence[str]) -> list[dict]:
+    """
+    Turns selected-column Row tuples into plain dicts keyed by the selected fields,
+    so responses can be serialized without building ORM objects or Pydantic models.
+    """
+    return [dict(zip(fields, row)) for row in rows]
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response that encodes its content directly with dumps().
+    Returning it from a route skips FastAPI's jsonable_encoder walk over every value, so the
+    content must already be plain data (e.g. from rows_to_dicts), not ORM or Pydantic objects.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
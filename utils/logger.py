@@ -1,17 +1,194 @@
+import atexit
 import logging
-from loggly.handlers import HTTPSHandler
-from core.config import LOGGLY_TOKEN
+import os
+import queue
+import sys
+import threading
+import time
+import weakref
+from typing import Callable, Optional, Sequence
+import httpx
+from core.config import LOGGLY_TOKEN, LOG_QUEUE_SIZE, LOG_BATCH_SIZE, LOG_FLUSH_INTERVAL, LOG_FILE
+
+LOG_FORMAT = "%(levelname)s | %(asctime)s | %(name)s | %(message)s"
+
+
+class LogglyBulkSink:
+    """
+    Posts a batch of formatted records to the Loggly bulk endpoint, one event per line.
+    """
+    def __init__(self, token: str, timeout: float = 10.0):
+        self.url = f"https://logs-01.loggly.com/bulk/{token}/tag/python/"
+        self.client = httpx.Client(timeout=timeout)
+
+    def after_fork(self) -> None:
+        # The parent's pooled connections must not be shared with a forked child.
+        self.client = httpx.Client(timeout=self.client.timeout)
+
+    def __call__(self, lines: Sequence[str]) -> None:
+        self.client.post(self.url, content="\n".join(lines), headers={"Content-Type": "text/plain"}).raise_for_status()
+
+
+class StreamSink:
+    """
+    Writes a batch of formatted records to a file, or to stdout when no path is given.
+    """
+    def __init__(self, path: Optional[str] = None):
+        self.stream = open(path, "a", encoding="utf-8") if path else sys.stdout
+
+    def __call__(self, lines: Sequence[str]) -> None:
+        self.stream.write("".join(line + "\n" for line in lines))
+        self.stream.flush()
+
+
+class BatchingHandler(logging.Handler):
+    """
+    Logging handler that never blocks the caller on I/O.
+    emit() only formats the record and puts it on a bounded queue; a background
+    thread drains the queue and hands the records to the sink in batches of up to
+    batch_size, at least every flush_interval seconds.
+    When the queue is full the new record is dropped and counted; the count is
+    reported in the next batch. A failing sink loses that batch, not the thread.
+    A forked child (e.g. a Celery prefork worker) inherits the handler but not its thread,
+    so the child gets a fresh queue and thread of its own.
+    """
+    def __init__(
+        self,
+        sink: Callable[[Sequence[str]], None],
+        queue_size: int = 10000,
+        batch_size: int = 100,
+        flush_interval: float = 2.0,
+    ):
+        super().__init__()
+        self.sink = sink
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._start()
+        _handlers.add(self)
+
+    def _start(self) -> None:
+        self.dropped = 0
+        self.failed_batches = 0
+        self._reported_dropped = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="log-shipper", daemon=True)
+        self._thread.start()
+
+    def _after_fork(self) -> None:
+        # Records queued in the parent are the parent's to ship.
+        self.queue = queue.Queue(maxsize=self.queue.maxsize)
+        if hasattr(self.sink, "after_fork"):
+            self.sink.after_fork()
+        if not self._stop.is_set():
+            self._start()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            line = self.format(record)
+        except Exception:
+            self.handleError(record)
+            return
+        try:
+            self.queue.put_nowait(line)
+        except queue.Full:
+            self.dropped += 1
+
+    def _next_batch(self) -> list[str]:
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _ship(self, batch: list[str]) -> None:
+        dropped = self.dropped - self._reported_dropped
+        if dropped:
+            batch.append(f"WARNING | {time.strftime('%Y-%m-%d %H:%M:%S')} | logging | {dropped} log records dropped, queue full")
+            self._reported_dropped += dropped
+        if not batch:
+            return
+        try:
+            self.sink(batch)
+        except Exception:
+            self.failed_batches += 1
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._ship(self._next_batch())
+
+    def _drain(self) -> None:
+        batch = []
+        while True:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+            if len(batch) == self.batch_size:
+                self._ship(batch)
+                batch = []
+        self._ship(batch)
+
+    def flush(self) -> None:
+        """
+        Ships everything queued so far from the calling thread.
+        """
+        with self.lock:
+            self._drain()
+
+    def close(self) -> None:
+        self._stop.set()
+        self._thread.join(timeout=self.flush_interval + 1)
+        self.flush()
+        super().close()
+
+
+_handlers: "weakref.WeakSet[BatchingHandler]" = weakref.WeakSet()
+
+
+def _restart_handlers_after_fork() -> None:
+    for handler in list(_handlers):
+        handler._after_fork()
+
+
+os.register_at_fork(after_in_child=_restart_handlers_after_fork)
+
+
+def _default_sink() -> Callable[[Sequence[str]], None]:
+    if LOGGLY_TOKEN:
+        return LogglyBulkSink(LOGGLY_TOKEN)
+    return StreamSink(LOG_FILE)
+
+
+_handler: Optional[BatchingHandler] = None
+_handler_lock = threading.Lock()
+
+
+def get_log_handler() -> BatchingHandler:
+    """
+    Returns the process wide shipping handler, so all loggers share one queue and one thread.
+    """
+    global _handler
+    with _handler_lock:
+        if _handler is None:
+            _handler = BatchingHandler(_default_sink(), LOG_QUEUE_SIZE, LOG_BATCH_SIZE, LOG_FLUSH_INTERVAL)
+            _handler.setFormatter(logging.Formatter(LOG_FORMAT))
+            atexit.register(_handler.close)
+        return _handler
 
 
 def get_logger(name: str):
     """
-    Create a logger that sends logs to Loggly."
+    Create a logger whose records are shipped to Loggly (or stdout/LOG_FILE without a token) in the background.
     """
     logger = logging.getLogger(name)
     if not logger.handlers:
         logger.setLevel(logging.INFO)
-        https_handler = HTTPSHandler(url=f"https://logs-01.loggly.com/inputs/{LOGGLY_TOKEN}/tag/python")
-        formatter = logging.Formatter("%(levelname)s | %(asctime)s | %(name)s | %(message)s")
-        https_handler.setFormatter(formatter)
-        logger.addHandler(https_handler)
+        logger.addHandler(get_log_handler())
     return logger
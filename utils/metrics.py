@@ -0,0 +1,227 @@
+import json
+import math
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterable, Optional, Sequence
+import redis
+from core.config import METRICS_WORKER_TTL
+from utils.logger import get_logger
+from utils.redis_client import get_redis_client
+
+logger = get_logger("metrics")
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+WORKER_KEY_PREFIX = "metrics:worker:"
+
+
+class Metric:
+    """
+    A named family of values, one per combination of label values.
+    """
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: dict[tuple, object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            values = [[list(key), list(value) if isinstance(value, list) else value] for key, value in self._values.items()]
+        return {"kind": self.kind, "help": self.documentation, "labels": list(self.labelnames), "values": values}
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Histogram(Metric):
+    """
+    Cumulative-bucket histogram; each value is [bucket counts..., +Inf count, sum].
+    """
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts = self._values.setdefault(key, [0] * (len(self.buckets) + 1) + [0.0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            counts[-2] += 1
+            counts[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """
+        Observes the wall time of the with block, in seconds.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def snapshot(self) -> dict:
+        return {**super().snapshot(), "buckets": list(self.buckets)}
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str]) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def merge_snapshots(snapshots: Iterable[dict]) -> dict:
+    """
+    Adds up several registry snapshots (e.g. one per process) metric by metric.
+    """
+    merged: dict = {}
+    for snapshot in snapshots:
+        for name, metric in snapshot.items():
+            target = merged.setdefault(name, {**metric, "values": {}})
+            for labels, value in metric["values"]:
+                key = tuple(labels)
+                if key not in target["values"]:
+                    target["values"][key] = list(value) if isinstance(value, list) else value
+                elif isinstance(value, list):
+                    target["values"][key] = [a + b for a, b in zip(target["values"][key], value)]
+                else:
+                    target["values"][key] += value
+    return merged
+
+
+def render(snapshot: dict) -> str:
+    """
+    Renders a (merged) snapshot in the Prometheus text exposition format.
+    """
+    lines = []
+    for name, metric in sorted(snapshot.items()):
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['kind']}")
+        values = metric["values"]
+        items = values.items() if isinstance(values, dict) else ((tuple(k), v) for k, v in values)
+        for labels, value in sorted(items):
+            if metric["kind"] == "histogram":
+                for bound, count in zip([*metric["buckets"], math.inf], value[:-1]):
+                    bucket_labels = _format_labels([*metric["labels"], "le"], [*labels, _format_value(bound)])
+                    lines.append(f"{name}_bucket{bucket_labels} {count}")
+                label_text = _format_labels(metric["labels"], labels)
+                lines.append(f"{name}_sum{label_text} {_format_value(value[-1])}")
+                lines.append(f"{name}_count{label_text} {value[-2]}")
+            else:
+                lines.append(f"{name}{_format_labels(metric['labels'], labels)} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+class MetricsRegistry:
+    """
+    In-process registry of counters and histograms.
+    Celery worker processes publish their snapshot to Redis after every task so the API's
+    /metrics endpoint can serve worker metrics too.
+    """
+
+    def __init__(self, redis_client: Optional[redis.Redis] = None):
+        self.redis = redis_client
+        self._metrics: dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: Metric) -> Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {metric.name: metric.snapshot() for metric in metrics}
+
+    def publish(self) -> None:
+        """
+        Stores this process's snapshot in Redis, expiring with the process once it stops publishing.
+        """
+        if self.redis is None:
+            return
+        try:
+            self.redis.set(f"{WORKER_KEY_PREFIX}{socket.gethostname()}:{os.getpid()}", json.dumps(self.snapshot()), ex=METRICS_WORKER_TTL)
+        except redis.RedisError as e:
+            logger.warning(f"⚠️ Could not publish worker metrics: {e}")
+
+    def _worker_snapshots(self) -> list[dict]:
+        if self.redis is None:
+            return []
+        try:
+            keys = list(self.redis.scan_iter(match=f"{WORKER_KEY_PREFIX}*"))
+            return [json.loads(raw) for raw in self.redis.mget(keys) if raw] if keys else []
+        except redis.RedisError as e:
+            logger.warning(f"⚠️ Could not read worker metrics: {e}")
+            return []
+
+    def render(self) -> str:
+        """
+        Renders this process's metrics plus the ones published by Celery workers.
+        """
+        return render(merge_snapshots([self.snapshot(), *self._worker_snapshots()]))
+
+
+REGISTRY = MetricsRegistry(get_redis_client())
+
+HTTP_REQUEST_DURATION = REGISTRY.histogram(
+    "http_request_duration_seconds", "API request latency by route template and status.", ["method", "route", "status"]
+)
+QBO_REQUEST_DURATION = REGISTRY.histogram(
+    "qbo_request_duration_seconds", "QuickBooks API call duration by HTTP status ('error' for network failures).", ["status"]
+)
+UPSERT_ROWS = REGISTRY.counter(
+    "qbo_upsert_rows_total", "QBO entity rows written by save_entity_rows, by entity and outcome.", ["entity", "result"]
+)
+UPSERT_ROWS_PER_SECOND = REGISTRY.histogram(
+    "qbo_upsert_rows_per_second", "Throughput of each save_entity_rows call, by entity.", ["entity"],
+    buckets=(100, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000),
+)
+QBO_RATE_LIMIT_WAIT = REGISTRY.histogram(
+    "qbo_rate_limit_wait_seconds", "Time QBO requests waited for the per-realm rate limiter.",
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0),
+)
+TOKEN_REFRESHES = REGISTRY.counter(
+    "qbo_token_refreshes_total", "QuickBooks OAuth token refreshes by outcome.", ["outcome"]
+)
+CELERY_TASK_DURATION = REGISTRY.histogram(
+    "celery_task_duration_seconds", "Celery task run time by task and final state.", ["task", "state"]
+)
@@ -0,0 +1,21 @@
+import threading
+from typing import Optional
+import redis
+from core.config import CACHE_REDIS_URL
+
+_client: Optional[redis.Redis] = None
+_client_lock = threading.Lock()
+
+
+def get_redis_client() -> Optional[redis.Redis]:
+    """
+    Returns the process wide client of the cache Redis (None when REDIS_HOST is not set), so the
+    account cache, rate limiter, token manager, sync job claims and metrics share one connection pool.
+    Every command they send is short, so reads time out after half a second and callers fall back;
+    the token refresh lock polls with SET NX rather than blocking on the connection.
+    """
+    global _client
+    with _client_lock:
+        if _client is None and CACHE_REDIS_URL:
+            _client = redis.Redis.from_url(CACHE_REDIS_URL, socket_timeout=0.5, socket_connect_timeout=0.5)
+        return _client